@@ -0,0 +1,349 @@
+import argparse
+import logging
+import math
+import random
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import json_stream
+
+# Characters of an item's text that go into its vector: this much from the start and as much from the end
+SAMPLE_CHARS = 8192
+
+# Most clusters chosen automatically, sqrt(items / 2) up to this
+MAX_CLUSTERS = 256
+
+# Rows hashed, or compared, per NumPy batch
+BATCH_ROWS = 2048
+
+# A duplicate candidate's whole text is hashed in pieces of about this many characters
+FULL_TEXT_PIECE = 1024 * 1024
+
+
+def available():
+    return np is not None
+
+
+def _strings(node, reverse=False):
+    """String leaves of an organized item outside its 'metadata', front to back or back to front."""
+    if isinstance(node, str):
+        yield node
+    elif isinstance(node, dict):
+        if node.get('type') == 'text_chunk' and isinstance(node.get('chunks'), list):
+            yield from _strings(node['chunks'], reverse)
+            return
+        values = [value for key, value in node.items() if key != 'metadata']
+        for value in reversed(values) if reverse else values:
+            yield from _strings(value, reverse)
+    elif isinstance(node, (list, tuple)):
+        for value in reversed(node) if reverse else node:
+            yield from _strings(value, reverse)
+    elif isinstance(node, json_stream.LazyList) and not reverse:
+        # Spilled lists are read front to back only, and only as far as the sample needs
+        for value in node:
+            yield from _strings(value, reverse)
+
+
+def _take(strings, limit):
+    parts, size = [], 0
+    for text in strings:
+        parts.append(text[:limit - size])
+        size += len(parts[-1])
+        if size >= limit:
+            break
+    return parts
+
+
+def sample_text(item, limit=SAMPLE_CHARS):
+    """The first and last `limit` characters of an item's text, or all of it if it is shorter."""
+    head = ''.join(_take(_strings(item), limit + 1))
+    if len(head) <= limit:
+        return head
+    tail = ''.join(reversed([part[::-1] for part in _take((text[::-1] for text in _strings(item, reverse=True)), limit)]))
+    return head[:limit] + ' ' + tail
+
+
+def _normalize(counts):
+    """Square-rooted, L2-normalized rows, so a few very frequent n-grams do not dominate."""
+    counts = np.sign(counts) * np.sqrt(np.abs(counts))
+    norms = np.linalg.norm(counts, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return counts / norms
+
+
+def hashed_counts(texts, dimensions=512, ngram=4):
+    """
+    Signed feature-hashed counts of the texts' character n-grams, one float32 row per text.
+
+    Texts are lowercased with whitespace collapsed and hashed BATCH_ROWS at a
+    time as one byte array: each window of up to 4 bytes is packed into a
+    uint32 and multiplied by a Fibonacci hashing constant, the top bits
+    picking the column and the next bit the sign.
+    """
+    if dimensions & (dimensions - 1) or not 1 < dimensions <= 1 << 16:
+        raise ValueError('dimensions must be a power of two up to 65536')
+    if not 1 <= ngram <= 4:
+        raise ValueError('ngram must be between 1 and 4')
+    bits = dimensions.bit_length() - 1
+    matrix = np.zeros((len(texts), dimensions), dtype=np.float32)
+    for start in range(0, len(texts), BATCH_ROWS):
+        encoded = [b' '.join(text.lower().encode('utf-8').split()) for text in texts[start:start + BATCH_ROWS]]
+        rows = len(encoded)
+        data = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+        count = len(data) - ngram + 1
+        if count <= 0:
+            continue
+        # Every byte offset's next 4 bytes as a little-endian uint32, read as four strided views
+        padded = np.zeros(len(data) + 8, dtype=np.uint8)
+        padded[:len(data)] = data
+        windows = np.empty(count + 3, dtype=np.uint32)
+        for offset in range(4):
+            views = padded[offset:offset + (count + 3 - offset + 3) // 4 * 4].view('<u4')
+            windows[offset::4] = views[:len(windows[offset::4])]
+        windows = windows[:count]
+        if ngram < 4:
+            windows &= np.uint32((1 << (8 * ngram)) - 1)
+        hashes = windows * np.uint32(2654435761)
+        # The few windows spanning two texts count towards the first of them
+        owner = np.repeat(np.arange(rows, dtype=np.int32) << (bits + 1), [len(text) for text in encoded])[:count]
+        cells = owner | (hashes >> np.uint32(31 - bits)).astype(np.int32)
+        counts = np.bincount(cells, minlength=rows << (bits + 1)).reshape(rows, dimensions, 2)
+        matrix[start:start + rows] = counts[:, :, 0].astype(np.float32) - counts[:, :, 1]
+    return matrix
+
+
+def hashed_vectors(texts, dimensions=512, ngram=4):
+    """L2-normalized feature-hashed vectors of the texts' character n-grams, one float32 row per text."""
+    matrix = hashed_counts(texts, dimensions, ngram)
+    for start in range(0, len(matrix), BATCH_ROWS):
+        matrix[start:start + BATCH_ROWS] = _normalize(matrix[start:start + BATCH_ROWS])
+    return matrix
+
+
+def _pieces(item, piece_chars=FULL_TEXT_PIECE):
+    """An item's whole text, joined the way sample_text joins it, in pieces of about piece_chars."""
+    parts, size = [], 0
+    for text in _strings(item):
+        for start in range(0, len(text), piece_chars):
+            parts.append(text[start:start + piece_chars])
+            size += len(parts[-1])
+            if size >= piece_chars:
+                yield ''.join(parts)
+                parts, size = [], 0
+    if parts:
+        yield ''.join(parts)
+
+
+def full_text_vector(item, dimensions=512, ngram=4):
+    """The hashed vector of an item's whole text rather than its sample, read a piece at a time."""
+    counts = np.zeros((1, dimensions), dtype=np.float32)
+    for piece in _pieces(item):
+        counts += hashed_counts([piece], dimensions, ngram)
+    return _normalize(counts)[0]
+
+
+def mini_batch_kmeans(matrix, clusters, batch_size=1024, iterations=100, seed=0):
+    """
+    Spherical mini-batch k-means: (labels, unit centroids) for L2-normalized rows.
+
+    Each iteration assigns a random batch to the most similar centroid and
+    moves every centroid towards its batch members with a per-centroid
+    learning rate of members / everything assigned to it so far.
+    """
+    rng = np.random.default_rng(seed)
+    rows = len(matrix)
+    clusters = min(clusters, rows)
+    centroids = matrix[rng.choice(rows, clusters, replace=False)].copy()
+    assigned = np.zeros(clusters)
+
+    for _ in range(iterations):
+        batch = matrix[rng.integers(0, rows, min(batch_size, rows))]
+        labels = np.argmax(batch @ centroids.T, axis=1)
+        members = np.bincount(labels, minlength=clusters).astype(np.float64)
+        one_hot = np.zeros((clusters, len(batch)), dtype=matrix.dtype)
+        one_hot[labels, np.arange(len(batch))] = 1.0
+        sums = one_hot @ batch
+        assigned += members
+        rate = (members / np.maximum(assigned, 1))[:, None]
+        centroids += rate * (sums / np.maximum(members, 1)[:, None] - centroids) * (members > 0)[:, None]
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids /= norms
+
+    labels = np.empty(rows, dtype=np.int64)
+    for start in range(0, rows, BATCH_ROWS * 4):
+        labels[start:start + BATCH_ROWS * 4] = np.argmax(matrix[start:start + BATCH_ROWS * 4] @ centroids.T, axis=1)
+    return labels, centroids
+
+
+def cluster_order(labels, centroids):
+    """Cluster numbers in output order: starting with the first row's cluster, always the most similar next."""
+    used = list(dict.fromkeys(labels.tolist()))
+    remaining = set(used[1:])
+    order = [used[0]]
+    while remaining:
+        candidates = list(remaining)
+        similarity = centroids[candidates] @ centroids[order[-1]]
+        order.append(candidates[int(np.argmax(similarity))])
+        remaining.discard(order[-1])
+    return order
+
+
+def near_duplicates(matrix, labels, sizes, threshold=0.97, size_ratio=0.9):
+    """
+    {row: earlier row it duplicates} for rows with cosine similarity at or
+    above threshold to an earlier kept row of the same cluster, and a size
+    within size_ratio of it. With sample vectors these are only candidates.
+    """
+    duplicate_of = {}
+    order = np.argsort(labels, kind='stable')
+    bounds = np.flatnonzero(np.diff(labels[order])) + 1
+    for members in np.split(order, bounds):
+        if len(members) < 2:
+            continue
+        vectors = matrix[members]
+        member_sizes = np.asarray([sizes[row] for row in members], dtype=np.float64)
+        dropped = np.zeros(len(members), dtype=bool)
+        for start in range(0, len(members), BATCH_ROWS):
+            similarity = vectors[start:start + BATCH_ROWS] @ vectors.T
+            for offset, row in enumerate(similarity):
+                i = start + offset
+                if dropped[i]:
+                    continue
+                later = np.flatnonzero(row[i + 1:] >= threshold) + i + 1
+                if not len(later):
+                    continue
+                larger = np.maximum(member_sizes[later], member_sizes[i])
+                close = np.minimum(member_sizes[later], member_sizes[i]) >= size_ratio * np.where(larger > 0, larger, 1)
+                for j in later[close & ~dropped[later]]:
+                    dropped[j] = True
+                    duplicate_of[int(members[j])] = int(members[i])
+    return duplicate_of
+
+
+def arrange(organized_data, dimensions=512, clusters=None, duplicate_threshold=0.97, ngram=4, logger=None):
+    """
+    Cluster the items of organize_data output by their text, drop near-duplicates and order each data type by cluster.
+
+    Items keep their relative order inside a cluster; clusters follow one
+    another from most to least similar. Each kept item's metadata gets its
+    'cluster' number, and the file names of the items dropped as its
+    duplicates under 'duplicates'. Clustering looks only at each item's
+    sample_text, so a pair that looks alike there is dropped only when the
+    vectors of their whole texts are as similar too. Items without text stay
+    at the end of their type. Returns {'items', 'clusters', 'duplicates', 'seconds'}.
+    """
+    logger = logger or logging.getLogger()
+    started = time.perf_counter()
+    metadata = organized_data['metadata']
+    data = organized_data['data']
+
+    units, texts, sizes = [], [], []
+    for data_type, items in data.items():
+        for key, item in items.items():
+            text = sample_text(item)
+            if text.strip():
+                units.append((data_type, key))
+                texts.append(text)
+                sizes.append((metadata.get(key) or {}).get('file_size') or len(text))
+    if len(units) < 2:
+        return {'items': len(units), 'clusters': len(units), 'duplicates': 0, 'seconds': time.perf_counter() - started}
+
+    matrix = hashed_vectors(texts, dimensions, ngram)
+    clusters = clusters or max(1, min(MAX_CLUSTERS, int(math.sqrt(len(units) / 2))))
+    labels, centroids = mini_batch_kmeans(matrix, clusters)
+    candidates = near_duplicates(matrix, labels, sizes, duplicate_threshold)
+
+    # Two items sharing their head and tail can still differ in between: compare whole texts before dropping anything
+    full_vectors = {}
+    for row in {row for pair in candidates.items() for row in pair}:
+        data_type, key = units[row]
+        full_vectors[row] = full_text_vector(data[data_type][key], dimensions, ngram)
+    duplicate_of = {row: kept for row, kept in candidates.items() if float(full_vectors[row] @ full_vectors[kept]) >= duplicate_threshold}
+    if len(duplicate_of) < len(candidates):
+        logger.debug(f"Kept {len(candidates) - len(duplicate_of)} items whose samples matched but whole texts did not")
+    rank = {cluster: position for position, cluster in enumerate(cluster_order(labels, centroids))}
+
+    for row, kept in sorted(duplicate_of.items()):
+        data_type, key = units[row]
+        dropped = metadata.get(key) or {}
+        kept_metadata = metadata.setdefault(units[kept][1], {})
+        kept_metadata.setdefault('duplicates', []).append(dropped.get('file_name', key))
+        logger.debug(f"Dropped {key} as a near-duplicate of {units[kept][1]}")
+        del data[data_type][key]
+        for name in [name for name in metadata if name == key or name.startswith(f"{key}_chunk_")]:
+            del metadata[name]
+
+    positions = {}
+    for row, (data_type, key) in enumerate(units):
+        if row not in duplicate_of:
+            positions[(data_type, key)] = (rank[int(labels[row])], row)
+            metadata.setdefault(key, {})['cluster'] = rank[int(labels[row])]
+    for data_type, items in data.items():
+        keys = sorted(items, key=lambda key: positions.get((data_type, key), (len(rank), 0)))
+        data[data_type] = {key: items[key] for key in keys}
+
+    stats = {'items': len(units), 'clusters': len(rank), 'duplicates': len(duplicate_of), 'seconds': time.perf_counter() - started}
+    logger.info(f"Clustered {stats['items']} items into {stats['clusters']} clusters, dropped {stats['duplicates']} near-duplicates in {stats['seconds']:.2f}s")
+    return stats
+
+
+# `items` texts on `topics` topics, every `duplicate_every`-th a lightly edited copy of an earlier one
+def make_fixture(items, topics, text_chars, duplicate_every):
+    rng = random.Random(0)
+    vocabularies = [[''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(3, 9))) for _ in range(300)] for _ in range(topics)]
+    texts, topic_of, copies = [], [], {}
+    for idx in range(items):
+        if duplicate_every and idx % duplicate_every == duplicate_every - 1:
+            original = rng.randrange(idx)
+            words = texts[original].split()
+            words[rng.randrange(len(words))] = 'edited'
+            texts.append(' '.join(words))
+            topic_of.append(topic_of[original])
+            copies[idx] = original
+            continue
+        topic = rng.randrange(topics)
+        texts.append(' '.join(rng.choices(vocabularies[topic], k=text_chars // 6))[:text_chars])
+        topic_of.append(topic)
+    return texts, topic_of, copies
+
+
+def benchmark(items, topics, text_chars, duplicate_every, dimensions):
+    texts, topic_of, copies = make_fixture(items, topics, text_chars, duplicate_every)
+
+    started = time.perf_counter()
+    matrix = hashed_vectors(texts, dimensions)
+    hashed = time.perf_counter()
+    labels, centroids = mini_batch_kmeans(matrix, max(1, min(MAX_CLUSTERS, int(math.sqrt(items / 2)))))
+    clustered = time.perf_counter()
+    duplicate_of = near_duplicates(matrix, labels, [len(text) for text in texts])
+    finished = time.perf_counter()
+
+    # Purity: share of items whose cluster's most common topic is their own
+    majority = {}
+    for label, topic in zip(labels.tolist(), topic_of):
+        majority.setdefault(label, {}).setdefault(topic, 0)
+        majority[label][topic] += 1
+    purity = sum(max(counts.values()) for counts in majority.values()) / items
+    found = sum(1 for row in duplicate_of if row in copies)
+    print(f"{items} texts of {text_chars} chars, {topics} topics, {dimensions} dimensions")
+    print(f"Vectors {hashed - started:.2f}s, k-means {clustered - hashed:.2f}s ({len(majority)} clusters, purity {purity:.1%}), "
+          f"duplicates {finished - clustered:.2f}s ({found}/{len(copies)} injected found, {len(duplicate_of) - found} others)")
+    print(f"Total {finished - started:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark hashed n-gram clustering and near-duplicate detection')
+    parser.add_argument('--items', type=int, default=100000)
+    parser.add_argument('--topics', type=int, default=50)
+    parser.add_argument('--chars', type=int, default=2000)
+    parser.add_argument('--duplicate-every', type=int, default=20)
+    parser.add_argument('--dimensions', type=int, default=512)
+    args = parser.parse_args()
+    if not available():
+        parser.error('NumPy is required')
+    benchmark(args.items, args.topics, args.chars, args.duplicate_every, args.dimensions)
@@ -0,0 +1,324 @@
+import argparse
+import heapq
+import math
+import mmap
+import os
+import random
+import re
+import struct
+import tempfile
+import time
+from array import array
+from collections import Counter
+
+import knowledge_file
+
+# BM25 index over the chunks of a knowledge file, stored beside it as <output>.bm25:
+#
+#     header        MAGIC, version, flags, chunk count, term count, average chunk length, then (offset, length) of each section
+#     lengths       uint32 token count per chunk
+#     terms         string table of every term, sorted by UTF-8 bytes so a term is found by binary search
+#     term_records  one TERM_RECORD per term: where its postings start and how many there are
+#     postings      per term, the chunk numbers (uint32, ascending) followed by the term frequencies (uint16, capped)
+#
+# Opening an index reads the header only; a query binary-searches its terms in
+# the mapping and reads just their postings.
+
+MAGIC = b'SGPTBM25'
+VERSION = (1, 0)
+EXTENSION = '.bm25'
+
+SECTIONS = ('lengths', 'terms', 'term_records', 'postings')
+HEADER = struct.Struct('<8sHHIIId' + 'QQ' * len(SECTIONS))
+TERM_RECORD = struct.Struct('<QI4x')
+
+# BM25 term frequency saturation and length normalization
+K1 = 1.2
+B = 0.75
+
+TOKEN = re.compile(r'\w+')
+MAX_TOKEN_CHARS = 64
+
+# Term frequencies are stored as uint16; BM25 saturates long before this
+MAX_FREQUENCY = 0xFFFF
+
+# Chunk metadata indexed with the chunk's text
+METADATA_FIELDS = ('title', 'file_name', 'url')
+
+
+def tokenize(text):
+    """Lowercase word tokens, skipping single characters and overlong runs such as base64."""
+    return [token for token in TOKEN.findall(text.lower()) if 1 < len(token) <= MAX_TOKEN_CHARS]
+
+
+def index_path(knowledge_path):
+    return os.path.splitext(knowledge_path)[0] + EXTENSION
+
+
+def chunk_tokens(knowledge, index):
+    if knowledge.encoding(index) == 'binary':
+        return []
+    metadata = knowledge.metadata(index)
+    labels = ' '.join(str(metadata[field]) for field in METADATA_FIELDS if metadata.get(field))
+    return tokenize(f"{labels} {knowledge.text(index)}")
+
+
+def build(knowledge_path, output_file=None):
+    """Index every text and JSON chunk of a knowledge file, returns (index path, {'chunks', 'terms', 'bytes'})."""
+    output_file = output_file or index_path(knowledge_path)
+    postings = {}
+    lengths = array('I')
+
+    with knowledge_file.KnowledgeFile(knowledge_path) as knowledge:
+        for chunk in range(len(knowledge)):
+            counts = Counter(chunk_tokens(knowledge, chunk))
+            lengths.append(sum(counts.values()))
+            for term, frequency in counts.items():
+                entry = postings.get(term)
+                if entry is None:
+                    entry = postings[term] = (array('I'), array('H'))
+                entry[0].append(chunk)
+                entry[1].append(min(frequency, MAX_FREQUENCY))
+
+    terms = sorted(postings, key=lambda term: term.encode('utf-8'))
+    term_table = knowledge_file.StringTable(deduplicate=False)
+    records = bytearray()
+    offset = 0
+    postings_file = output_file + '.postings'
+    with open(postings_file, 'wb') as file:
+        for term in terms:
+            chunks, frequencies = postings.pop(term)
+            term_table.add(term)
+            records += TERM_RECORD.pack(offset, len(chunks))
+            chunks.tofile(file)
+            frequencies.tofile(file)
+            offset += 6 * len(chunks)
+
+    average = sum(lengths) / len(lengths) if lengths else 0.0
+    sections = [lengths.tobytes(), term_table.to_bytes(), bytes(records)]
+    table = []
+    position = HEADER.size
+    for data in sections:
+        table += [position, len(data)]
+        position += len(data)
+    table += [position, offset]
+
+    with open(output_file, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, *VERSION, 0, len(lengths), len(terms), average, *table))
+        for data in sections:
+            file.write(data)
+        with open(postings_file, 'rb') as postings_data:
+            while True:
+                block = postings_data.read(1024 * 1024)
+                if not block:
+                    break
+                file.write(block)
+    os.remove(postings_file)
+    return output_file, {'chunks': len(lengths), 'terms': len(terms), 'bytes': position + offset}
+
+
+class ChunkIndex:
+    """
+    A persisted BM25 index, mapped read-only.
+
+    Terms are looked up by binary search in the mapping, so nothing is loaded
+    up front; per-chunk length norms are computed on the first search.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.file.close()
+            raise ValueError(f"{path} is not a chunk index")
+        if len(self.map) < HEADER.size or self.map[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a chunk index")
+        fields = HEADER.unpack_from(self.map, 0)
+        if fields[1] != VERSION[0]:
+            self.close()
+            raise ValueError(f"{path}: unsupported chunk index version {fields[1]}.{fields[2]}")
+        self.chunk_count, self.term_count, self.average_length = fields[4:7]
+        self.sections = {name: (fields[7 + 2 * idx], fields[8 + 2 * idx]) for idx, name in enumerate(SECTIONS)}
+        self.norms = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        if getattr(self, 'map', None) is not None:
+            self.map.close()
+            self.map = None
+        self.file.close()
+
+    def _term(self, index):
+        return knowledge_file.string_entry(self.map, self.sections['terms'][0], index, 'terms')
+
+    def find(self, term):
+        """Number of `term` in the term table, or None."""
+        key = term.encode('utf-8')
+        low, high = 0, self.term_count
+        while low < high:
+            middle = (low + high) // 2
+            if self._term(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low if low < self.term_count and self._term(low) == key else None
+
+    def postings(self, term):
+        """(chunk numbers, term frequencies) arrays for `term`, empty if it is not indexed."""
+        index = self.find(term)
+        chunks, frequencies = array('I'), array('H')
+        if index is None:
+            return chunks, frequencies
+        offset, count = TERM_RECORD.unpack_from(self.map, self.sections['term_records'][0] + index * TERM_RECORD.size)
+        start = self.sections['postings'][0] + offset
+        chunks.frombytes(self.map[start:start + 4 * count])
+        frequencies.frombytes(self.map[start + 4 * count:start + 6 * count])
+        return chunks, frequencies
+
+    def _norms(self):
+        if self.norms is None:
+            offset, length = self.sections['lengths']
+            lengths = array('I')
+            lengths.frombytes(self.map[offset:offset + length])
+            average = self.average_length or 1.0
+            self.norms = [K1 * (1 - B + B * chunk_length / average) for chunk_length in lengths]
+        return self.norms
+
+    def search(self, query, limit=10):
+        """The `limit` best (score, chunk) pairs for the query's terms by BM25, best first."""
+        norms = self._norms()
+        scores = {}
+        for term in set(tokenize(query)):
+            chunks, frequencies = self.postings(term)
+            if not chunks:
+                continue
+            idf = math.log(1 + (self.chunk_count - len(chunks) + 0.5) / (len(chunks) + 0.5))
+            weight = idf * (K1 + 1)
+            get = scores.get
+            for chunk, frequency in zip(chunks, frequencies):
+                scores[chunk] = get(chunk, 0.0) + weight * frequency / (frequency + norms[chunk])
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+        return [(score, chunk) for chunk, score in best]
+
+
+def snippet(text, query, width=160):
+    """About `width` characters of text around the first query term found in it."""
+    lowered = text.lower()
+    positions = [position for position in (lowered.find(term) for term in tokenize(query)) if position >= 0]
+    start = max(0, min(positions) - width // 4) if positions else 0
+    excerpt = ' '.join(text[start:start + width].split())
+    return ('...' if start else '') + excerpt + ('...' if start + width < len(text) else '')
+
+
+def query(knowledge_path, text, limit=10):
+    """Top chunks for `text` with their scores, sources, metadata and a snippet; builds the index if it is missing."""
+    path = index_path(knowledge_path)
+    if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(knowledge_path):
+        build(knowledge_path, path)
+    results = []
+    with ChunkIndex(path) as index, knowledge_file.KnowledgeFile(knowledge_path) as knowledge:
+        for score, chunk in index.search(text, limit):
+            results.append({
+                'chunk': chunk,
+                'score': score,
+                'source': knowledge.source(chunk),
+                'metadata': knowledge.metadata(chunk),
+                'snippet': snippet(knowledge.text(chunk), text),
+            })
+    return results
+
+
+# A knowledge file of `chunks` random-word text chunks, for the benchmark
+def make_fixture(knowledge_path, chunks, chunk_bytes):
+    rng = random.Random(0)
+    vocabulary = [''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(3, 9))) for _ in range(20000)]
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    organized = {'metadata': {}, 'data': {'text': {}}}
+    for idx in range(chunks):
+        key = f"file_{idx}_txt"
+        words = rng.choices(vocabulary, weights, k=chunk_bytes // 7)
+        organized['metadata'][key] = {'type': 'text', 'file_name': f"file_{idx}.txt", 'source': f"source/dir_{idx % 100}"}
+        organized['data']['text'][key] = {'content': ' '.join(words)}
+    knowledge_file.write(organized, knowledge_path, project='benchmark')
+    return vocabulary
+
+
+def benchmark(chunks, chunk_bytes, queries):
+    work_dir = tempfile.mkdtemp()
+    try:
+        knowledge_path = os.path.join(work_dir, 'benchmark' + knowledge_file.EXTENSION)
+        vocabulary = make_fixture(knowledge_path, chunks, chunk_bytes)
+
+        started = time.perf_counter()
+        path, stats = build(knowledge_path)
+        print(f"Indexed {stats['chunks']} chunks, {stats['terms']} terms, {stats['bytes'] / 1024 ** 2:.1f} MB in {time.perf_counter() - started:.2f}s")
+
+        rng = random.Random(1)
+        # Mixes of frequent and rare words, like real queries
+        texts = [' '.join([rng.choice(vocabulary[:100]), rng.choice(vocabulary[100:5000]), rng.choice(vocabulary[5000:])]) for _ in range(queries)]
+        started = time.perf_counter()
+        with ChunkIndex(path) as index:
+            opened = time.perf_counter() - started
+            timings = []
+            for text in texts:
+                began = time.perf_counter()
+                index.search(text, 10)
+                timings.append(time.perf_counter() - began)
+        first = timings[0]
+        timings.sort()
+        print(f"Open {opened * 1000:.2f} ms, first query {first * 1000:.1f} ms, "
+              f"median {timings[len(timings) // 2] * 1000:.1f} ms, p95 {timings[int(len(timings) * 0.95)] * 1000:.1f} ms over {queries} queries")
+    finally:
+        for name in os.listdir(work_dir):
+            os.remove(os.path.join(work_dir, name))
+        os.rmdir(work_dir)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Search the chunks of a compiled knowledge file')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    query_parser = commands.add_parser('query', help='Print the best matching chunks')
+    query_parser.add_argument('path', help='Knowledge file (.kf)')
+    query_parser.add_argument('text', nargs='+', help='Query words')
+    query_parser.add_argument('-k', '--limit', type=int, default=10, help='Number of chunks to return')
+
+    build_parser = commands.add_parser('build', help='(Re)build the index of a knowledge file')
+    build_parser.add_argument('path', help='Knowledge file (.kf)')
+
+    bench = commands.add_parser('benchmark', help='Time indexing and queries on generated chunks')
+    bench.add_argument('--chunks', type=int, default=100000)
+    bench.add_argument('--chunk-bytes', type=int, default=2048)
+    bench.add_argument('--queries', type=int, default=200)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.command == 'benchmark':
+        benchmark(args.chunks, args.chunk_bytes, args.queries)
+    elif args.command == 'build':
+        path, stats = build(args.path)
+        print(f"{path}: {stats['chunks']} chunks, {stats['terms']} terms, {stats['bytes']} bytes")
+    elif args.command == 'query':
+        text = ' '.join(args.text)
+        started = time.perf_counter()
+        results = query(args.path, text, args.limit)
+        for rank, result in enumerate(results, 1):
+            metadata = result['metadata']
+            label = metadata.get('title') or metadata.get('file_name') or metadata.get('key', '')
+            print(f"{rank:>2}. [{result['score']:.2f}] chunk {result['chunk']} {label} ({result['source'] or metadata.get('type', '')})")
+            print(f"    {result['snippet']}")
+        print(f"{len(results)} results in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+import bz2
+import csv
+import gzip
+import io
+import lzma
+import os
+import struct
+
+import json_stream
+
+# Single-file compression formats, opened as binary streams that decompress on read
+COMPRESSION_OPENERS = {
+    '.gz': gzip.open,
+    '.bz2': bz2.open,
+    '.xz': lzma.open,
+    '.lzma': lzma.open,
+}
+
+# Magic bytes of the compressed container, used when the extension is missing or wrong
+COMPRESSION_MAGIC = [
+    (b'\x1f\x8b', '.gz'),
+    (b'BZh', '.bz2'),
+    (b'\xfd7zXZ\x00', '.xz'),
+]
+
+# Inner extensions the streaming parsers understand, everything else is spooled to a temp file
+TEXT_EXTENSIONS = ['.txt', '.log', '.md', '.py', '.ts', '.js', '.html', '.htm', '.php', '.xaml', '.sql', '']
+CSV_EXTENSIONS = ['.csv', '.tsv']
+JSON_EXTENSIONS = ['.json']
+XML_EXTENSIONS = ['.xml']
+TAR_EXTENSIONS = ['.tar']
+
+# Magic bytes of the decompressed payload for formats that need a real file
+FILE_MAGIC = [
+    (b'%PDF', '.pdf'),
+    (b'\x89PNG', '.png'),
+    (b'\xff\xd8\xff', '.jpeg'),
+    (b'GIF8', '.gif'),
+    (b'BM', '.bmp'),
+    (b'PK\x03\x04', '.zip'),
+    (b'7z\xbc\xaf\x27\x1c', '.7z'),
+]
+
+SNIFF_BYTES = 64 * 1024
+COPY_BUFFER_BYTES = 1024 * 1024
+
+
+class UnsupportedCompressionError(Exception):
+    pass
+
+
+class TextChunks(dict):
+    """A decompressed text payload read block by block into line-aligned chunks."""
+
+
+# Work out the compression format from the extension, falling back to the magic bytes
+def compression_extension(file_path):
+    _, ext = os.path.splitext(file_path)
+    if ext.lower() in COMPRESSION_OPENERS:
+        return ext.lower()
+    with open(file_path, 'rb') as file:
+        head = file.read(8)
+    for magic, magic_ext in COMPRESSION_MAGIC:
+        if head.startswith(magic):
+            return magic_ext
+    return None
+
+
+def open_compressed(file_path):
+    """Open a single-file compressed source as a binary stream that decompresses on read."""
+    ext = compression_extension(file_path)
+    if ext is None:
+        raise UnsupportedCompressionError(f"Not a supported compressed file: {file_path}")
+    return COMPRESSION_OPENERS[ext](file_path, 'rb')
+
+
+def gzip_original_name(file_path):
+    """Read the original file name stored in a gzip header (FNAME), if the writer recorded one."""
+    with open(file_path, 'rb') as file:
+        header = file.read(10)
+        if len(header) < 10 or header[:2] != b'\x1f\x8b':
+            return None
+        flags = header[3]
+        if flags & 0x04:  # FEXTRA
+            extra_length = struct.unpack('<H', file.read(2))[0]
+            file.seek(extra_length, os.SEEK_CUR)
+        if not flags & 0x08:  # FNAME
+            return None
+        name = bytearray()
+        while True:
+            byte = file.read(1)
+            if not byte or byte == b'\x00':
+                break
+            name += byte
+    return os.path.basename(name.decode('latin-1')) or None
+
+
+def inner_name(file_path):
+    """Name of the file inside the compressed source: gzip header name, else the path minus its compression suffix."""
+    base_name = os.path.basename(file_path)
+    if compression_extension(file_path) == '.gz':
+        original_name = gzip_original_name(file_path)
+        if original_name:
+            base_name = original_name
+            if not original_name.lower().endswith('.tgz'):
+                return original_name
+
+    stem, ext = os.path.splitext(base_name)
+    if ext.lower() in COMPRESSION_OPENERS:
+        return stem
+    if ext.lower() == '.tgz':
+        return stem + '.tar'
+    return stem
+
+
+def sniff_inner_type(name, head):
+    """
+    Classify the decompressed payload as 'text', 'csv', 'json', 'xml', 'tar' or a file extension.
+
+    The inner file name wins when it has a known extension; otherwise the first
+    decompressed bytes decide.
+    """
+    _, ext = os.path.splitext(name)
+    ext = ext.lower()
+    if ext and ext in TEXT_EXTENSIONS:
+        return 'text'
+    if ext in CSV_EXTENSIONS:
+        return 'csv'
+    if ext in JSON_EXTENSIONS:
+        return 'json'
+    if ext in XML_EXTENSIONS:
+        return 'xml'
+    if ext in TAR_EXTENSIONS:
+        return 'tar'
+    if ext:
+        return ext
+
+    for magic, magic_ext in FILE_MAGIC:
+        if head.startswith(magic):
+            return magic_ext
+    if head[257:262] == b'ustar':
+        return 'tar'
+
+    try:
+        sample = head.decode('utf-8')
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut off at the end of the sample is still text
+        if e.start < len(head) - 4:
+            return '.bin'
+        sample = head[:e.start].decode('utf-8')
+
+    if sample.lstrip()[:1] in ('{', '['):
+        return 'json'
+    if sample.lstrip().startswith('<?xml'):
+        return 'xml'
+    if looks_like_csv(sample):
+        return 'csv'
+    return 'text'
+
+
+def sniff_csv_delimiter(sample):
+    """Return the delimiter if every full line of the sample splits into the same number of fields, else None."""
+    lines = [line for line in sample.splitlines()[:20] if line.strip()]
+    if len(lines) < 2:
+        return None
+    try:
+        dialect = csv.Sniffer().sniff('\n'.join(lines), delimiters=',\t;|')
+    except csv.Error:
+        return None
+    counts = {line.count(dialect.delimiter) for line in lines[:-1]}
+    if len(counts) == 1 and counts.pop() > 0:
+        return dialect.delimiter
+    return None
+
+
+def looks_like_csv(sample):
+    return sniff_csv_delimiter(sample) is not None
+
+
+def csv_delimiter(name, head):
+    if name.lower().endswith('.tsv'):
+        return '\t'
+    return sniff_csv_delimiter(head.decode('utf-8', errors='ignore')) or ','
+
+
+def open_payload(file_path):
+    """Open the decompressed payload, returning (buffered binary stream, inner name, inner type)."""
+    stream = io.BufferedReader(open_compressed(file_path), buffer_size=SNIFF_BYTES)
+    try:
+        name = inner_name(file_path)
+        return stream, name, sniff_inner_type(name, stream.peek(SNIFF_BYTES)[:SNIFF_BYTES])
+    except BaseException:
+        # A corrupt payload usually fails on the first read, before the caller owns the stream
+        stream.close()
+        raise
+
+
+def text_stream(stream, newline=None):
+    return io.TextIOWrapper(stream, encoding='utf-8', errors='replace', newline=newline)
+
+
+def read_text_chunks(text_file, max_chunk_bytes, spill_dir=None):
+    """
+    Read a text stream in blocks of max_chunk_bytes characters into a TextChunks.
+
+    Each block is cut after its last line end and the rest carried into the
+    next, so lines stay whole unless a block has no line end at all. Once
+    there is more than one chunk they are spilled to spill_dir, so the payload
+    is never held in memory whole.
+    """
+    spiller = json_stream.ListSpiller(spill_dir, 'text')
+    pending = ''
+    while True:
+        block = text_file.read(max_chunk_bytes)
+        pending += block
+        # A short read is the end of the stream
+        if len(block) < max_chunk_bytes:
+            break
+        cut = pending.rfind('\n') + 1 or len(pending)
+        spiller.append(pending[:cut])
+        pending = pending[cut:]
+    if pending:
+        spiller.append(pending)
+    return TextChunks(chunks=spiller.close(), chunk_count=spiller.item_count)
+
+
+def copy_to_file(stream, destination_path):
+    """Spool the decompressed payload to disk in fixed-size blocks for parsers that need a real file."""
+    with open(destination_path, 'wb') as out_file:
+        while True:
+            block = stream.read(COPY_BUFFER_BYTES)
+            if not block:
+                break
+            out_file.write(block)
+    return destination_path
@@ -0,0 +1,193 @@
+import itertools
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import html_text
+import json_incremental
+import json_stream
+import url_normalize
+
+# Records handed to the worker pool at a time, so a large crawl is never held in memory whole
+BATCH_RECORDS = 256
+
+MARKUP = re.compile(r'<(?:html|body|div|p|h[1-6]|ul|ol|li|a|span|br|section|article|table)\b', re.IGNORECASE)
+
+
+class CrawlRecords(dict):
+    """Pages of one crawl output (file or directory), each chunked as its own text unit."""
+
+
+def is_crawl_record(value):
+    """gpt-crawler records are objects with a url and an html field (the page text)."""
+    return isinstance(value, dict) and 'url' in value and 'html' in value
+
+
+def page_text(record):
+    """The page's text; real markup (from crawlers that keep HTML) is converted with html_text."""
+    text = record.get('html') or ''
+    if MARKUP.search(text[:4096]):
+        return html_text.html_to_text(text)
+    return text.strip()
+
+
+def chunk_text(text, max_chunk_bytes):
+    """Split text into chunks of at most max_chunk_bytes, at paragraph, then line, then character boundaries."""
+    if len(text.encode('utf-8')) <= max_chunk_bytes:
+        return [text] if text else []
+
+    chunks = []
+    current = []
+    current_bytes = 0
+    for piece in re.split(r'(\n\n|\n)', text):
+        piece_bytes = len(piece.encode('utf-8'))
+        if current and current_bytes + piece_bytes > max_chunk_bytes:
+            chunks.append(''.join(current).strip('\n'))
+            current, current_bytes = [], 0
+        while piece_bytes > max_chunk_bytes:
+            # A single line longer than a chunk: cut it, never splitting a character
+            cut = piece.encode('utf-8')[:max_chunk_bytes].decode('utf-8', errors='ignore')
+            chunks.append(cut)
+            piece = piece[len(cut):]
+            piece_bytes = len(piece.encode('utf-8'))
+        current.append(piece)
+        current_bytes += piece_bytes
+    if current and ''.join(current).strip('\n'):
+        chunks.append(''.join(current).strip('\n'))
+    return [chunk for chunk in chunks if chunk]
+
+
+def page_unit(record, max_chunk_bytes):
+    """One page as a text unit: its chunks plus title and URL as metadata."""
+    text = page_text(record)
+    chunks = chunk_text(text, max_chunk_bytes)
+    return {
+        'title': record.get('title', ''),
+        'url': record['url'],
+        'chunks': chunks,
+        'metadata': {'chunk_count': len(chunks), 'text_bytes': len(text.encode('utf-8'))},
+    }
+
+
+def in_worker_process():
+    """True inside a multiprocessing worker, where starting another pool would multiply the process count."""
+    return multiprocessing.parent_process() is not None
+
+
+def ingest(records, max_chunk_bytes, spill_dir=None, workers=1, seen=None, executor=None):
+    """
+    Turn a stream of crawl records into a CrawlRecords of page units.
+
+    Pages are converted and chunked in `executor`, BATCH_RECORDS at a time,
+    and collected in input order; page units beyond the first are spilled to
+    spill_dir. URLs already in `seen` are skipped as duplicates. Without an
+    executor, a pool of `workers` processes is started for the call, unless
+    this already is a pool worker, where pages are chunked inline.
+    """
+    seen = set() if seen is None else seen
+    pages = json_stream.ListSpiller(spill_dir, 'crawl')
+    stats = {'page_count': 0, 'chunk_count': 0, 'duplicates': 0}
+    make_unit = partial(page_unit, max_chunk_bytes=max_chunk_bytes)
+
+    def unique(records):
+        for record in records:
+            url = url_normalize.normalize_url(record['url'])
+            if url in seen:
+                stats['duplicates'] += 1
+                continue
+            seen.add(url)
+            yield dict(record, url=url)
+
+    own_executor = executor is None and workers > 1 and not in_worker_process()
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        records = unique(records)
+        while True:
+            batch = list(itertools.islice(records, BATCH_RECORDS))
+            if not batch:
+                break
+            units = executor.map(make_unit, batch, chunksize=max(1, len(batch) // (workers * 4))) if executor else map(make_unit, batch)
+            for unit in units:
+                pages.append(unit)
+                stats['page_count'] += 1
+                stats['chunk_count'] += unit['metadata']['chunk_count']
+    finally:
+        if own_executor:
+            executor.shutdown()
+
+    return CrawlRecords(stats, pages=pages.close())
+
+
+def iter_records(text_file):
+    """Stream the crawl records of an open JSON file, skipping anything that is not one."""
+    root_type, elements = json_incremental.open_elements(text_file)
+    if root_type != 'array':
+        return
+    for _, _, value, _ in elements:
+        if is_crawl_record(value):
+            yield value
+
+
+def load(text_file, json_chunk_bytes, max_chunk_bytes, spill_dir=None, workers=1, executor=None):
+    """
+    Read a JSON document, ingesting it as pages if it is crawl output.
+
+    Only the first element is looked at before deciding; anything else is
+    handed on to json_incremental and chunked as ordinary JSON.
+    """
+    root_type, elements = json_incremental.open_elements(text_file)
+    first = next(elements, None)
+    if root_type == 'array' and first is not None and is_crawl_record(first[2]):
+        records = (value for _, _, value, _ in itertools.chain([first], elements) if is_crawl_record(value))
+        return ingest(records, max_chunk_bytes, spill_dir, workers, executor=executor)
+    if first is not None:
+        elements = itertools.chain([first], elements)
+    return json_incremental.chunk_elements(root_type, elements, json_chunk_bytes, spill_dir)
+
+
+def sniff_file(file_path):
+    """True if the file is a JSON array whose first element is a crawl record; only that element is read."""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as file:
+            root_type, elements = json_incremental.open_elements(file)
+            if root_type != 'array':
+                return False
+            first = next(elements, None)
+            return first is not None and is_crawl_record(first[2])
+    except (OSError, ValueError):
+        return False
+
+
+def crawl_files(directory):
+    """Crawl output files in a crawl output directory and its merged/ folder, newest first."""
+    paths = []
+    for folder in [directory, os.path.join(directory, 'merged')]:
+        if not os.path.isdir(folder):
+            continue
+        for name in os.listdir(folder):
+            path = os.path.join(folder, name)
+            if name.endswith('.json') and not name.endswith('.index.json') and os.path.isfile(path) and sniff_file(path):
+                paths.append(path)
+    return sorted(paths, key=lambda path: (os.path.getmtime(path), path), reverse=True)
+
+
+def load_directory(directory, max_chunk_bytes, spill_dir=None, workers=1, executor=None):
+    """
+    Ingest every crawl run in a crawl output directory as one source.
+
+    Runs are read newest first and each URL is kept once, so pages repeated
+    across runs come from the most recent crawl.
+    """
+    paths = crawl_files(directory)
+
+    def records():
+        for path in paths:
+            with open(path, 'r', encoding='utf-8') as file:
+                yield from iter_records(file)
+
+    result = ingest(records(), max_chunk_bytes, spill_dir, workers, executor=executor)
+    result['runs'] = [os.path.relpath(path, directory) for path in paths]
+    return result
@@ -0,0 +1,121 @@
+import csv
+import io
+import itertools
+
+import json_stream
+
+SNIFF_CHARS = 64 * 1024
+SAMPLE_ROWS = 1000
+
+BOOLEAN_VALUES = {'true', 'false', 'yes', 'no'}
+
+
+def value_type(value):
+    try:
+        int(value)
+        return 'int'
+    except ValueError:
+        pass
+    try:
+        float(value)
+        return 'float'
+    except ValueError:
+        pass
+    if value.lower() in BOOLEAN_VALUES:
+        return 'bool'
+    return 'str'
+
+
+def infer_columns(header, sample_rows):
+    """Name and type for every column, the type being the narrowest one all sampled values fit."""
+    width = max([len(header)] + [len(row) for row in sample_rows])
+    columns = []
+    for idx in range(width):
+        seen = {value_type(row[idx].strip()) for row in sample_rows if idx < len(row) and row[idx].strip()}
+        if not seen:
+            column_type = 'empty'
+        elif seen <= {'int', 'float'}:
+            column_type = 'float' if 'float' in seen else 'int'
+        elif len(seen) == 1:
+            column_type = seen.pop()
+        else:
+            column_type = 'str'
+        name = header[idx] if idx < len(header) else f"column_{idx + 1}"
+        columns.append({'name': name, 'type': column_type})
+    return columns
+
+
+def sniff_dialect(sample, delimiter=None):
+    """Return (dialect, has_header) for a text sample, falling back to the excel dialects."""
+    sniffer = csv.Sniffer()
+    try:
+        dialect = sniffer.sniff(sample, delimiters=delimiter or ',\t;|')
+    except csv.Error:
+        dialect = csv.excel_tab if delimiter == '\t' else csv.excel
+    try:
+        has_header = sniffer.has_header(sample)
+    except csv.Error:
+        has_header = True
+    return dialect, has_header
+
+
+class CSVIngestor:
+    """
+    Streams a CSV into row batches no larger than max_batch_bytes.
+
+    Dialect, header and column types come from a sample at the start of the
+    file. The first batch is kept in memory; once a second one is needed all
+    batches are spilled to a JSON-lines file in spill_dir, so memory stays at
+    one batch whatever the file size.
+    """
+
+    def __init__(self, max_batch_bytes, spill_dir=None, sample_rows=SAMPLE_ROWS):
+        self.max_batch_bytes = max(1, int(max_batch_bytes))
+        self.spill_dir = spill_dir
+        self.sample_rows = sample_rows
+
+    def ingest(self, text_file, delimiter=None):
+        """Read an open text file (opened with newline=''), returning (schema summary, batches)."""
+        sample = text_file.read(SNIFF_CHARS)
+        sample += text_file.readline()
+        dialect, has_header = sniff_dialect(sample, delimiter)
+
+        lines = itertools.chain(io.StringIO(sample, newline=''), text_file)
+        reader = csv.reader(lines, dialect)
+        header = next(reader, []) if has_header else []
+        sampled = list(itertools.islice(reader, self.sample_rows))
+        columns = infer_columns(header, sampled)
+
+        batches = json_stream.ListSpiller(self.spill_dir, 'csv')
+        batch = []
+        batch_bytes = 0
+        row_count = 0
+
+        try:
+            for row in itertools.chain(sampled, reader):
+                # Field lengths plus separators approximate the row's share of the chunk budget
+                row_bytes = sum(len(field) for field in row) + len(row)
+                if batch and batch_bytes + row_bytes > self.max_batch_bytes:
+                    batches.append(batch)
+                    batch, batch_bytes = [], 0
+                batch.append(row)
+                batch_bytes += row_bytes
+                row_count += 1
+            if batch:
+                batches.append(batch)
+        finally:
+            batch_list = batches.close()
+
+        schema = {
+            'delimiter': dialect.delimiter,
+            'has_header': has_header,
+            'columns': columns,
+            'row_count': row_count,
+            'batch_count': batches.item_count,
+        }
+        return schema, batch_list
+
+
+def ingest_file(file_path, max_batch_bytes, spill_dir=None, delimiter=None):
+    with open(file_path, 'r', newline='', encoding='utf-8', errors='replace') as file:
+        return CSVIngestor(max_batch_bytes, spill_dir).ingest(file, delimiter)
@@ -0,0 +1,176 @@
+import json
+import os
+import queue
+import threading
+
+CACHE_FILE = '.dir_size_cache.json'
+
+
+class DirectorySizeIndex:
+    """
+    Directory listings and recursive sizes, computed in a background thread.
+
+    listing() and size() never touch the filesystem: they return what is
+    known so far (None while it is still being computed) and queue the work.
+    Each directory's own file sizes and subdirectory names are cached by path
+    and mtime in CACHE_FILE, so a directory whose mtime has not changed is not
+    listed again; recursive sizes are summed from there, checking every
+    subdirectory's mtime, since a change deep down leaves its ancestors'
+    mtimes alone. Totals from the last run show straight away. A directory's
+    mtime only changes when entries are added, removed or renamed in it, so a
+    file rewritten in place keeps its old size until refresh() forgets the cache.
+    `version` grows with every new result, for callers deciding when to redraw.
+    """
+
+    def __init__(self, cache_file=CACHE_FILE):
+        self.cache_file = cache_file
+        self.cache = self._load_cache()
+        self.listings = {}
+        self.sizes = {path: entry[-1] for path, entry in self.cache.items()}
+        self.lock = threading.Lock()
+        self.requests = queue.LifoQueue()
+        self.requested = set()
+        self.pending = 0
+        self.version = 0
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as file:
+                cache = json.load(file)
+            # Entries are [mtime, own file bytes, subdirectory names, recursive total]
+            return {path: entry for path, entry in cache.items() if isinstance(entry, list) and len(entry) == 4} if isinstance(cache, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        with self.lock:
+            data = json.dumps(self.cache)
+        # Write next to the real file and swap it in so an interrupted save never leaves half a cache
+        temp_path = self.cache_file + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            file.write(data)
+        os.replace(temp_path, self.cache_file)
+
+    @property
+    def busy(self):
+        return self.pending > 0
+
+    def listing(self, directory):
+        """[(name, path, is_dir), ...] sorted directories first, or None while the directory is being read."""
+        listing = self.listings.get(directory)
+        if listing is None:
+            self.request(directory)
+        return listing
+
+    def size(self, path):
+        return self.sizes.get(path)
+
+    def request(self, directory):
+        with self.lock:
+            if directory in self.requested:
+                return
+            self.requested.add(directory)
+            self.pending += 1
+        self.requests.put(directory)
+
+    def refresh(self, directory):
+        """Forget everything known about directory and read it again."""
+        with self.lock:
+            prefix = os.path.join(directory, '')
+            for path in [path for path in self.cache if path == directory or path.startswith(prefix)]:
+                del self.cache[path]
+            self.listings.pop(directory, None)
+            self.requested.discard(directory)
+        self.request(directory)
+
+    def _publish(self, update):
+        with self.lock:
+            update()
+            self.version += 1
+
+    def _run(self):
+        while True:
+            directory = self.requests.get()
+            try:
+                self._scan(directory)
+            except Exception:
+                # Whatever went wrong, the directory gets a listing so the worker lives on and `busy` clears
+                self._publish(lambda: self.listings.__setitem__(directory, []))
+            finally:
+                with self.lock:
+                    self.pending -= 1
+                if not self.pending:
+                    try:
+                        self.save()
+                    except OSError:
+                        pass
+
+    def _scan(self, directory):
+        with os.scandir(directory) as it:
+            entries = [(entry.name, entry.path, entry.is_dir(follow_symlinks=False), entry) for entry in it]
+        entries.sort(key=lambda item: (not item[2], item[0].lower()))
+        self._publish(lambda: self.listings.__setitem__(directory, [(name, path, is_dir) for name, path, is_dir, _ in entries]))
+
+        # File sizes first, they are one stat each; then each directory's recursive size as it completes
+        for name, path, is_dir, entry in entries:
+            if not is_dir:
+                try:
+                    size = entry.stat(follow_symlinks=False).st_size
+                except OSError:
+                    size = 0
+                self._publish(lambda: self.sizes.__setitem__(path, size))
+        for name, path, is_dir, entry in entries:
+            if is_dir:
+                size = self._directory_size(path)
+                self._publish(lambda: self.sizes.__setitem__(path, size))
+
+    def _directory_size(self, directory):
+        # An explicit stack instead of recursion, so no tree is too deep to size
+        contents = {}
+        totals = {}
+        stack = [(directory, False)]
+        while stack:
+            path, expanded = stack.pop()
+            if expanded:
+                # Every subdirectory has been totalled by now
+                mtime, own, children = contents.pop(path)
+                total = own + sum(totals.pop(os.path.join(path, name)) for name in children)
+                with self.lock:
+                    self.cache[path] = [mtime, own, children, total]
+                totals[path] = total
+                continue
+            listed = self._directory_contents(path)
+            if listed is None:
+                totals[path] = 0
+                continue
+            contents[path] = listed
+            stack.append((path, True))
+            # Subdirectories are always visited: an unchanged mtime here says nothing about them
+            stack.extend((os.path.join(path, name), False) for name in listed[2])
+        return totals[directory]
+
+    def _directory_contents(self, directory):
+        """(mtime, own file bytes, subdirectory names) from the cache if the mtime matches, else listed; None if unreadable."""
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            return None
+        cached = self.cache.get(directory)
+        if cached and cached[0] == mtime:
+            return mtime, cached[1], cached[2]
+        own, children = 0, []
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            children.append(entry.name)
+                        elif entry.is_file(follow_symlinks=False):
+                            own += entry.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        continue
+        except OSError:
+            return None
+        return mtime, own, children
@@ -0,0 +1,173 @@
+import argparse
+import fnmatch
+import os
+import time
+import tracemalloc
+import zipfile
+from xml.etree import ElementTree as ET
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+BODY_PART = 'word/document.xml'
+
+# Extra parts read after the body, in this order
+EXTRA_PARTS = ['word/header*.xml', 'word/footer*.xml', 'word/footnotes.xml', 'word/endnotes.xml']
+
+
+def iter_part(xml_file):
+    """
+    Yield the text of a WordprocessingML part in document order.
+
+    Paragraphs come out as one string each and table rows as '| cell | cell |'.
+    Elements are cleared once they have been emitted, so memory does not grow
+    with the size of the part.
+    """
+    paragraph_stack = []
+    cell_stack = []
+    row_stack = []
+    container = None
+
+    for event, elem in ET.iterparse(xml_file, events=('start', 'end')):
+        tag = elem.tag
+        if event == 'start':
+            # Blocks hang off w:body in the document and off the root element in headers and notes
+            if container is None or tag == W + 'body':
+                container = elem
+            if tag == W + 'p':
+                paragraph_stack.append([])
+            elif tag == W + 'tr':
+                row_stack.append([])
+            elif tag == W + 'tc':
+                cell_stack.append([])
+            continue
+
+        if tag == W + 't' and paragraph_stack:
+            paragraph_stack[-1].append(elem.text or '')
+        elif tag == W + 'tab' and paragraph_stack:
+            paragraph_stack[-1].append('\t')
+        elif tag in (W + 'br', W + 'cr') and paragraph_stack:
+            paragraph_stack[-1].append('\n')
+        elif tag == W + 'p':
+            text = ''.join(paragraph_stack.pop())
+            if paragraph_stack:
+                # Text boxes nest paragraphs inside a run of the outer paragraph
+                paragraph_stack[-1].append(text)
+            elif cell_stack:
+                cell_stack[-1].append(text)
+            elif text.strip():
+                yield text
+        elif tag == W + 'tc':
+            cell_text = '\n'.join(text for text in cell_stack.pop() if text.strip())
+            if row_stack:
+                row_stack[-1].append(cell_text)
+        elif tag == W + 'tr':
+            row_text = '| ' + ' | '.join(row_stack.pop()) + ' |'
+            if cell_stack:
+                # Nested table: the row becomes part of the enclosing cell
+                cell_stack[-1].append(row_text)
+            else:
+                yield row_text
+
+        # Once a top-level block is done, drop it and everything before it
+        if tag in (W + 'p', W + 'tbl') and not paragraph_stack and not cell_stack:
+            elem.clear()
+            container.clear()
+
+
+def iter_text(file_path, include_extra_parts=True):
+    """Yield the body text of a .docx file, followed by headers, footers, footnotes and endnotes."""
+    with zipfile.ZipFile(file_path) as archive:
+        with archive.open(BODY_PART) as xml_file:
+            yield from iter_part(xml_file)
+
+        if not include_extra_parts:
+            return
+        names = archive.namelist()
+        for pattern in EXTRA_PARTS:
+            for name in sorted(fnmatch.filter(names, pattern)):
+                lines = []
+                with archive.open(name) as xml_file:
+                    lines.extend(iter_part(xml_file))
+                if lines:
+                    yield f"[{os.path.basename(name)}]"
+                    yield from lines
+
+
+def extract_text(file_path, include_extra_parts=True):
+    """List of paragraphs and table rows, the same shape parse_file used to build from python-docx."""
+    return list(iter_text(file_path, include_extra_parts))
+
+
+# Write a minimal .docx with paragraphs and tables, for the benchmark
+def make_fixture(file_path, paragraphs=20000, tables=200):
+    body = []
+    for idx in range(paragraphs):
+        body.append(f'<w:p><w:r><w:t>Paragraph {idx} with some text to read back.</w:t></w:r></w:p>')
+        if idx % (paragraphs // tables or 1) == 0:
+            rows = ''.join(
+                f'<w:tr><w:tc><w:p><w:r><w:t>row {row}</w:t></w:r></w:p></w:tc><w:tc><w:p><w:r><w:t>value {row}</w:t></w:r></w:p></w:tc></w:tr>'
+                for row in range(5)
+            )
+            body.append(f'<w:tbl>{rows}</w:tbl>')
+    document = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        f'<w:document xmlns:w="{W[1:-1]}"><w:body>{"".join(body)}</w:body></w:document>'
+    )
+    content_types = (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+        '</Types>'
+    )
+    rels = (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>'
+        '</Relationships>'
+    )
+    with zipfile.ZipFile(file_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', content_types)
+        archive.writestr('_rels/.rels', rels)
+        archive.writestr(BODY_PART, document)
+
+
+def measure(function, *args):
+    tracemalloc.start()
+    start_time = time.time()
+    result = function(*args)
+    elapsed = time.time() - start_time
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def python_docx_text(file_path):
+    from docx import Document
+    return [paragraph.text for paragraph in Document(file_path).paragraphs]
+
+
+def benchmark(paths):
+    for file_path in paths:
+        streamed, streamed_time, streamed_peak = measure(extract_text, file_path)
+        print(f"{os.path.basename(file_path)}")
+        print(f"  iterparse:   {streamed_time:.3f}s, peak {streamed_peak / 1024 / 1024:.1f} MB, {len(streamed)} lines")
+        try:
+            paragraphs, docx_time, docx_peak = measure(python_docx_text, file_path)
+            print(f"  python-docx: {docx_time:.3f}s, peak {docx_peak / 1024 / 1024:.1f} MB, {len(paragraphs)} paragraphs (no tables)")
+        except ImportError:
+            print("  python-docx: not installed")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark streamed DOCX extraction against python-docx')
+    parser.add_argument('paths', nargs='*', help='.docx files to extract')
+    parser.add_argument('--make-fixture', help='Write a generated .docx to this path and benchmark it')
+    args = parser.parse_args()
+
+    paths = list(args.paths)
+    if args.make_fixture:
+        make_fixture(args.make_fixture)
+        paths.append(args.make_fixture)
+    benchmark(paths)
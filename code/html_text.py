@@ -0,0 +1,231 @@
+import argparse
+import io
+import re
+import time
+from html.parser import HTMLParser
+
+READ_CHARS = 64 * 1024
+
+# Elements whose content never reaches the output
+SKIP_TAGS = {'script', 'style', 'nav', 'noscript', 'template', 'svg', 'iframe', 'head'}
+
+# Elements that start and end a block of text
+BLOCK_TAGS = {
+    'p', 'div', 'section', 'article', 'main', 'header', 'footer', 'aside', 'blockquote',
+    'table', 'thead', 'tbody', 'ul', 'ol', 'dl', 'dt', 'dd', 'form', 'figure', 'figcaption',
+    'address', 'details', 'summary', 'hr', 'br',
+}
+
+HEADING_TAGS = {'h1': 1, 'h2': 2, 'h3': 3, 'h4': 4, 'h5': 5, 'h6': 6}
+
+# Void elements never get an end tag, so they must not touch the skip depth
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'}
+
+WHITESPACE = re.compile(r'\s+')
+
+
+class HTMLTextExtractor(HTMLParser):
+    """
+    Converts HTML to plain text with lightweight markdown, in one pass over the input.
+
+    Script, style and navigation content is dropped. Headings become '#' lines,
+    list items '-' or '1.' lines, <pre> blocks fenced code and table rows
+    '| cell | cell |' lines; all other whitespace is collapsed. Input can be fed in
+    pieces; each piece is handled once, so the time is linear in the input size.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.line = []
+        self.prefix = ''
+        self.kind = None
+        self.last_kind = None
+        self.skip_depth = 0
+        self.pre_parts = None
+        self.lists = []
+        self.title_parts = None
+        self.title = ''
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'title':
+            self.title_parts = []
+        elif tag == 'body':
+            # </head> is optional, nothing before <body> can still be open
+            self.skip_depth = 0
+        if tag in SKIP_TAGS:
+            if tag not in VOID_TAGS:
+                self.skip_depth += 1
+            return
+        if self.skip_depth:
+            return
+
+        if self.pre_parts is not None:
+            return
+        if tag == 'pre':
+            self._break()
+            self.pre_parts = []
+        elif tag in HEADING_TAGS:
+            self._break()
+            self.prefix = '#' * HEADING_TAGS[tag] + ' '
+            self.kind = 'heading'
+        elif tag in ('ul', 'ol'):
+            self._break()
+            self.lists.append([tag == 'ol', 0])
+        elif tag == 'li':
+            self._break()
+            indent = '  ' * max(len(self.lists) - 1, 0)
+            if self.lists and self.lists[-1][0]:
+                self.lists[-1][1] += 1
+                marker = f"{self.lists[-1][1]}."
+            else:
+                marker = '-'
+            self.prefix = f"{indent}{marker} "
+            self.kind = 'list'
+        elif tag == 'tr':
+            self._break()
+            self.prefix = '| '
+            self.kind = 'row'
+        elif tag in ('td', 'th'):
+            if self.line:
+                self._append(' | ')
+        elif tag == 'code':
+            self._append('`')
+        elif tag in BLOCK_TAGS:
+            self._break()
+
+    def handle_startendtag(self, tag, attrs):
+        # <br/> and friends: a start tag with no content
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag == 'title' and self.title_parts is not None:
+            self.title = WHITESPACE.sub(' ', ''.join(self.title_parts)).strip()
+            self.title_parts = None
+        if tag in SKIP_TAGS:
+            if self.skip_depth and tag not in VOID_TAGS:
+                self.skip_depth -= 1
+            return
+        if self.skip_depth:
+            return
+
+        if self.pre_parts is not None:
+            if tag == 'pre':
+                code = ''.join(self.pre_parts).strip('\n')
+                self.pre_parts = None
+                if code.strip():
+                    self._emit(f"```\n{code}\n```", 'code')
+            return
+        if tag in HEADING_TAGS or tag in ('li', 'tr'):
+            self._break()
+        elif tag in ('ul', 'ol'):
+            self._break()
+            if self.lists:
+                self.lists.pop()
+        elif tag == 'code':
+            self._append('`')
+        elif tag in BLOCK_TAGS:
+            self._break()
+
+    def handle_data(self, data):
+        if self.title_parts is not None:
+            self.title_parts.append(data)
+        if self.skip_depth:
+            return
+        if self.pre_parts is not None:
+            self.pre_parts.append(data)
+            return
+        self._append(WHITESPACE.sub(' ', data))
+
+    def _append(self, text):
+        if not text:
+            return
+        # Collapse whitespace across the boundary between two pieces of data
+        if text[0] == ' ' and (not self.line or self.line[-1].endswith(' ')):
+            text = text[1:]
+            if not text:
+                return
+        self.line.append(text)
+
+    def _break(self):
+        text = ''.join(self.line).strip()
+        self.line = []
+        if text and text != '``':
+            suffix = ' |' if self.kind == 'row' else ''
+            self._emit(self.prefix + text + suffix, self.kind or 'text')
+        self.prefix = ''
+        self.kind = None
+
+    def _emit(self, block, kind):
+        if self.parts:
+            # Consecutive list items and table rows stay on adjacent lines
+            self.parts.append('\n' if kind == self.last_kind and kind in ('list', 'row') else '\n\n')
+        self.parts.append(block)
+        self.last_kind = kind
+
+    def close(self):
+        super().close()
+        self._break()
+
+    def text(self):
+        return ''.join(self.parts)
+
+
+def html_to_text(html):
+    """Text of an HTML document, see HTMLTextExtractor."""
+    extractor = HTMLTextExtractor()
+    extractor.feed(html)
+    extractor.close()
+    return extractor.text()
+
+
+def convert_file(text_file, read_chars=READ_CHARS):
+    """Text of an open HTML file, fed to the parser in blocks so the markup is never held whole."""
+    extractor = HTMLTextExtractor()
+    while True:
+        chunk = text_file.read(read_chars)
+        if not chunk:
+            break
+        extractor.feed(chunk)
+    extractor.close()
+    return extractor.text()
+
+
+# A documentation-like page repeated until it reaches `size_bytes`
+def make_fixture(size_bytes):
+    section = (
+        '<nav><ul><li><a href="/">Home</a></li><li><a href="/docs">Docs</a></li></ul></nav>'
+        '<script>var tracking = {"id": 1};</script><style>.a { color: red }</style>'
+        '<h2>Section title</h2><p>Some   <b>bold</b> text with <a href="#">a link</a> and &amp; entities.</p>'
+        '<ul><li>First item</li><li>Second item<ol><li>Nested</li></ol></li></ul>'
+        '<pre><code>def example():\n    return 42\n</code></pre>'
+        '<table><tr><th>Name</th><th>Value</th></tr><tr><td>a</td><td>1</td></tr></table>\n'
+    )
+    repeats = max(1, size_bytes // len(section))
+    return '<html><head><title>Fixture</title></head><body>' + section * repeats + '</body></html>'
+
+
+def benchmark(sizes_mb):
+    for size_mb in sizes_mb:
+        html = make_fixture(int(size_mb * 1024 * 1024))
+        start_time = time.time()
+        text = convert_file(io.StringIO(html))
+        elapsed = time.time() - start_time
+        throughput = len(html.encode('utf-8')) / 1024 / 1024 / elapsed if elapsed else 0
+        print(f"{size_mb} MB: {elapsed:.2f}s, {throughput:.1f} MB/s, {len(text) / len(html):.0%} of the input kept")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Measure HTML-to-text throughput')
+    parser.add_argument('paths', nargs='*', help='HTML files to convert and print instead of benchmarking')
+    parser.add_argument('--sizes', type=float, nargs='+', default=[1, 10, 50], help='Fixture sizes in MB')
+    args = parser.parse_args()
+
+    if args.paths:
+        for path in args.paths:
+            with open(path, 'r', encoding='utf-8', errors='replace') as file:
+                print(convert_file(file))
+    else:
+        benchmark(args.sizes)
@@ -0,0 +1,255 @@
+import argparse
+import fnmatch
+import os
+import re
+import time
+
+# Per-directory ignore files, later entries take precedence over earlier ones in the same directory
+IGNORE_FILES = ['.gitignore', '.ignore']
+
+GLOB_CHARS = set('*?[')
+
+
+class IgnoreRules:
+    """
+    IGNORE_NAMES compiled once: literal names go in a set, globs into a single regex.
+
+    Matches the same names as running fnmatch.fnmatch against every pattern.
+    """
+
+    def __init__(self, patterns):
+        patterns = [os.path.normcase(pattern) for pattern in patterns]
+        self.literals = {pattern for pattern in patterns if not GLOB_CHARS & set(pattern)}
+        globs = [pattern for pattern in patterns if GLOB_CHARS & set(pattern)]
+        self.regex = re.compile('|'.join(fnmatch.translate(pattern) for pattern in globs)) if globs else None
+
+    def matches(self, name):
+        name = os.path.normcase(name)
+        if name in self.literals:
+            return True
+        return bool(self.regex and self.regex.match(name))
+
+
+def translate_gitignore(pattern):
+    """Translate one gitignore glob (already stripped of '!' and trailing '/') into a regex over '/'-separated paths."""
+    anchored = '/' in pattern
+    pattern = pattern.lstrip('/')
+
+    parts = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith('**/', i):
+            parts.append('(?:.*/)?')
+            i += 3
+        elif pattern.startswith('/**', i) and i + 3 == len(pattern):
+            parts.append('/.*')
+            i += 3
+        elif pattern.startswith('**', i):
+            parts.append('.*')
+            i += 2
+        elif pattern[i] == '*':
+            parts.append('[^/]*')
+            i += 1
+        elif pattern[i] == '?':
+            parts.append('[^/]')
+            i += 1
+        elif pattern[i] == '[':
+            end = pattern.find(']', i + 2)
+            if end == -1:
+                parts.append(re.escape('['))
+                i += 1
+                continue
+            content = pattern[i + 1:end]
+            if content.startswith('!'):
+                content = '^' + content[1:]
+            parts.append('[' + content.replace('\\', '\\\\') + ']')
+            i = end + 1
+        elif pattern[i] == '\\' and i + 1 < len(pattern):
+            parts.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            parts.append(re.escape(pattern[i]))
+            i += 1
+
+    # Patterns without a slash match at any depth below the ignore file
+    prefix = '' if anchored else '(?:.*/)?'
+    return re.compile('^' + prefix + ''.join(parts) + '$', re.IGNORECASE if os.name == 'nt' else 0)
+
+
+def parse_ignore_file(file_path):
+    """Parse a .gitignore / .ignore file into (regex, negate, dir_only) rules, in file order."""
+    rules = []
+    try:
+        with open(file_path, 'r', encoding='utf-8', errors='replace') as file:
+            lines = file.read().splitlines()
+    except OSError:
+        return rules
+
+    for line in lines:
+        # Trailing spaces are ignored unless escaped
+        line = line.rstrip() if not line.endswith('\\ ') else line[:-2].rstrip() + '\\ '
+        if not line or line.startswith('#'):
+            continue
+        negate = line.startswith('!')
+        if negate:
+            line = line[1:]
+        elif line.startswith('\\!') or line.startswith('\\#'):
+            line = line[1:]
+        dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        if line:
+            rules.append((translate_gitignore(line), negate, dir_only))
+    return rules
+
+
+class IgnoreContext:
+    """
+    The ignore-file rules in force for one directory, chained to its parents.
+
+    Deeper directories are checked first and, within a directory, the last
+    matching rule wins, which gives git's precedence: later lines over earlier
+    ones, .ignore over .gitignore, and child directories over their parents.
+    """
+
+    def __init__(self, base_dir, rules, parent=None):
+        self.base_dir = base_dir
+        self.rules = rules
+        self.parent = parent
+
+    def child(self, directory):
+        rules = []
+        for ignore_file in IGNORE_FILES:
+            ignore_path = os.path.join(directory, ignore_file)
+            if os.path.isfile(ignore_path):
+                rules.extend(parse_ignore_file(ignore_path))
+        # Directories without ignore files share their parent's context
+        return IgnoreContext(directory, rules, self) if rules else self
+
+    def ignored(self, path, is_dir):
+        context = self
+        while context is not None:
+            # Entry paths are always built by joining onto base_dir, so slicing is enough
+            relative_path = path[len(context.base_dir):].lstrip(os.sep).replace(os.sep, '/')
+            for regex, negate, dir_only in reversed(context.rules):
+                if dir_only and not is_dir:
+                    continue
+                if regex.match(relative_path):
+                    return not negate
+            context = context.parent
+        return False
+
+
+class IgnoreMatcher:
+    """IGNORE_NAMES plus any .gitignore / .ignore files found while walking the tree."""
+
+    def __init__(self, patterns, use_ignore_files=True):
+        self.rules = IgnoreRules(patterns)
+        self.use_ignore_files = use_ignore_files
+
+    def matches(self, name):
+        return self.rules.matches(name)
+
+    def enter(self, directory, context=None):
+        """Context for `directory`, reading its ignore files on top of the parent's context."""
+        if not self.use_ignore_files:
+            return None
+        if context is None:
+            context = IgnoreContext(directory, [])
+        return context.child(directory)
+
+    def is_ignored(self, entry, context=None):
+        """Check an os.DirEntry against IGNORE_NAMES and the ignore-file rules."""
+        if self.rules.matches(entry.name):
+            return True
+        if context is None:
+            return False
+        return context.ignored(entry.path, entry.is_dir())
+
+    def scan(self, directory, context=None):
+        """List a directory's entries that are not ignored, returning (entries, context for the directory)."""
+        context = self.enter(directory, context)
+        with os.scandir(directory) as entries:
+            return [entry for entry in entries if not self.is_ignored(entry, context)], context
+
+    def walk(self, root):
+        """Yield the os.DirEntry of every non-ignored file, never listing ignored directories."""
+        stack = [(root, None)]
+        while stack:
+            directory, context = stack.pop()
+            try:
+                entries, context = self.scan(directory, context)
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append((entry.path, context))
+                elif entry.is_file():
+                    yield entry
+
+
+# The old approach: list every directory, fnmatch each entry against every pattern three times and stat it.
+# Ignore files are applied the same way as IgnoreMatcher does, so both sides of the benchmark see the same files
+def fnmatch_walk(root, patterns, context=None):
+    def matches(name):
+        return any(fnmatch.fnmatch(name, pattern) for pattern in patterns)
+
+    context = (context or IgnoreContext(root, [])).child(root)
+    for name in os.listdir(root):
+        if matches(name):
+            continue
+        path = os.path.join(root, name)
+        os.path.getsize(path)
+        if os.path.isdir(path):
+            if not matches(name) and not context.ignored(path, True):
+                yield from fnmatch_walk(path, patterns, context)
+        elif os.path.isfile(path):
+            if not matches(name) and not context.ignored(path, False):
+                yield path
+
+
+# Build a source tree with a large node_modules and a gitignored build output next to a few real files
+def make_fixture(root, packages=2000, files_per_package=10):
+    for idx in range(200):
+        os.makedirs(os.path.join(root, 'docs', f"section_{idx}"), exist_ok=True)
+        with open(os.path.join(root, 'docs', f"section_{idx}", 'index.md'), 'w') as file:
+            file.write(f"# Section {idx}\n")
+    for top in ['node_modules', 'build']:
+        for idx in range(packages):
+            package_dir = os.path.join(root, top, f"package_{idx}", 'lib')
+            os.makedirs(package_dir, exist_ok=True)
+            for file_idx in range(files_per_package):
+                open(os.path.join(package_dir, f"file_{file_idx}.js"), 'w').close()
+    with open(os.path.join(root, '.gitignore'), 'w') as file:
+        file.write("build/\n*.min.js\n")
+
+
+def benchmark(root, patterns):
+    start_time = time.time()
+    old_files = list(fnmatch_walk(root, patterns))
+    old_time = time.time() - start_time
+
+    start_time = time.time()
+    new_files = [entry.path for entry in IgnoreMatcher(patterns).walk(root)]
+    new_time = time.time() - start_time
+
+    if sorted(old_files) != sorted(new_files):
+        print(f"Warning: the two walks disagree ({len(set(old_files) ^ set(new_files))} files differ)")
+    print(f"fnmatch per pattern: {len(old_files)} files in {old_time:.3f}s")
+    print(f"compiled + pruning:  {len(new_files)} files in {new_time:.3f}s")
+    print(f"Speedup: {old_time / new_time if new_time else 0:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the compiled ignore matcher against per-pattern fnmatch')
+    parser.add_argument('root', help='Directory to walk')
+    parser.add_argument('--make-fixture', action='store_true', help='Create a tree with a large node_modules under root first')
+    parser.add_argument('--pattern', action='append', dest='patterns', help='Ignore name pattern, repeatable (default: IGNORE_NAMES from merge_zip_contents)')
+    args = parser.parse_args()
+
+    if args.patterns is None:
+        from merge_zip_contents import IGNORE_NAMES
+        args.patterns = IGNORE_NAMES
+
+    if args.make_fixture:
+        make_fixture(args.root)
+    benchmark(args.root, args.patterns)
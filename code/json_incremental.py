@@ -0,0 +1,188 @@
+import json
+import re
+
+import json_stream
+
+READ_CHARS = 64 * 1024
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+class ChunkedJSON(dict):
+    """A JSON document that was split into chunks element by element while it was read."""
+
+
+class _Reader:
+    """A sliding text buffer over a file that decodes one JSON value at a time."""
+
+    def __init__(self, text_file, read_chars=READ_CHARS):
+        self.text_file = text_file
+        self.read_chars = read_chars
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, chars):
+        chunk = self.text_file.read(chars)
+        if not chunk:
+            self.eof = True
+        # Drop what has been consumed so the buffer only holds the value being decoded
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+
+    def peek(self):
+        """Next non-whitespace character, or '' at the end of the file."""
+        while True:
+            self.pos = WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer) or self.eof:
+                return self.buffer[self.pos:self.pos + 1]
+            self.fill(self.read_chars)
+
+    def take(self, expected):
+        char = self.peek()
+        if char not in expected:
+            raise json.JSONDecodeError(f"Expecting one of {expected!r}", self.buffer, self.pos)
+        self.pos += 1
+        return char
+
+    def decode(self):
+        """Decode the next value, returning it with the number of characters it took in the source."""
+        self.peek()
+        chars = self.read_chars
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # A number or literal that ends with the buffer may continue in the next read
+                if end < len(self.buffer) or self.eof:
+                    size = end - self.pos
+                    self.pos = end
+                    return value, size
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # Grow reads geometrically so one large value is not re-scanned once per block
+            self.fill(chars)
+            chars *= 2
+
+
+def json_path(parent, key):
+    if isinstance(key, int):
+        return f"{parent}[{key}]"
+    if IDENTIFIER.match(key):
+        return f"{parent}.{key}"
+    return f"{parent}[{json.dumps(key, ensure_ascii=False)}]"
+
+
+def open_elements(text_file):
+    """
+    Start reading a JSON document, returning (root type, iterator of elements).
+
+    For a top-level array or object the iterator yields (path, key, value, size)
+    for each element or member in turn, size being its length in the source text.
+    Only the element currently being decoded is held in memory. Any other root
+    is yielded whole as a single '$' element.
+    """
+    reader = _Reader(text_file)
+    first = reader.peek()
+    root_type = 'array' if first == '[' else 'object' if first == '{' else 'scalar'
+
+    def elements():
+        if root_type == 'scalar':
+            value, size = reader.decode()
+            yield '$', None, value, size
+            return
+
+        reader.take('[{')
+        closing = ']' if root_type == 'array' else '}'
+        if reader.peek() == closing:
+            reader.take(closing)
+            return
+
+        idx = 0
+        while True:
+            if root_type == 'array':
+                key = idx
+            else:
+                key, _ = reader.decode()
+                reader.take(':')
+            value, size = reader.decode()
+            yield json_path('$', key), key, value, size
+            idx += 1
+            if reader.take(',' + closing) == closing:
+                return
+
+    return root_type, elements()
+
+
+def chunk_elements(root_type, elements, max_chunk_bytes, spill_dir=None):
+    """
+    Pack elements into chunks of at most max_chunk_bytes, keeping each element's JSON path.
+
+    Returns the plain value when everything fits in one chunk, otherwise a
+    ChunkedJSON whose chunks are spilled to spill_dir as they fill up.
+    """
+    chunks = json_stream.ListSpiller(spill_dir, 'json')
+    chunk = None
+    chunk_bytes = 0
+    element_count = 0
+    total_bytes = 0
+
+    for path, key, value, size in elements:
+        if root_type == 'scalar':
+            return value
+        if chunk is None or (chunk['metadata']['paths'] and chunk_bytes + size > max_chunk_bytes):
+            if chunk is not None:
+                chunks.append(chunk)
+            chunk = {'data': [] if root_type == 'array' else {}, 'metadata': {'chunk_number': chunks.item_count, 'paths': []}}
+            chunk_bytes = 0
+        if root_type == 'array':
+            chunk['data'].append(value)
+        else:
+            chunk['data'][key] = value
+        chunk['metadata']['paths'].append(path)
+        chunk_bytes += size
+        element_count += 1
+        total_bytes += size
+
+    if chunk is None:
+        chunks.close()
+        return [] if root_type == 'array' else {}
+    if chunks.item_count == 0:
+        chunks.close()
+        return chunk['data']
+
+    chunks.append(chunk)
+    return ChunkedJSON({
+        'root_type': root_type,
+        'element_count': element_count,
+        'chunk_count': chunks.item_count,
+        'source_bytes': total_bytes,
+        'chunks': chunks.close(),
+    })
+
+
+def load(text_file, max_chunk_bytes, spill_dir=None):
+    """Read a JSON document incrementally, chunking it element by element if it is larger than one chunk."""
+    root_type, elements = open_elements(text_file)
+    return chunk_elements(root_type, elements, max_chunk_bytes, spill_dir)
+
+
+def load_file(file_path, max_chunk_bytes, spill_dir=None):
+    with open(file_path, 'r', encoding='utf-8') as file:
+        return load(file, max_chunk_bytes, spill_dir)
+
+
+def chunk_value(value, max_chunk_bytes, spill_dir=None, compact=True):
+    """Chunk an already-loaded value the same way, measuring each element on its own."""
+    if isinstance(value, list):
+        root_type = 'array'
+        items = enumerate(value)
+    elif isinstance(value, dict):
+        root_type = 'object'
+        items = value.items()
+    else:
+        return value
+    elements = ((json_path('$', key), key, item, json_stream.serialized_size(item, compact=compact)) for key, item in items)
+    return chunk_elements(root_type, elements, max_chunk_bytes, spill_dir)
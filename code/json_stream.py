@@ -0,0 +1,229 @@
+import gzip
+import json
+import os
+import uuid
+from abc import ABC, abstractmethod
+
+WRITE_BUFFER_BYTES = 1024 * 1024
+
+
+class LazyList(ABC):
+    """
+    Base for values that are written as a JSON array by iterating them, e.g. data spilled to disk.
+
+    Subclasses give the items and their count; truthiness follows the count as for a list.
+    """
+
+    @abstractmethod
+    def __iter__(self):
+        pass
+
+    @abstractmethod
+    def __len__(self):
+        pass
+
+
+class SpilledList(LazyList):
+    """Items spilled to a JSON-lines file, read back one at a time when the output is written."""
+
+    def __init__(self, spill_path, item_count):
+        self.spill_path = spill_path
+        self.item_count = item_count
+
+    def __iter__(self):
+        with open(self.spill_path, 'r', encoding='utf-8') as file:
+            for line in file:
+                yield json.loads(line)
+
+    def __len__(self):
+        return self.item_count
+
+
+class MappedList(LazyList):
+    """A LazyList with `function` applied to each item as it is read, so a spilled list is transformed without loading it."""
+
+    def __init__(self, items, function):
+        self.items = items
+        self.function = function
+
+    def __iter__(self):
+        for item in self.items:
+            yield self.function(item)
+
+    def __len__(self):
+        return len(self.items)
+
+
+class ListSpiller:
+    """
+    Collects items for a list, moving them to a JSON-lines file in spill_dir once
+    more than keep_in_memory have been added, so only small lists stay in memory.
+    """
+
+    def __init__(self, spill_dir, prefix='items', keep_in_memory=1):
+        self.spill_dir = spill_dir
+        self.prefix = prefix
+        self.keep_in_memory = keep_in_memory
+        self.items = []
+        self.item_count = 0
+        self.spill_path = None
+        self.spill_file = None
+
+    def append(self, item):
+        if self.spill_file is None and self.spill_dir and len(self.items) >= self.keep_in_memory:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            self.spill_path = os.path.join(self.spill_dir, f"{self.prefix}_{uuid.uuid4().hex}.jsonl")
+            self.spill_file = open(self.spill_path, 'w', encoding='utf-8')
+            for spilled_item in self.items:
+                self._spill(spilled_item)
+            self.items = []
+        if self.spill_file is not None:
+            self._spill(item)
+        else:
+            self.items.append(item)
+        self.item_count += 1
+
+    def _spill(self, item):
+        self.spill_file.write(json.dumps(item, ensure_ascii=False, separators=(',', ':')) + '\n')
+
+    def close(self):
+        """Finish the list, returning a plain list if nothing was spilled, else a SpilledList."""
+        if self.spill_file is None:
+            return self.items
+        self.spill_file.close()
+        return SpilledList(self.spill_path, self.item_count)
+
+
+class JSONStreamWriter:
+    """
+    Writes a JSON document to disk while walking it, without building the serialized string in memory.
+
+    compact drops indentation and uses ',' / ':' separators, gzip_output compresses
+    on the fly. The serialized size of every value down to measure_depth is recorded
+    in `sizes` during the same pass, keyed by its path (tuple of keys / indices).
+    """
+
+    def __init__(self, file_path, compact=True, gzip_output=False, indent=4, sort_keys=False, ensure_ascii=False, default=None, measure_depth=2):
+        self.file_path = file_path
+        self.indent = None if compact else indent
+        self.item_separator = ','
+        self.key_separator = ':' if compact else ': '
+        self.sort_keys = sort_keys
+        self.measure_depth = measure_depth
+        self.default = default
+        self.encoder = json.JSONEncoder(ensure_ascii=ensure_ascii, default=default, separators=(self.item_separator, self.key_separator))
+        self.file = gzip.open(file_path, 'wb') if gzip_output else open(file_path, 'wb')
+        self.buffer = []
+        self.buffered_bytes = 0
+        self.bytes_written = 0
+        self.sizes = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self._flush()
+        self.file.close()
+
+    def dump(self, value):
+        self._write_value(value, (), 0)
+        if self.indent is not None:
+            self._write('\n')
+        return self.bytes_written
+
+    def _write(self, text):
+        data = text.encode('utf-8')
+        self.buffer.append(data)
+        self.buffered_bytes += len(data)
+        self.bytes_written += len(data)
+        if self.buffered_bytes >= WRITE_BUFFER_BYTES:
+            self._flush()
+
+    def _flush(self):
+        if self.buffer:
+            self.file.write(b''.join(self.buffer))
+            self.buffer = []
+            self.buffered_bytes = 0
+
+    def _newline(self, depth):
+        if self.indent is not None:
+            self._write('\n' + ' ' * (self.indent * depth))
+
+    def _write_value(self, value, path, depth):
+        start = self.bytes_written
+
+        if isinstance(value, dict):
+            self._write_dict(value, path, depth)
+        elif isinstance(value, (list, tuple, LazyList)):
+            self._write_list(value, path, depth)
+        elif self.default is not None and not isinstance(value, (str, int, float, bool, type(None))):
+            # Let the default hook convert unknown objects (e.g. images), then serialize what it returns
+            self._write_value(self.default(value), path, depth)
+            return
+        else:
+            for chunk in self.encoder.iterencode(value):
+                self._write(chunk)
+
+        if depth <= self.measure_depth:
+            self.sizes[path] = self.bytes_written - start
+
+    def _write_dict(self, value, path, depth):
+        if not value:
+            self._write('{}')
+            return
+        items = sorted(value.items(), key=lambda item: str(item[0])) if self.sort_keys else value.items()
+        self._write('{')
+        for idx, (key, item) in enumerate(items):
+            if idx:
+                self._write(self.item_separator)
+            self._newline(depth + 1)
+            self._write(self.encoder.encode(key if isinstance(key, str) else json_key(key)))
+            self._write(self.key_separator)
+            self._write_value(item, path + (key,), depth + 1)
+        self._newline(depth)
+        self._write('}')
+
+    def _write_list(self, value, path, depth):
+        self._write('[')
+        empty = True
+        for idx, item in enumerate(value):
+            if idx:
+                self._write(self.item_separator)
+            self._newline(depth + 1)
+            self._write_value(item, path + (idx,), depth + 1)
+            empty = False
+        if not empty:
+            self._newline(depth)
+        self._write(']')
+
+
+# Dict keys the json module accepts besides str, converted the same way json.dumps does
+def json_key(key):
+    if isinstance(key, bool):
+        return 'true' if key else 'false'
+    if key is None:
+        return 'null'
+    if isinstance(key, (int, float)):
+        return json.dumps(key)
+    raise TypeError(f"keys must be str, int, float, bool or None, not {type(key).__name__}")
+
+
+def serialized_size(value, compact=True, indent=4, ensure_ascii=False, default=None):
+    """Size in bytes of `value` as UTF-8 JSON, counted chunk by chunk instead of building the string."""
+    encoder = json.JSONEncoder(
+        ensure_ascii=ensure_ascii,
+        default=default,
+        indent=None if compact else indent,
+        separators=(',', ':') if compact else (',', ': '),
+    )
+    return sum(len(chunk.encode('utf-8')) for chunk in encoder.iterencode(value))
+
+
+def dump(value, file_path, **kwargs):
+    """Stream `value` to file_path, returning (bytes written, sizes of the values down to measure_depth)."""
+    with JSONStreamWriter(file_path, **kwargs) as writer:
+        writer.dump(value)
+    return writer.bytes_written, writer.sizes
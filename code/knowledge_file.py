@@ -0,0 +1,559 @@
+import argparse
+import base64
+import json
+import mmap
+import os
+import random
+import struct
+import tempfile
+import time
+from datetime import datetime
+
+import json_stream
+
+# Indexed knowledge file: the organized data of one compile in a container any chunk of which can be read without parsing the rest.
+#
+# Layout, all integers little-endian:
+#
+#     header      MAGIC, major and minor version, flags, then (offset, length) of each section in SECTIONS
+#     header_json {'format', 'version', 'spec', 'project', 'created', 'chunk_count', 'item_count', 'types'}
+#     payloads    every chunk's bytes back to back: UTF-8 text, compact UTF-8 JSON, or raw binary
+#     chunks      one CHUNK_RECORD per chunk: payload offset and length, encoding, item, metadata and source index
+#     items       string table: per data item its type, key and skeleton, the item with chunks replaced by {"$chunk": n}
+#     metadata    string table: distinct chunk metadata objects as JSON
+#     sources     string table: distinct source paths
+#     document    the organized data's top-level 'metadata' as JSON, read only by the JSON exporter
+#
+# A string table is a count, count + 1 offsets into its blob, and the blob, so
+# entry n is two offset reads away. Chunks are the text of each item (string
+# leaves and text_chunk nodes, one chunk each) or, for json and csv items,
+# each list element or whole value as JSON; images become binary chunks.
+
+MAGIC = b'SGPTKF\r\n'
+VERSION = (1, 0)
+SPEC = 'KnowledgeFile-1.0.1'
+EXTENSION = '.kf'
+
+SECTIONS = ('header_json', 'payloads', 'chunks', 'items', 'metadata', 'sources', 'document')
+HEADER = struct.Struct('<8sHHI' + 'QQ' * len(SECTIONS))
+
+# offset, length, encoding, item, metadata, source
+CHUNK_RECORD = struct.Struct('<QIB3xIII')
+
+TEXT, JSON, BINARY = 0, 1, 2
+ENCODINGS = {TEXT: 'text', JSON: 'json', BINARY: 'binary'}
+
+# Items whose lists and values are data rather than text, stored as JSON chunks
+STRUCTURED_TYPES = {'json', 'csv'}
+
+# Short strings kept in the skeleton and copied into the metadata of the chunks beside them
+LABEL_KEYS = {'title', 'url', 'type', 'description', 'file_name', 'source'}
+
+UINT64 = struct.Struct('<Q')
+
+
+def is_text_chunk(value):
+    """The {'type': 'text_chunk', 'chunks': [...]} nodes organize_data splits long strings into."""
+    return isinstance(value, dict) and value.get('type') == 'text_chunk' and isinstance(value.get('chunks'), list) and len(value) == 2
+
+
+class StringTable:
+    """Deduplicated strings, numbered in insertion order."""
+
+    def __init__(self, deduplicate=True):
+        self.deduplicate = deduplicate
+        self.index = {}
+        self.entries = []
+
+    def add(self, text):
+        if self.deduplicate and text in self.index:
+            return self.index[text]
+        self.entries.append(text.encode('utf-8'))
+        if self.deduplicate:
+            self.index[text] = len(self.entries) - 1
+        return len(self.entries) - 1
+
+    def to_bytes(self):
+        offsets = [0]
+        for entry in self.entries:
+            offsets.append(offsets[-1] + len(entry))
+        return struct.pack(f'<{len(offsets) + 1}Q', len(self.entries), *offsets) + b''.join(self.entries)
+
+
+# Entry `index` of the string table at `offset` in buffer, as bytes
+def string_entry(buffer, offset, index, table='string table'):
+    count = UINT64.unpack_from(buffer, offset)[0]
+    if not 0 <= index < count:
+        raise IndexError(f"{table} entry {index} out of range")
+    start, end = struct.unpack_from('<2Q', buffer, offset + 8 + 8 * index)
+    blob = offset + 8 * (count + 2)
+    return buffer[blob + start:blob + end]
+
+
+class KnowledgeFileWriter:
+    """
+    Streams chunk payloads to the file as the organized data is walked; the
+    tables are kept in memory and written after the payloads.
+    `default` converts values JSON cannot hold, as for write_json_output;
+    images come back as base64 strings and are stored decoded.
+    """
+
+    def __init__(self, output_file, project=None, default=None):
+        self.output_file = output_file
+        self.project = project
+        self.default = default
+        self.file = open(output_file, 'wb')
+        self.file.write(b'\0' * HEADER.size)
+        self.offset = 0
+        self.records = bytearray()
+        self.chunk_count = 0
+        self.items = StringTable(deduplicate=False)
+        self.metadata = StringTable()
+        self.sources = StringTable()
+        self.types = []
+        self.document = {}
+
+    def _json_default(self, value):
+        if isinstance(value, json_stream.LazyList):
+            return list(value)
+        if self.default is None:
+            raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+        return self.default(value)
+
+    def _chunk(self, payload, encoding, metadata, source, item):
+        self.file.write(payload)
+        self.records += CHUNK_RECORD.pack(self.offset, len(payload), encoding, item, self.metadata.add(json.dumps(metadata, ensure_ascii=False, sort_keys=True)), self.sources.add(source))
+        self.offset += len(payload)
+        self.chunk_count += 1
+        return self.chunk_count - 1
+
+    def _text(self, text, metadata, source, item):
+        return {'$chunk': self._chunk(text.encode('utf-8'), TEXT, metadata, source, item)}
+
+    def _json(self, value, metadata, source, item):
+        payload = json.dumps(value, ensure_ascii=False, separators=(',', ':'), default=self._json_default).encode('utf-8')
+        return {'$chunk': self._chunk(payload, JSON, metadata, source, item)}
+
+    def _binary(self, value, metadata, source, item):
+        converted = self.default(value) if self.default else None
+        if not isinstance(converted, str):
+            raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+        return {'$chunk': self._chunk(base64.b64decode(converted), BINARY, metadata, source, item)}
+
+    def _walk(self, node, key, metadata, source, item):
+        """Skeleton of a text item: strings become chunks, labels and metadata stay in place."""
+        if is_text_chunk(node):
+            ref = self._text(''.join(node['chunks']), metadata, source, item)
+            ref['$split'] = [len(chunk) for chunk in node['chunks']]
+            return ref
+        if isinstance(node, str):
+            if not node or key in LABEL_KEYS:
+                return node
+            return self._text(node, metadata, source, item)
+        if isinstance(node, dict):
+            labels = {name: value for name, value in node.items() if name in LABEL_KEYS and isinstance(value, str)}
+            context = {**metadata, **labels} if labels else metadata
+            return {name: value if name == 'metadata' else self._walk(value, name, context, source, item) for name, value in node.items()}
+        if isinstance(node, (list, tuple, json_stream.LazyList)):
+            return [self._walk(value, None, metadata, source, item) for value in node]
+        if isinstance(node, (int, float, bool, type(None))):
+            return node
+        return self._binary(node, metadata, source, item)
+
+    def _walk_structured(self, node, metadata, source, item):
+        """Skeleton of a json or csv item: each list element, or each other value, is one JSON chunk."""
+        if not isinstance(node, dict):
+            return self._json(node, metadata, source, item)
+        skeleton = {}
+        for name, value in node.items():
+            if name == 'metadata':
+                skeleton[name] = value
+            elif isinstance(value, (list, tuple, json_stream.LazyList)):
+                skeleton[name] = [self._json(element, metadata, source, item) for element in value]
+            else:
+                skeleton[name] = self._json(value, metadata, source, item)
+        return skeleton
+
+    def add_organized(self, organized_data):
+        """Add the output of organize_data: every item of every data type, in order."""
+        document = organized_data.get('metadata', {})
+        self.types = list(organized_data.get('data', {}))
+        for data_type, items in organized_data.get('data', {}).items():
+            for key, value in items.items():
+                item_metadata = document.get(key)
+                if item_metadata is None and isinstance(value, dict) and isinstance(value.get('metadata'), dict):
+                    item_metadata = value['metadata']
+                item_metadata = item_metadata or {}
+                source = str(item_metadata.get('source') or '')
+                metadata = {**item_metadata, 'type': data_type, 'key': key}
+                item = len(self.items.entries)
+                if data_type in STRUCTURED_TYPES:
+                    skeleton = self._walk_structured(value, metadata, source, item)
+                else:
+                    skeleton = self._walk(value, None, metadata, source, item)
+                self.items.add(json.dumps({'type': data_type, 'key': key, 'skeleton': skeleton}, ensure_ascii=False, default=self._json_default))
+        self.document = document
+
+    def close(self):
+        sections = {
+            'header_json': json.dumps({
+                'format': 'sgpt-knowledge',
+                'version': '.'.join(map(str, VERSION)),
+                'spec': SPEC,
+                'project': self.project,
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'chunk_count': self.chunk_count,
+                'item_count': len(self.items.entries),
+                'types': self.types,
+            }).encode('utf-8'),
+            'chunks': bytes(self.records),
+            'items': self.items.to_bytes(),
+            'metadata': self.metadata.to_bytes(),
+            'sources': self.sources.to_bytes(),
+            'document': json.dumps(self.document, ensure_ascii=False, default=self._json_default).encode('utf-8'),
+        }
+        # Payloads were streamed straight after the header; the rest follows them
+        table = {'payloads': (HEADER.size, self.offset)}
+        position = HEADER.size + self.offset
+        for name in SECTIONS:
+            if name in sections:
+                self.file.write(sections[name])
+                table[name] = (position, len(sections[name]))
+                position += len(sections[name])
+        self.file.seek(0)
+        self.file.write(HEADER.pack(MAGIC, *VERSION, 0, *[value for name in SECTIONS for value in table[name]]))
+        self.file.close()
+        return {'chunks': self.chunk_count, 'items': len(self.items.entries), 'bytes': position}
+
+
+def write(organized_data, output_file, project=None, default=None):
+    """Write organize_data output as an indexed knowledge file, returns {'chunks', 'items', 'bytes'}."""
+    writer = KnowledgeFileWriter(output_file, project, default)
+    try:
+        writer.add_organized(organized_data)
+    except BaseException:
+        writer.file.close()
+        os.remove(output_file)
+        raise
+    return writer.close()
+
+
+class KnowledgeFile:
+    """
+    Read-only view of an indexed knowledge file through mmap.
+
+    Opening reads only the fixed header and the small header JSON. chunk(n),
+    text(n) and friends seek straight to the n-th chunk record and its
+    payload, so fetching a chunk costs the same whatever the file size.
+    Metadata objects are decoded once and shared by the chunks using them.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.file.close()
+            raise ValueError(f"{path} is not a knowledge file")
+        if len(self.map) < HEADER.size or self.map[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a knowledge file")
+        fields = HEADER.unpack_from(self.map, 0)
+        self.version = fields[1:3]
+        if self.version[0] != VERSION[0]:
+            self.close()
+            raise ValueError(f"{path}: unsupported knowledge file version {self.version[0]}.{self.version[1]}")
+        self.sections = {name: (fields[4 + 2 * idx], fields[5 + 2 * idx]) for idx, name in enumerate(SECTIONS)}
+        self.header = json.loads(self._section('header_json'))
+        self.chunk_count = self.sections['chunks'][1] // CHUNK_RECORD.size
+        self._metadata = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        if getattr(self, 'map', None) is not None:
+            self.map.close()
+            self.map = None
+        self.file.close()
+
+    def __len__(self):
+        return self.chunk_count
+
+    def _section(self, name):
+        offset, length = self.sections[name]
+        return self.map[offset:offset + length]
+
+    def _string(self, table, index):
+        return string_entry(self.map, self.sections[table][0], index, table).decode('utf-8')
+
+    def _string_count(self, table):
+        return UINT64.unpack_from(self.map, self.sections[table][0])[0]
+
+    def record(self, index):
+        """(offset, length, encoding, item, metadata index, source index) of chunk `index`."""
+        if not 0 <= index < self.chunk_count:
+            raise IndexError(f"chunk {index} out of range")
+        return CHUNK_RECORD.unpack_from(self.map, self.sections['chunks'][0] + index * CHUNK_RECORD.size)
+
+    def payload(self, index):
+        """The chunk's raw bytes, as a memoryview into the mapping."""
+        offset, length = self.record(index)[:2]
+        start = self.sections['payloads'][0] + offset
+        return memoryview(self.map)[start:start + length]
+
+    def encoding(self, index):
+        return ENCODINGS[self.record(index)[2]]
+
+    def text(self, index):
+        """The chunk as text: decoded UTF-8, JSON source text, or base64 for binary chunks."""
+        offset, length, encoding = self.record(index)[:3]
+        start = self.sections['payloads'][0] + offset
+        data = self.map[start:start + length]
+        return base64.b64encode(data).decode('ascii') if encoding == BINARY else data.decode('utf-8')
+
+    def value(self, index):
+        """The chunk as it appears in the JSON output: a string, a decoded JSON value, or base64."""
+        text = self.text(index)
+        return json.loads(text) if self.record(index)[2] == JSON else text
+
+    def metadata(self, index):
+        metadata_index = self.record(index)[4]
+        if metadata_index not in self._metadata:
+            self._metadata[metadata_index] = json.loads(self._string('metadata', metadata_index))
+        return self._metadata[metadata_index]
+
+    def source(self, index):
+        return self._string('sources', self.record(index)[5])
+
+    def chunk(self, index):
+        return {'index': index, 'encoding': self.encoding(index), 'text': self.text(index), 'metadata': self.metadata(index), 'source': self.source(index)}
+
+    def __getitem__(self, index):
+        return self.chunk(index)
+
+    def __iter__(self):
+        for index in range(self.chunk_count):
+            yield self.chunk(index)
+
+    def item_count(self):
+        return self._string_count('items')
+
+    def item(self, index):
+        """{'type', 'key', 'skeleton'} of data item `index`."""
+        return json.loads(self._string('items', index))
+
+    def items(self):
+        for index in range(self.item_count()):
+            yield self.item(index)
+
+    def document(self):
+        """The organized data's top-level 'metadata' mapping."""
+        return json.loads(self._section('document'))
+
+
+class _RebuiltList(json_stream.LazyList):
+    """A skeleton list whose chunks are read back only as the JSON writer reaches them."""
+
+    def __init__(self, knowledge, skeleton):
+        self.knowledge = knowledge
+        self.skeleton = skeleton
+
+    def __iter__(self):
+        for node in self.skeleton:
+            yield rebuild(self.knowledge, node)
+
+    def __len__(self):
+        return len(self.skeleton)
+
+
+def rebuild(knowledge, node):
+    """A skeleton with its chunk references replaced by the chunks, as organize_data produced it."""
+    if isinstance(node, dict):
+        if '$chunk' in node:
+            value = knowledge.value(node['$chunk'])
+            if '$split' not in node:
+                return value
+            chunks, start = [], 0
+            for length in node['$split']:
+                chunks.append(value[start:start + length])
+                start += length
+            return {'type': 'text_chunk', 'chunks': chunks}
+        return {key: rebuild(knowledge, value) for key, value in node.items()}
+    if isinstance(node, list):
+        return _RebuiltList(knowledge, node)
+    return node
+
+
+def organized_view(knowledge):
+    """The organized data ({'metadata', 'data'}) of a knowledge file, chunks read lazily while it is serialized."""
+    data = {data_type: {} for data_type in knowledge.header.get('types', [])}
+    for item in knowledge.items():
+        data.setdefault(item['type'], {})[item['key']] = rebuild(knowledge, item['skeleton'])
+    return {'metadata': knowledge.document(), 'data': data}
+
+
+def export_json(path, output_file, compact=True, gzip_output=False, sort_keys=False):
+    """The JSON knowledge output write_json_output would have written for the same data."""
+    with KnowledgeFile(path) as knowledge:
+        return json_stream.dump(organized_view(knowledge), output_file, compact=compact, gzip_output=gzip_output, sort_keys=sort_keys)[0]
+
+
+def _chunk_refs(node):
+    if isinstance(node, dict):
+        if '$chunk' in node:
+            yield node['$chunk']
+        else:
+            for value in node.values():
+                yield from _chunk_refs(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _chunk_refs(value)
+
+
+def export_markdown(path, output_file):
+    """A Markdown knowledge file in the layout of spec/MarkdownTemplate_A.md, one section per data item."""
+    with KnowledgeFile(path) as knowledge, open(output_file, 'w', encoding='utf-8') as file:
+        header = knowledge.header
+        project = header.get('project') or os.path.splitext(os.path.basename(path))[0]
+        file.write(f"# Knowledge File for {project}\n\n")
+        file.write(f"**NAME**: {project}\n**TYPE**: Text/Markdown\n**VERSION**: {header['version']}\n")
+        file.write(f"**DATE**: {header['created']}\n**CHUNKS**: {header['chunk_count']}\n\n")
+
+        items = list(knowledge.items())
+        types = [data_type for data_type in header.get('types', []) if any(item['type'] == data_type for item in items)]
+        file.write("## Table of Contents\n")
+        for data_type in types:
+            file.write(f"- [{data_type}](#{data_type})\n")
+
+        for data_type in types:
+            file.write(f"\n## {data_type}\n")
+            for item in items:
+                if item['type'] != data_type:
+                    continue
+                file.write(f"\n### {item['key']}\n")
+                described = False
+                heading = None
+                for index in _chunk_refs(item['skeleton']):
+                    metadata = knowledge.metadata(index)
+                    if not described:
+                        for label, name in [('File', 'file_name'), ('Source', 'source')]:
+                            if metadata.get(name):
+                                file.write(f"**{label}**: {metadata[name]}\n")
+                        described = True
+                    # Crawled pages get a heading of their own, written once for all of a page's chunks
+                    if (metadata.get('title') or metadata.get('url')) and (metadata.get('title'), metadata.get('url')) != heading:
+                        heading = (metadata.get('title'), metadata.get('url'))
+                        file.write(f"\n#### {metadata.get('title') or metadata.get('url')}\n")
+                        if metadata.get('url'):
+                            file.write(f"{metadata['url']}\n")
+                    encoding = knowledge.encoding(index)
+                    if encoding == 'text':
+                        file.write(f"\n{knowledge.text(index)}\n")
+                    elif encoding == 'json':
+                        file.write(f"\n```json\n{json.dumps(knowledge.value(index), ensure_ascii=False, indent=4)}\n```\n")
+                    else:
+                        file.write(f"\n*[binary data, {len(knowledge.payload(index))} bytes]*\n")
+
+
+# Organized data with `items` text items of `chunk_bytes` each, for the benchmark
+def make_fixture(items, chunk_bytes):
+    words = ['knowledge', 'file', 'chunk', 'index', 'offset', 'table', 'source', 'metadata', 'reader', 'payload']
+    rng = random.Random(0)
+    organized = {'metadata': {}, 'data': {'text': {}, 'json': {}}}
+    for idx in range(items):
+        key = f"file_{idx}_txt"
+        text = ' '.join(rng.choice(words) for _ in range(chunk_bytes // 8))
+        organized['metadata'][key] = {'type': 'text', 'file_name': f"file_{idx}.txt", 'file_size': len(text), 'source': f"source/dir_{idx % 100}"}
+        organized['data']['text'][key] = {'content': text, 'metadata': organized['metadata'][key]}
+    return organized
+
+
+def benchmark(items, chunk_bytes, reads):
+    organized = make_fixture(items, chunk_bytes)
+    work_dir = tempfile.mkdtemp()
+    try:
+        json_file = os.path.join(work_dir, 'organized.json')
+        kf_file = os.path.join(work_dir, 'organized' + EXTENSION)
+        json_stream.dump(organized, json_file)
+
+        started = time.perf_counter()
+        stats = write(organized, kf_file, project='benchmark')
+        write_seconds = time.perf_counter() - started
+        print(f"{stats['chunks']} chunks, JSON {os.path.getsize(json_file) / 1024 ** 2:.1f} MB, knowledge file {stats['bytes'] / 1024 ** 2:.1f} MB (written in {write_seconds:.2f}s)")
+
+        # One chunk from the JSON output means parsing all of it
+        started = time.perf_counter()
+        with open(json_file, 'r', encoding='utf-8') as file:
+            json.load(file)['data']['text'][f"file_{items // 2}_txt"]['content']
+        print(f"JSON: one chunk {(time.perf_counter() - started) * 1000:.1f} ms")
+
+        rng = random.Random(1)
+        started = time.perf_counter()
+        with KnowledgeFile(kf_file) as knowledge:
+            opened = time.perf_counter() - started
+            for _ in range(reads):
+                index = rng.randrange(len(knowledge))
+                knowledge.text(index)
+                knowledge.metadata(index)
+        elapsed = time.perf_counter() - started - opened
+        print(f"Knowledge file: open {opened * 1000:.2f} ms, {reads} random chunks {elapsed * 1000:.1f} ms ({elapsed / reads * 1e6:.1f} us each)")
+    finally:
+        for name in os.listdir(work_dir):
+            os.remove(os.path.join(work_dir, name))
+        os.rmdir(work_dir)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Read, export and benchmark indexed knowledge files')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    info = commands.add_parser('info', help='Show the header and section sizes')
+    info.add_argument('path')
+
+    show = commands.add_parser('show', help='Print chunks by number')
+    show.add_argument('path')
+    show.add_argument('chunks', type=int, nargs='+')
+
+    export = commands.add_parser('export', help='Write the JSON or Markdown form')
+    export.add_argument('path')
+    export.add_argument('--json', metavar='FILE', help='JSON knowledge output')
+    export.add_argument('--markdown', metavar='FILE', help='Markdown knowledge file')
+    export.add_argument('--gzip', action='store_true', help='Gzip the JSON output')
+
+    bench = commands.add_parser('benchmark', help='Compare chunk access against the JSON output')
+    bench.add_argument('--items', type=int, default=20000)
+    bench.add_argument('--chunk-bytes', type=int, default=4096)
+    bench.add_argument('--reads', type=int, default=10000)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.command == 'benchmark':
+        benchmark(args.items, args.chunk_bytes, args.reads)
+    elif args.command == 'info':
+        with KnowledgeFile(args.path) as knowledge:
+            print(json.dumps(knowledge.header, indent=4))
+            for name, (offset, length) in knowledge.sections.items():
+                print(f"{name:<12} {offset:>14} {length:>14}")
+    elif args.command == 'show':
+        with KnowledgeFile(args.path) as knowledge:
+            for index in args.chunks:
+                chunk = knowledge.chunk(index)
+                print(f"--- chunk {index} ({chunk['encoding']}) {chunk['source']}")
+                print(json.dumps(chunk['metadata'], ensure_ascii=False))
+                print(chunk['text'])
+    elif args.command == 'export':
+        if args.json:
+            export_json(args.path, args.json, gzip_output=args.gzip)
+        if args.markdown:
+            export_markdown(args.path, args.markdown)
+
+
+if __name__ == "__main__":
+    main()
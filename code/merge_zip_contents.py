@@ -3,27 +3,39 @@ import json
 import logging
 import os
 import sys
+import shutil
 import tempfile
 from io import BytesIO
 
 import base64
-import bz2
-import csv
-import gzip
 import markdown2
 import pytesseract
 import py7zr
 import yaml
 import zipfile
-from docx import Document
 from PIL import Image, UnidentifiedImageError
 from pdf2image import convert_from_path
 from termcolor import colored
 from tqdm import tqdm
 from xml.etree import ElementTree as ET
-import fnmatch
 import tarfile
 from datetime import datetime
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import chunk_clusters
+import chunk_index
+import compressed_stream
+import crawl_records
+import csv_stream
+import docx_stream
+import html_text
+import ignore_rules
+import json_incremental
+import json_stream
+import knowledge_file
+import ocr_batch
+import xml_stream
 
 # Constants
 CONFIG_FILE = 'config.json'
@@ -102,6 +114,74 @@ config = load_config()
 SRC_FOLDER = config['src_folder']
 OUTPUT_FOLDER = config['output_folder']
 
+# Exclusion settings (older configs name the section 'excludes')
+EXCLUDES = config.get('exclude', config.get('excludes', {}))
+
+# IGNORE_NAMES compiled once, plus .gitignore / .ignore files found in the source tree
+IGNORE_MATCHER = ignore_rules.IgnoreMatcher(IGNORE_NAMES, use_ignore_files=config.get('use_ignore_files', True))
+
+# Knowledge output: compact JSON without indentation, optionally gzipped
+OUTPUT_COMPACT = config.get('output', {}).get('compact', True)
+OUTPUT_GZIP = config.get('output', {}).get('gzip', False)
+
+# Also write an indexed knowledge file (.kf) beside the JSON, for readers that fetch single chunks
+OUTPUT_KNOWLEDGE_FILE = config.get('output', {}).get('knowledge_file', False)
+
+# BM25 index of the knowledge file's chunks (.bm25) for `chunk_index.py query`, only written with the knowledge file
+OUTPUT_SEARCH_INDEX = OUTPUT_KNOWLEDGE_FILE and config.get('output', {}).get('search_index', False)
+
+# CSV files are streamed in row batches of this size
+CSV_BATCH_BYTES = config.get('csv_batch_bytes', config['text_chunk_size_bytes'])
+
+# CSV batches, JSON and XML chunks beyond the first wait here until the output is written
+SPILL_DIR = os.path.join(OUTPUT_FOLDER, '.spill')
+
+# JSON larger than either chunk size is split element by element
+JSON_CHUNK_BYTES = min(config['json_chunk_size_bytes'], config['text_chunk_size_bytes'])
+
+# HTML is converted to text with lightweight markdown; false keeps the raw markup
+HTML_TO_TEXT = config.get('html_to_text', True)
+
+# XML records are rendered as text and packed into chunks of this size
+XML_CHUNK_BYTES = config['text_chunk_size_bytes']
+
+# Text decompressed from .gz/.bz2/.xz sources is read and spilled in blocks of this size
+TEXT_CHUNK_BYTES = config['text_chunk_size_bytes']
+
+# gpt-crawler output ({title, url, html} records) becomes one text unit per page, chunked by worker processes;
+# crawl output directories listed in sources are compiled alongside the source folder
+CRAWL_CONFIG = config.get('crawl_records', {})
+CRAWL_CHUNK_BYTES = CRAWL_CONFIG.get('chunk_bytes') or config['text_chunk_size_bytes']
+CRAWL_WORKERS = CRAWL_CONFIG.get('workers') or os.cpu_count() or 1
+CRAWL_SOURCES = CRAWL_CONFIG.get('sources', [])
+CRAWL_EXECUTOR = None
+
+# Items are clustered by hashed n-gram vectors, ordered by cluster and near-duplicates dropped (needs NumPy)
+CLUSTER_CONFIG = config.get('clustering', {})
+
+# Batched OCR backend (None keeps the per-image pytesseract calls)
+OCR_BACKEND = ocr_batch.create_backend(config)
+OCR_QUEUE = ocr_batch.OCRQueue(OCR_BACKEND) if OCR_BACKEND else None
+
+# One pool for chunking crawl pages across all crawl files, started on first use;
+# inside a run_sources worker there is none and pages are chunked inline
+def crawl_executor():
+    global CRAWL_EXECUTOR
+    if CRAWL_EXECUTOR is None and CRAWL_WORKERS > 1 and not crawl_records.in_worker_process():
+        CRAWL_EXECUTOR = ProcessPoolExecutor(max_workers=CRAWL_WORKERS)
+    return CRAWL_EXECUTOR
+
+def shutdown_crawl_executor():
+    global CRAWL_EXECUTOR
+    if CRAWL_EXECUTOR:
+        CRAWL_EXECUTOR.shutdown()
+        CRAWL_EXECUTOR = None
+
+# Run any OCR still waiting in the batch queue, must happen before queued files are deleted
+def flush_ocr():
+    if OCR_QUEUE:
+        OCR_QUEUE.flush()
+
 from typing import Dict, Any
 import logging
 
@@ -142,64 +222,58 @@ def parse_args():
 
 # Function to check if a file or folder should be ignored
 def matches_ignore_patterns(entry):
-    for pattern in IGNORE_NAMES:
-        if fnmatch.fnmatch(entry, pattern):
-            return True
-    return False
+    return IGNORE_MATCHER.matches(entry)
 
 # Function to check if a file should be excluded based on config
-def should_exclude_file(file_path):
+def should_exclude_file(file_path, file_size=None):
     file_name = os.path.basename(file_path)
     _, file_ext = os.path.splitext(file_path)
-    file_size = os.path.getsize(file_path)
-
-    # Exclude small images
-    if config['exclude']['small_images']['enabled'] and file_ext.lower() in ['.png', '.jpg', '.jpeg', '.gif']:
-        if file_size < config['exclude']['small_images']['size_threshold']:
+    file_ext = file_ext.lower()
+    is_image = file_ext in ['.png', '.jpg', '.jpeg', '.gif']
+
+    # Exclude small images, the only rule that needs the file size
+    if is_image and EXCLUDES.get('small_images', {}).get('enabled'):
+        if file_size is None:
+            file_size = os.path.getsize(file_path)
+        if file_size < EXCLUDES['small_images']['size_threshold']:
             return True
 
     # Exclude all images
-    if config['exclude']['exclude_images'] and file_ext.lower() in ['.png', '.jpg', '.jpeg', '.gif']:
+    if is_image and EXCLUDES.get('exclude_images'):
         return True
 
     # Exclude images at root level
-    if config['exclude']['exclude_images_at_root'] and file_ext.lower() in ['.png', '.jpg', '.jpeg', '.gif']:
+    if is_image and EXCLUDES.get('exclude_images_at_root'):
         if os.path.dirname(file_path) == os.getcwd():
             return True
 
     # Exclude config and lock files
-    if config['exclude']['exclude_config_files'] and file_ext.lower() in ['.json', '.yaml', '.yml', '.config']:
+    if EXCLUDES.get('exclude_config_files') and file_ext in ['.json', '.yaml', '.yml', '.config']:
         return True
-    if config['exclude']['exclude_lock_files'] and file_name in ['package-lock.json', 'yarn.lock']:
+    if EXCLUDES.get('exclude_lock_files') and file_name in ['package-lock.json', 'yarn.lock']:
         return True
 
     return False
 
 # Processing Functions
-def process_directory(directory, logger, all_data):
+def process_directory(directory, logger, all_data, ignore_context=None):
     try:
-        for entry in tqdm(os.listdir(directory), desc="Processing directory", unit="file", leave=False):
-            if not matches_ignore_patterns(entry):
-                process_entry(entry, directory, logger, all_data)
+        # Ignored entries are dropped before the listing is used, so ignored subtrees are never opened
+        entries, ignore_context = IGNORE_MATCHER.scan(directory, ignore_context)
+        for entry in tqdm(entries, desc="Processing directory", unit="file", leave=False):
+            process_entry(entry, logger, all_data, ignore_context)
     except FileNotFoundError as e:
         logger.error(f"Directory not found: {directory}. Error: {e}")
         raise FileProcessingError(f"Directory not found: {directory}") from e
 
-def process_entry(entry, directory, logger, all_data):
-    if entry in ['.DS_Store', 'node_modules']:
-        return
-
-    entry_path = os.path.join(directory, entry)
-    if should_exclude_file(entry_path):
-        return
-    if os.path.isdir(entry_path):
-        if not matches_ignore_patterns(entry):
-            process_directory(entry_path, logger, all_data)
-    elif os.path.isfile(entry_path):
-        if not matches_ignore_patterns(entry):
-            process_file(entry_path, logger, all_data)
+def process_entry(entry, logger, all_data, ignore_context=None):
+    if entry.is_dir():
+        process_directory(entry.path, logger, all_data, ignore_context)
+    elif entry.is_file():
+        if not should_exclude_file(entry.path):
+            process_file(entry.path, logger, all_data)
     else:
-        logger.warning(f"Skipped unrecognized file type: {entry}")
+        logger.warning(f"Skipped unrecognized file type: {entry.name}")
 
 def process_file(file_path, logger, all_data):
     try:
@@ -226,96 +300,208 @@ class ColoredFormatter(logging.Formatter):
 
 # Process archive
 def process_archive(temp_extract_path, logger, all_data):
+    # Ignore files at the archive root apply to everything below it
+    ignore_context = IGNORE_MATCHER.enter(temp_extract_path)
     for file in tqdm(os.listdir(temp_extract_path), desc="Processing files", unit="file", leave=False):
         file_path = os.path.join(temp_extract_path, file)
         if os.path.isdir(file_path):
-            process_directory(file_path, logger, all_data)
+            if not matches_ignore_patterns(file):
+                process_directory(file_path, logger, all_data, ignore_context)
         elif os.path.isfile(file_path):
             data = parse_file(file_path, logger)
             if data:
                 all_data.append(data)
+    flush_ocr()
 
 # Process single file
 def process_single_file(file_path, temp_extract_path, logger, all_data):
-    # Example for gz files, can be expanded for other formats
-    if file_path.endswith('.gz'):
-        extracted_file_path = os.path.join(temp_extract_path, os.path.basename(file_path).replace('.gz', ''))
-        with gzip.open(file_path, 'rb') as gz_file:
-            with open(extracted_file_path, 'wb') as out_file:
-                out_file.write(gz_file.read())
-
-        data = parse_file(extracted_file_path, logger)
-        if data:
-            all_data.append(data)
-
-    # Similar logic for bz2 files
-    elif file_path.endswith('.bz2'):
-        extracted_file_path = os.path.join(temp_extract_path, os.path.basename(file_path).replace('.bz2', ''))
-        with bz2.open(file_path, 'rb') as bz2_file:
-            with open(extracted_file_path, 'wb') as out_file:
-                out_file.write(bz2_file.read())
-
-        data = parse_file(extracted_file_path, logger)
-        if data:
-            all_data.append(data)
-
-    # Additional conditions can be added for other file formats
+    """Stream a .gz/.bz2/.xz source straight into the text, CSV, JSON or XML parser instead of a temp copy."""
+    try:
+        stream, inner_name, inner_type = compressed_stream.open_payload(file_path)
+    except (OSError, EOFError, compressed_stream.UnsupportedCompressionError) as e:
+        logger.error(f"Error opening compressed file {file_path}: {e}")
+        return
 
-# Modified extract_and_parse_compressed function with tqdm progress bar
-def extract_and_parse_compressed(folder_path, logger):
+    data = None
+    with stream:
+        logger.info(f"Streaming {inner_type} payload {inner_name} from {os.path.basename(file_path)}")
+        try:
+            if inner_type == 'tar':
+                # .tar.gz / .tgz: unpack sequentially from the decompressing stream
+                with tarfile.open(fileobj=stream, mode='r|') as tar:
+                    tar.extractall(temp_extract_path)
+                process_archive(temp_extract_path, logger, all_data)
+                return
+            elif inner_type == 'xml':
+                # The XML parser reads bytes itself so the declared encoding is honoured
+                data = parse_stream(stream, inner_name, inner_type, file_path, logger)
+            elif inner_type in ['text', 'csv', 'json']:
+                delimiter = compressed_stream.csv_delimiter(inner_name, stream.peek(compressed_stream.SNIFF_BYTES)) if inner_type == 'csv' else ','
+                text_file = compressed_stream.text_stream(stream, newline='' if inner_type == 'csv' else None)
+                data = parse_stream(text_file, inner_name, inner_type, file_path, logger, delimiter)
+            else:
+                # PDFs, images, documents etc. need a real file, spooled in fixed-size blocks
+                if not os.path.splitext(inner_name)[1]:
+                    inner_name += inner_type
+                extracted_file_path = compressed_stream.copy_to_file(stream, os.path.join(temp_extract_path, inner_name))
+                data = parse_file(extracted_file_path, logger)
+        except (OSError, EOFError, tarfile.TarError) as e:
+            logger.error(f"Error decompressing file {file_path}: {e}")
+
+    if data:
+        all_data.append(data)
+    flush_ocr()
+
+# Process one top-level entry of the source folder into its own partial result;
+# ignore_context holds the source root's ignore files, which apply below a top-level directory as well
+def process_source(file_path, logger=None, ignore_context=None):
+    logger = logger or logging.getLogger()
     all_data = []
     total_files_processed = 0
-    source_file_size = 0
-    source_name = None
-    for filename in os.listdir(folder_path):
-        file_path = os.path.join(folder_path, filename)
-        source_file_size += os.path.getsize(file_path)
-        source_name = filename
-
-        if filename.endswith('.7z'):
-            with py7zr.SevenZipFile(file_path, 'r') as archive:
-                file_count = len(archive.getnames())
-                total_files_processed += file_count
-                with tempfile.TemporaryDirectory() as temp_extract_path:
-                    archive.extractall(temp_extract_path)
-                    process_archive(temp_extract_path, logger, all_data)
+    filename = os.path.basename(file_path)
 
-        elif filename.endswith('.zip'):
-            with zipfile.ZipFile(file_path, 'r') as zip_ref:
-                file_count = len(zip_ref.infolist())
-                total_files_processed += file_count
-                with tempfile.TemporaryDirectory() as temp_extract_path:
-                    zip_ref.extractall(temp_extract_path)
-                    process_archive(temp_extract_path, logger, all_data)
-
-        elif filename.endswith('.tar'):
-            with tarfile.open(file_path, 'r') as tar:
-                file_count = len(tar.getnames())
-                total_files_processed += file_count
-                with tempfile.TemporaryDirectory() as temp_extract_path:
-                    tar.extractall(temp_extract_path)
-                    process_archive(temp_extract_path, logger, all_data)
+    if filename.endswith('.7z'):
+        with py7zr.SevenZipFile(file_path, 'r') as archive:
+            file_count = len(archive.getnames())
+            total_files_processed += file_count
+            with tempfile.TemporaryDirectory() as temp_extract_path:
+                archive.extractall(temp_extract_path)
+                process_archive(temp_extract_path, logger, all_data)
+
+    elif filename.endswith('.zip'):
+        with zipfile.ZipFile(file_path, 'r') as zip_ref:
+            file_count = len(zip_ref.infolist())
+            total_files_processed += file_count
+            with tempfile.TemporaryDirectory() as temp_extract_path:
+                zip_ref.extractall(temp_extract_path)
+                process_archive(temp_extract_path, logger, all_data)
 
-        elif filename.endswith(('.gz', '.bz2')):
+    elif filename.endswith('.tar'):
+        with tarfile.open(file_path, 'r') as tar:
+            file_count = len(tar.getnames())
+            total_files_processed += file_count
             with tempfile.TemporaryDirectory() as temp_extract_path:
-                process_single_file(file_path, temp_extract_path, logger, all_data)
+                tar.extractall(temp_extract_path)
+                process_archive(temp_extract_path, logger, all_data)
 
+    elif filename.endswith(('.gz', '.tgz', '.bz2', '.xz', '.lzma')):
+        with tempfile.TemporaryDirectory() as temp_extract_path:
+            process_single_file(file_path, temp_extract_path, logger, all_data)
+
+    elif file_path in CRAWL_SOURCES and os.path.isdir(file_path):
+        logger.info(f"Processing crawl output directory: {file_path}")
+        crawl = crawl_records.load_directory(file_path, CRAWL_CHUNK_BYTES, SPILL_DIR, CRAWL_WORKERS, crawl_executor())
+        total_files_processed += len(crawl['runs'])
+        all_data.append({'data': crawl, 'file_name': filename, 'file_size': sum(os.path.getsize(os.path.join(file_path, run)) for run in crawl['runs']), 'file_type': '', 'file_source': file_path})
+
+    else:
+        # if direcstory recrusively process files
+        if os.path.isdir(file_path):
+            process_directory(file_path, logger, all_data, ignore_context)
+        # if file process file
+        elif os.path.isfile(file_path):
+            data = parse_file(file_path, logger)
+            if data:
+                all_data.append(data)
         else:
-            # if direcstory recrusively process files
-            if os.path.isdir(file_path):
-                process_directory(file_path, logger, all_data)
-            # if file process file
-            elif os.path.isfile(file_path):
-                data = parse_file(file_path, logger)
-                if data:
-                    all_data.append(data)
-            else:
-                logger.warning(f"Skipped unrecognized file type: {filename}")
+            logger.warning(f"Skipped unrecognized file type: {filename}")
 
+    flush_ocr()
+    return all_data, total_files_processed
 
+# Estimate the temp disk space a source needs while it is being processed
+def estimate_temp_bytes(file_path):
+    try:
+        if file_path.endswith('.zip'):
+            with zipfile.ZipFile(file_path, 'r') as zip_ref:
+                return sum(info.file_size for info in zip_ref.infolist())
+        if file_path.endswith('.7z'):
+            with py7zr.SevenZipFile(file_path, 'r') as archive:
+                return archive.archiveinfo().uncompressed
+        if file_path.endswith(('.tar', '.gz', '.tgz', '.bz2', '.xz', '.lzma')):
+            return os.path.getsize(file_path)
+    except Exception:
+        return os.path.getsize(file_path)
+    # Plain files and directories are read in place
+    return 0
+
+# Logging for pool workers, which do not inherit the parent's handlers on spawn
+def init_source_worker(debug_mode):
+    logging.getLogger().handlers.clear()
+    setup_logger(config, debug_mode)
+
+# Run every top-level source, in a process pool when allowed, and return the partial results in input order
+def run_sources(sources, logger, ignore_context=None):
+    parallel_config = config.get('parallel_sources', {})
+    max_workers = parallel_config.get('max_workers') or os.cpu_count() or 1
+    max_temp_bytes = parallel_config.get('max_temp_bytes', 0)
+
+    if max_workers <= 1 or len(sources) <= 1:
+        return [process_source(file_path, logger, ignore_context) for file_path in sources]
+
+    temp_bytes = [estimate_temp_bytes(file_path) for file_path in sources]
+    results = [([], 0)] * len(sources)
+    waiting = deque(range(len(sources)))
+    running = {}
+    running_temp_bytes = 0
+    debug_mode = logger.getEffectiveLevel() == logging.DEBUG
+
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(sources)), initializer=init_source_worker, initargs=(debug_mode,)) as executor:
+        while waiting or running:
+            # Start sources in order while a worker is free and the temp space budget allows
+            while waiting and len(running) < max_workers:
+                idx = waiting[0]
+                if max_temp_bytes and running and running_temp_bytes + temp_bytes[idx] > max_temp_bytes:
+                    break
+                waiting.popleft()
+                running[executor.submit(process_source, sources[idx], None, ignore_context)] = idx
+                running_temp_bytes += temp_bytes[idx]
+                logger.info(f"Started source {os.path.basename(sources[idx])} ({len(running)} running)")
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                idx = running.pop(future)
+                running_temp_bytes -= temp_bytes[idx]
+                try:
+                    results[idx] = future.result()
+                    logger.info(f"Finished source {os.path.basename(sources[idx])}")
+                except Exception as e:
+                    logger.error(f"Error processing source {sources[idx]}: {e}")
 
+    return results
 
-    merged_data = validate_json_serializable(organize_data(all_data, source_name, logger),logger)
+# Modified extract_and_parse_compressed function with tqdm progress bar
+def extract_and_parse_compressed(folder_path, logger):
+    # Top-level entries go through IGNORE_NAMES and the root's ignore files like everything below them;
+    # sorted so the merged result does not depend on listing order or finishing order
+    entries, root_context = IGNORE_MATCHER.scan(folder_path)
+    sources = sorted(entry.path for entry in entries)
+    source_file_size = sum(os.path.getsize(file_path) for file_path in sources)
+    sources += [path for path in CRAWL_SOURCES if os.path.isdir(path)]
+    source_name = os.path.basename(sources[-1]) if sources else None
+
+    all_data = []
+    total_files_processed = 0
+    try:
+        for partial_data, file_count in run_sources(sources, logger, root_context):
+            all_data.extend(partial_data)
+            total_files_processed += file_count
+    finally:
+        shutdown_crawl_executor()
+
+    merged_data = organize_data(all_data, source_name, logger)
+    if CLUSTER_CONFIG.get('enabled'):
+        if chunk_clusters.available():
+            chunk_clusters.arrange(
+                merged_data,
+                dimensions=CLUSTER_CONFIG.get('dimensions', 512),
+                clusters=CLUSTER_CONFIG.get('clusters'),
+                duplicate_threshold=CLUSTER_CONFIG.get('duplicate_threshold', 0.97),
+                ngram=CLUSTER_CONFIG.get('ngram', 4),
+                logger=logger,
+            )
+        else:
+            logger.warning("Clustering is enabled but NumPy is not installed, keeping directory order")
 
 
     # logger.info(f"Organized data from {len(all_data)} files.")
@@ -323,8 +509,19 @@ def extract_and_parse_compressed(folder_path, logger):
     # output_file = os.path.join(folder_path, 'merged_data.json')
     output_file = os.path.join(OUTPUT_FOLDER, f"{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}_{config['project_name']}.json")
 
-    with open(output_file, 'w', encoding='utf-8') as file:
-        json.dump(merged_data, file, ensure_ascii=False, indent=4)
+    # Images are converted to base64 as they are written instead of copying the whole tree first
+    output_file, section_sizes = write_json_output(merged_data, output_file, logger)
+    for data_type in merged_data['data']:
+        logger.debug(f"Serialized size of {data_type} data: {section_sizes.get(('data', data_type), 0)} bytes")
+    # Written before the spill directory goes, spilled chunks are read a second time
+    if OUTPUT_KNOWLEDGE_FILE:
+        knowledge_path = os.path.splitext(output_file[:-3] if output_file.endswith('.gz') else output_file)[0] + knowledge_file.EXTENSION
+        stats = knowledge_file.write(merged_data, knowledge_path, project=config['project_name'], default=output_default(logger))
+        logger.info(f"Knowledge file saved to {knowledge_path} ({stats['chunks']} chunks, {stats['bytes']} bytes)")
+        if OUTPUT_SEARCH_INDEX:
+            index_file, index_stats = chunk_index.build(knowledge_path)
+            logger.info(f"Search index saved to {index_file} ({index_stats['terms']} terms)")
+    shutil.rmtree(SPILL_DIR, ignore_errors=True)
 
     output_file_size = os.path.getsize(output_file)
     size_difference = output_file_size - source_file_size
@@ -333,6 +530,28 @@ def extract_and_parse_compressed(folder_path, logger):
     logger.info(f"Size difference from source: {size_difference} bytes")
     return merged_data
 
+# Converts the values JSON cannot hold (images) for the output writers
+def output_default(logger):
+    def json_default(value):
+        if isinstance(value, Image.Image):
+            return image_to_base64(value, logger)
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+    return json_default
+
+# Stream organized data to disk with the configured output options, returns (path, serialized sizes per value)
+def write_json_output(data, output_file, logger, sort_keys=False):
+    if OUTPUT_GZIP and not output_file.endswith('.gz'):
+        output_file += '.gz'
+    _, sizes = json_stream.dump(
+        data,
+        output_file,
+        compact=OUTPUT_COMPACT,
+        gzip_output=OUTPUT_GZIP,
+        sort_keys=sort_keys,
+        default=output_default(logger),
+    )
+    return output_file, sizes
+
 def validate_json_serializable(data, logger):
     if isinstance(data, dict):
         return {k: validate_json_serializable(v, logger) for k, v in data.items()}
@@ -378,9 +597,14 @@ def parse_file(file_path, logger):
             try:
                 images = convert_from_path(file_path)
                 pdf_data = {'text': [], 'images': []}
-                for image in images:
-                    pdf_data['text'].append(pytesseract.image_to_string(image))
-                    pdf_data['images'].append(image)  # Store image object or convert to desired format
+                if OCR_BACKEND:
+                    # All pages of the PDF go through tesseract in shared batches
+                    pdf_data['text'] = OCR_BACKEND.image_to_string_many(images)
+                    pdf_data['images'] = images
+                else:
+                    for image in images:
+                        pdf_data['text'].append(pytesseract.image_to_string(image))
+                        pdf_data['images'].append(image)  # Store image object or convert to desired format
                 parsed_data = pdf_data
             except Exception as e:
                 logger.error(f"Error processing PDF file {file_path}: {e}")
@@ -393,15 +617,21 @@ def parse_file(file_path, logger):
                     logger.info(f"Image opened: {file_name}")
                     image_base64 = image_to_base64(image, logger)
                     logger.info(f"Image converted to base64: {file_name}")
-                    ocr_text = pytesseract.image_to_string(image)
-                    logger.info(f"Image converted to text: {file_name}")
                     image_info = {
                         'format': image.format,
                         'size': image.size,
                         'mode': image.mode,
-                        'ocr_text': ocr_text,
+                        'ocr_text': '',
                         'image_base64': image_base64
                     }
+                    if OCR_QUEUE:
+                        # Text is filled in when the queue flushes a full batch or the archive is done
+                        ocr_source = file_path if file_extension.lower() in ocr_batch.PATH_FORMATS else image
+                        OCR_QUEUE.submit(ocr_source, image_info)
+                        logger.info(f"Image queued for batched OCR: {file_name}")
+                    else:
+                        image_info['ocr_text'] = pytesseract.image_to_string(image)
+                        logger.info(f"Image converted to text: {file_name}")
                     parsed_data = image_info
                     logger.info(f"Image parsed with OCR: {file_name}")
                 except UnidentifiedImageError:
@@ -411,7 +641,8 @@ def parse_file(file_path, logger):
         elif file_extension.lower() in ['.json', '.babelrc', '.eslintrc']:
             logger.info(f"Processing JSON file: {file_name}")
             with open(file_path, 'r', encoding='utf-8') as file:
-                parsed_data = json.load(file)
+                # Streams top-level elements; crawl output comes back as CrawlRecords, files over the budget as ChunkedJSON
+                parsed_data = crawl_records.load(file, JSON_CHUNK_BYTES, CRAWL_CHUNK_BYTES, SPILL_DIR, CRAWL_WORKERS, crawl_executor())
 
         elif file_extension.lower() in ['.yml', '.yaml']:
             with open(file_path, 'r', encoding='utf-8') as file:
@@ -421,39 +652,80 @@ def parse_file(file_path, logger):
             with open(file_path, 'r', encoding='utf-8') as file:
                 parsed_data = file.read()
 
+        elif file_extension.lower() in ['.html', '.htm'] and HTML_TO_TEXT:
+            with open(file_path, 'r', encoding='utf-8', errors='replace') as file:
+                parsed_data = html_text.convert_file(file)
+
         elif file_extension.lower() in [ '.py', '.md', '.ts', '.js', '.html', '.php', '.xaml', '.editorconfig', '.gitignore', '.travis.yml'] or file_extension == '':
             with open(file_path, 'r', encoding='utf-8') as file:
                 content = file.read()
                 parsed_data = markdown2.markdown(content) if file_extension.lower() == '.md' else content
 
         elif file_extension.lower() == '.csv':
-            with open(file_path, newline='', encoding='utf-8') as file:
-                parsed_data = list(csv.reader(file))
+            schema, batches = csv_stream.ingest_file(file_path, CSV_BATCH_BYTES, SPILL_DIR)
+            parsed_data = {'schema': schema, 'batches': batches}
 
         elif file_extension.lower() == '.xml':
-            # tree = ET.parse(file_path)
-            # parsed_data = tree.getroot()
-            parsed_data = file.read();
+            # Record-like elements are rendered to text and cleared as they are read
+            parsed_data = xml_stream.load(file_path, XML_CHUNK_BYTES, SPILL_DIR)
 
         elif file_extension.lower() in ['.doc', '.docx']:
-            doc = Document(file_path)
-            parsed_data = [paragraph.text for paragraph in doc.paragraphs]
+            parsed_data = docx_stream.extract_text(file_path)
 
     except Exception as e:
         logger.error(f"Error processing file {file_path}: {e}")
 
     return {'data': parsed_data, 'file_name': file_name, 'file_size': file_size, "file_type": file_extension, "file_source": file_path} if parsed_data else None
 
+# Parse a decompressed text stream without writing it to disk
+def parse_stream(text_file, file_name, inner_type, file_source, logger, delimiter=','):
+    file_extension = os.path.splitext(file_name)[1].lower()
+    file_size = os.path.getsize(file_source)
+    logger.info(f"Parsing stream: {file_name} (Compressed size: {file_size} bytes)")
+
+    parsed_data = None
+    try:
+        if inner_type == 'json':
+            parsed_data = crawl_records.load(text_file, JSON_CHUNK_BYTES, CRAWL_CHUNK_BYTES, SPILL_DIR, CRAWL_WORKERS, crawl_executor())
+        elif inner_type == 'csv':
+            schema, batches = csv_stream.CSVIngestor(CSV_BATCH_BYTES, SPILL_DIR).ingest(text_file, delimiter)
+            parsed_data = {'schema': schema, 'batches': batches}
+        elif inner_type == 'xml':
+            parsed_data = xml_stream.load(text_file, XML_CHUNK_BYTES, SPILL_DIR)
+        elif file_extension in ['.html', '.htm'] and HTML_TO_TEXT:
+            parsed_data = html_text.convert_file(text_file)
+        else:
+            parsed_data = compressed_stream.read_text_chunks(text_file, TEXT_CHUNK_BYTES, SPILL_DIR)
+            if parsed_data['chunk_count'] <= 1:
+                # A payload that fits one chunk keeps the single-string form of a plain text file
+                content = ''.join(parsed_data['chunks'])
+                parsed_data = markdown2.markdown(content) if file_extension == '.md' else content
+            elif file_extension == '.md':
+                # Converted chunk by chunk as the output is written; the chunks are cut at line ends
+                parsed_data['chunks'] = json_stream.MappedList(parsed_data['chunks'], markdown2.markdown)
+    except Exception as e:
+        logger.error(f"Error processing stream {file_name} from {file_source}: {e}")
+
+    return {'data': parsed_data, 'file_name': file_name, 'file_size': file_size, "file_type": file_extension, "file_source": file_source} if parsed_data else None
+
 # Determine data type
 def determine_data_type(data, logger):
 
 
+    if isinstance(data, crawl_records.CrawlRecords):
+        return 'crawl'
+
     if (isinstance(data, dict) and data.get('file_type') == '.json'):
          return 'json'
 
+    if isinstance(data, xml_stream.XMLRecords):
+        return 'xml'
+
     if isinstance(data, dict):
         if 'text' in data and 'images' in data:
             return 'pdf'
+        elif 'schema' in data and 'batches' in data:
+            return 'csv'
         elif 'format' in data:
             return 'image'
         else:
@@ -541,7 +813,7 @@ def organize_data(data_list, source_name, logger):
         'metadata': {},
         'data': {
             'json': {}, 'csv': {}, 'xml': {}, 'text': {}, 'markdown': {},
-            'docx': {}, 'image': {}, 'other': {}, 'pdf': {}
+            'docx': {}, 'image': {}, 'other': {}, 'pdf': {}, 'crawl': {}
         }
     }
 
@@ -573,7 +845,7 @@ def organize_data(data_list, source_name, logger):
         file_source = data_item['file_source']
 
         # if is compressed file then set current_compressed_file to file_name else set to None
-        if file_extension in ['.7z', '.zip', '.tar', '.gz', '.bz2']:
+        if file_extension in ['.7z', '.zip', '.tar', '.gz', '.bz2', '.xz']:
             current_compressed_file = file_name
         else:
             current_compressed_file = None
@@ -581,10 +853,14 @@ def organize_data(data_list, source_name, logger):
         # Determine the type of data (e.g., pdf, image, json)
         logger.debug(f"Determining data type for file {file_name} with extension {file_extension}")
 
-        if (file_extension==".json"):
+        if isinstance(data_item['data'], crawl_records.CrawlRecords):
+            data_type = 'crawl'
+        elif (file_extension==".json"):
             data_type = 'json'
         elif (file_extension==".md"):
             data_type = 'markdown'
+        elif isinstance(data_item['data'], compressed_stream.TextChunks):
+            data_type = 'text'
         else:
             data_type = determine_data_type(data_item['data'], logger)
 
@@ -631,63 +907,31 @@ def organize_data(data_list, source_name, logger):
 
         # handle JSON data specifically
         if data_type in ['json']:
-            # measure size of JSON data
-            json_size = len(json.dumps(data_item['data'], ensure_ascii=False, indent=4).encode('utf-8'))
-            logger.debug(f"Size of JSON data: {json_size} bytes")
-            # if JSON data is larger than config['json_chunk_size_bytes'] or config['text_chunk_size_bytes']
-            if json_size > config['json_chunk_size_bytes'] or json_size > text_chunk_size_bytes:
-
-                temp_json = data_item['data'] # json.dumps(data_item['data'], ensure_ascii=False, indent=4)
-                chunks = [];
-                for value in temp_json:
-                    for key in value:
-                        # logging.debug(f"Key: {key}")
-                        chunks.append(
-                            split_text_into_chunks(value[key], text_chunk_size_bytes, max_line_length)
-                        )
-
-                for idx, chunk in enumerate(chunks):
-                    chunk_key = f"{data_key}_chunk_{idx}"
-
-                    try:
-                        organized_data['metadata'][data_key][chunk_key] = {
-                            # 'type': 'json_chunk',
-                            # 'description': f"Chunk {idx} of {data_key}",
-                            'file_name': data_item['file_name'],
-                            # 'file_size': len(chunk.encode('utf-8')),
-                            # 'source': extract_source(data_item['file_source'])
-                        }
-                        if data_key not in organized_data['data'][data_type]:
-                            organized_data['data'][data_type][data_key] = {}
-                            organized_data['data'][data_type][data_key][chunk_key] = {}
-                        organized_data['data'][data_type][data_key][chunk_key] = {
-                            'data': '',
-                            'metadata': {
-                                # 'type': 'json_chunk',
-                                # 'description': f"Chunk {idx} of {data_key}",
-                                'file_name': data_item['file_name'],
-                                # 'file_size': len(chunk.encode('utf-8')),
-                                # 'source': extract_source(data_item['file_source']),
-                                # 'chunk_size': len(chunk.encode('utf-8')),
-                                'chunk_number': idx,
-                                # 'total_chunks': len(chunks)
-                            }
-                        }
-
-                        try:
-                            organized_data['data'][data_type][data_key][chunk_key]['data'] = json.loads(chunk)
-                        except Exception as e:
-                            organized_data['data'][data_type][data_key][chunk_key]['data'] = (chunk)
-                            # logger.warning(f"Error parsing JSON chunk {idx} from {chunk}: {e} falling back to text")
-                        # Store metadata for each chunk
-
-                    except Exception as e:
-                        logger.error(f"Error parsing JSON chunk {idx} from {chunk}: {e}")
-
-                    logger.debug(f"Added JSON chunk {idx} to organized data")
+            json_data = data_item['data']
+            if not isinstance(json_data, json_incremental.ChunkedJSON):
+                # measure size of JSON data
+                json_size = json_stream.serialized_size(json_data, compact=OUTPUT_COMPACT)
+                logger.debug(f"Size of JSON data: {json_size} bytes")
+                # Small files are loaded whole by parse_file, split them element by element if they still exceed the budget
+                if json_size > JSON_CHUNK_BYTES:
+                    json_data = json_incremental.chunk_value(json_data, JSON_CHUNK_BYTES, SPILL_DIR, compact=OUTPUT_COMPACT)
+
+            if isinstance(json_data, json_incremental.ChunkedJSON):
+                # Each chunk carries the JSON paths of the elements it holds
+                organized_data['data'][data_type][data_key] = {
+                    'data': json_data['chunks'],
+                    'metadata': {
+                        'file_name': data_item['file_name'],
+                        'file_size': data_item['file_size'],
+                        'root_type': json_data['root_type'],
+                        'element_count': json_data['element_count'],
+                        'chunk_count': json_data['chunk_count'],
+                    }
+                }
+                logger.debug(f"Added {json_data['chunk_count']} JSON chunks from {data_item['file_name']} to organized data")
             else:
                 organized_data['data'][data_type][data_key] = {
-                    'data': data_item['data'],
+                    'data': json_data,
                     'metadata': {
                         # 'type': 'json',
                         # 'description': f"JSON data from {data_item['file_name']}",
@@ -695,6 +939,20 @@ def organize_data(data_list, source_name, logger):
                         'file_size': json_size,
                     }
                 }
+        # Handle crawl output: one entry per page, its title and URL kept beside the page's chunks
+        if data_type == 'crawl':
+            crawl = data_item['data']
+            organized_data['data']['crawl'][data_key] = {
+                'data': crawl['pages'],
+                'metadata': {
+                    'file_name': data_item['file_name'],
+                    'file_size': data_item['file_size'],
+                    'page_count': crawl['page_count'],
+                    'chunk_count': crawl['chunk_count'],
+                    'duplicates': crawl['duplicates'],
+                }
+            }
+            logger.debug(f"Added {crawl['page_count']} crawled pages from {data_item['file_name']} to organized data")
         #
         #
         # Handle text-based data including HTML, text, markdown, PDF, and others
@@ -709,8 +967,21 @@ def organize_data(data_list, source_name, logger):
                 text_content = json.dumps(data_item['data'], ensure_ascii=False, indent=4)
                 logger.debug(f"JSON data converted to text: {text_content}")
 
+            if isinstance(text_content, compressed_stream.TextChunks):
+                # Streamed payloads arrive already cut into chunks, which may be spilled to disk
+                organized_data['data'][data_type][data_key] = {
+                    'chunks': text_content['chunks'],
+                    'metadata': {
+                        'type': data_type,
+                        'description': f"{data_type} data from {data_item['file_name']}",
+                        'file_name': data_item['file_name'],
+                        'file_size': data_item['file_size'],
+                        'chunk_count': text_content['chunk_count'],
+                        'source': extract_source(data_item['file_source'])
+                    }
+                }
             # Split text content into chunks if it exceeds size or line length limits
-            if len(text_content.encode('utf-8')) > text_chunk_size_bytes or any(len(line) > max_line_length for line in text_content.split('\n')):
+            elif len(text_content.encode('utf-8')) > text_chunk_size_bytes or any(len(line) > max_line_length for line in text_content.split('\n')):
                 chunks = split_text_into_chunks(text_content, text_chunk_size_bytes, max_line_length)
                 for idx, chunk in enumerate(chunks):
                     chunk_key = f"{data_key}_chunk_{idx}"
@@ -770,11 +1041,17 @@ def organize_data(data_list, source_name, logger):
                             'type': 'text_chunk',
                             'chunks': chunks
                         }
+                    elif isinstance(value, json_stream.LazyList):
+                        # Spilled lists are nested item by item as they are read back
+                        data[key] = json_stream.MappedList(value, process_data)
                     else:
                         process_data(value)
             elif isinstance(data, list):
                 for i in range(len(data)):
-                    process_data(data[i])
+                    if isinstance(data[i], json_stream.LazyList):
+                        data[i] = json_stream.MappedList(data[i], process_data)
+                    else:
+                        process_data(data[i])
             return data
 
         processed_data = process_data(organized_data)
@@ -798,7 +1075,8 @@ def process_for_scriptgpt(processing_data, logger):
         'markdown': {},
         'docx': {},
         'image': {},
-        'pdf': {}
+        'pdf': {},
+        'crawl': {}
     }
 
     try:
@@ -834,8 +1112,7 @@ def process_for_scriptgpt(processing_data, logger):
 # Output data
 def output_data(data, folder_path, logger):
     output_file = os.path.join(folder_path, 'organized_data.json')
-    with open(output_file, 'w', encoding='utf-8') as file:
-        json.dump(data, file, ensure_ascii=False, indent=4, sort_keys=True)
+    output_file, _ = write_json_output(data, output_file, logger, sort_keys=True)
 
     logger.info(colored(f"Data organized and saved to {output_file}", "green"))
 
@@ -0,0 +1,184 @@
+import argparse
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytesseract
+from PIL import Image
+
+# Tesseract writes this after every page of a multi-image run
+PAGE_SEPARATOR = '\f'
+
+# Image modes tesseract reads straight from an uncompressed BMP
+BMP_MODES = ('1', 'L', 'RGB')
+
+# Formats tesseract (leptonica) can open by path, anything else is handed over as a PIL image
+PATH_FORMATS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tif', '.tiff', '.webp', '.pnm')
+
+
+class BatchOCR:
+    """
+    Runs tesseract once per batch of images instead of once per image.
+
+    Each batch is written to a list file (one image path per line), passed to a
+    single tesseract process, and the combined output is split back per image on
+    the page separator. Several batches can run side by side.
+    """
+
+    def __init__(self, batch_size=32, max_concurrent_batches=2, lang=None, tesseract_config='', tesseract_cmd=None):
+        self.batch_size = max(1, int(batch_size))
+        self.max_concurrent_batches = max(1, int(max_concurrent_batches))
+        self.lang = lang
+        self.tesseract_config = tesseract_config
+        self.tesseract_cmd = tesseract_cmd or pytesseract.pytesseract.tesseract_cmd
+
+    def image_to_string_many(self, images):
+        """OCR a list of image paths or PIL images, returning the texts in the same order."""
+        images = list(images)
+        if not images:
+            return []
+
+        temp_dir = tempfile.mkdtemp(prefix='ocr_batch_')
+        try:
+            paths = [self._to_path(image, temp_dir, idx) for idx, image in enumerate(images)]
+            batches = [paths[i:i + self.batch_size] for i in range(0, len(paths), self.batch_size)]
+
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrent_batches, len(batches))) as executor:
+                results = list(executor.map(lambda args: self._run_batch(*args), [(batch, temp_dir, idx) for idx, batch in enumerate(batches)]))
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+        return [text for batch_texts in results for text in batch_texts]
+
+    def image_to_string(self, image):
+        return self.image_to_string_many([image])[0]
+
+    def _to_path(self, image, temp_dir, idx):
+        if isinstance(image, (str, os.PathLike)):
+            return os.path.abspath(image)
+
+        if image.mode not in BMP_MODES:
+            image = image.convert('RGB')
+        image_path = os.path.join(temp_dir, f"image_{idx}.bmp")
+        image.save(image_path, format='BMP')
+        return image_path
+
+    def _command(self, list_file, output_base):
+        command = [self.tesseract_cmd, list_file, output_base]
+        if self.lang:
+            command += ['-l', self.lang]
+        if self.tesseract_config:
+            command += self.tesseract_config.split()
+        return command
+
+    def _run_batch(self, paths, temp_dir, batch_idx):
+        list_file = os.path.join(temp_dir, f"batch_{batch_idx}.txt")
+        output_base = os.path.join(temp_dir, f"batch_{batch_idx}_out")
+        with open(list_file, 'w', encoding='utf-8') as file:
+            file.write('\n'.join(paths) + '\n')
+
+        try:
+            subprocess.run(self._command(list_file, output_base), check=True, capture_output=True)
+            with open(output_base + '.txt', 'r', encoding='utf-8') as file:
+                pages = file.read().split(PAGE_SEPARATOR)
+        except (OSError, subprocess.CalledProcessError) as e:
+            logging.warning(f"Batched OCR failed for batch {batch_idx} ({len(paths)} images), falling back to per-image calls: {e}")
+            return self._run_single(paths)
+
+        # Trailing separator leaves one empty element after the last page
+        if pages and pages[-1].strip() == '':
+            pages = pages[:-1]
+
+        # Multi-frame inputs (e.g. TIFF) emit extra pages, so the split is no longer one-to-one
+        if len(pages) != len(paths):
+            logging.warning(f"Batched OCR returned {len(pages)} pages for {len(paths)} images, falling back to per-image calls")
+            return self._run_single(paths)
+
+        return pages
+
+    def _run_single(self, paths):
+        return [pytesseract.image_to_string(Image.open(path), lang=self.lang, config=self.tesseract_config) for path in paths]
+
+
+class OCRQueue:
+    """
+    Collects images from separate files so they can share tesseract batches.
+
+    `submit` records the image (path or PIL image) and the dict whose `key`
+    receives the text. Results are written when `flush` is called, or
+    automatically once enough images are pending to fill every concurrent batch.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.pending = []
+
+    def submit(self, image, target, key='ocr_text'):
+        self.pending.append((image, target, key))
+        if len(self.pending) >= self.backend.batch_size * self.backend.max_concurrent_batches:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        pending, self.pending = self.pending, []
+        texts = self.backend.image_to_string_many([image for image, _, _ in pending])
+        for (_, target, key), text in zip(pending, texts):
+            target[key] = text
+
+
+# Build a backend from the 'ocr' section of the config, or None for per-image pytesseract calls
+def create_backend(config):
+    ocr_config = config.get('ocr', {})
+    if ocr_config.get('backend', 'pytesseract') != 'batch':
+        return None
+    return BatchOCR(
+        batch_size=ocr_config.get('batch_size', 32),
+        max_concurrent_batches=ocr_config.get('max_concurrent_batches', 2),
+        lang=ocr_config.get('lang'),
+        tesseract_config=ocr_config.get('tesseract_config', ''),
+    )
+
+
+# Compare per-image pytesseract calls against batched invocation on a folder of images / PDFs
+def benchmark(paths, batch_size, max_concurrent_batches):
+    images = []
+    for path in paths:
+        if path.lower().endswith('.pdf'):
+            from pdf2image import convert_from_path
+            images.extend(convert_from_path(path))
+        else:
+            images.append(path)
+
+    start_time = time.time()
+    single = [pytesseract.image_to_string(Image.open(image) if isinstance(image, str) else image) for image in images]
+    single_time = time.time() - start_time
+
+    backend = BatchOCR(batch_size=batch_size, max_concurrent_batches=max_concurrent_batches)
+    start_time = time.time()
+    batched = backend.image_to_string_many(images)
+    batched_time = time.time() - start_time
+
+    matching = sum(1 for a, b in zip(single, batched) if a.strip() == b.strip())
+    print(f"Images: {len(images)}")
+    print(f"Per-image calls:  {single_time:.2f}s ({len(images) / single_time if single_time else 0:.1f} images/s)")
+    print(f"Batched calls:    {batched_time:.2f}s ({len(images) / batched_time if batched_time else 0:.1f} images/s)")
+    print(f"Speedup: {single_time / batched_time if batched_time else 0:.2f}x, identical output for {matching}/{len(images)} images")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark batched tesseract invocation against per-image calls')
+    parser.add_argument('folder', help='Folder of images and/or PDFs to OCR')
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--max-concurrent-batches', type=int, default=2)
+    args = parser.parse_args()
+
+    files = sorted(
+        os.path.join(args.folder, name) for name in os.listdir(args.folder)
+        if os.path.splitext(name)[1].lower() in PATH_FORMATS + ('.pdf',)
+    )
+    benchmark(files, args.batch_size, args.max_concurrent_batches)
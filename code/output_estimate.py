@@ -0,0 +1,359 @@
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import re
+import shutil
+import tempfile
+import time
+
+import docx_stream
+import html_text
+import xml_stream
+
+CACHE_FILE = '.output_estimate_cache.json'
+CACHE_VERSION = 1
+
+# How merge_zip_contents.parse_file treats each extension
+CATEGORIES = {
+    '.pdf': 'pdf',
+    '.bmp': 'image', '.jpeg': 'image', '.png': 'image', '.gif': 'image', '.img': 'image', '.ico': 'image',
+    '.svg': 'image', '.psd': 'image', '.xcf': 'image',
+    '.json': 'json', '.babelrc': 'json', '.eslintrc': 'json',
+    '.yml': 'yaml', '.yaml': 'yaml',
+    '.txt': 'text', '.py': 'text', '.ts': 'text', '.js': 'text', '.php': 'text', '.xaml': 'text',
+    '.editorconfig': 'text', '.gitignore': 'text', '': 'text',
+    '.md': 'markdown',
+    '.html': 'html', '.htm': 'html',
+    '.csv': 'csv',
+    '.xml': 'xml',
+    '.doc': 'docx', '.docx': 'docx',
+    '.zip': 'archive', '.7z': 'archive', '.tar': 'archive', '.gz': 'archive', '.tgz': 'archive',
+    '.bz2': 'archive', '.xz': 'archive', '.lzma': 'archive',
+}
+
+# Output bytes per input byte when a type has no measured samples
+DEFAULT_RATIOS = {
+    'text': 1.05, 'markdown': 1.2, 'html': 0.3, 'json': 0.9, 'yaml': 1.0, 'csv': 1.4, 'xml': 0.7,
+    'docx': 0.4, 'image': 2.0, 'pdf': 20.0, 'archive': 3.0, 'other': 0.0,
+}
+
+# Rough output bytes per token: prose tokenizes well, punctuation-heavy JSON/CSV worse, base64 badly
+BYTES_PER_TOKEN = {
+    'text': 4.0, 'markdown': 4.0, 'html': 4.0, 'docx': 4.0, 'archive': 4.0, 'xml': 3.5,
+    'json': 3.0, 'yaml': 3.0, 'csv': 2.5, 'image': 2.0, 'pdf': 2.0, 'other': 4.0,
+}
+BASE64_BYTES_PER_TOKEN = 2.0
+TEXT_BYTES_PER_TOKEN = 4.0
+
+# PDF pages are rendered at pdf2image's 200 dpi and kept as base64 PNG beside their OCR text
+PDF_PAGE_IMAGE_BYTES = 250000
+PDF_PAGE_TEXT_BYTES = 2500
+PDF_PAGE = re.compile(rb'/Type\s*/Page(?!s)')
+
+# OCR text assumed per image
+IMAGE_TEXT_BYTES = 500
+
+# Only files up to this size are sampled, and text-like samples read at most SAMPLE_READ_BYTES
+SAMPLE_MAX_BYTES = 4 * 1024 * 1024
+SAMPLE_READ_BYTES = 256 * 1024
+
+
+def category(path):
+    return CATEGORIES.get(os.path.splitext(path)[1].lower(), 'other')
+
+
+def _read_text(path):
+    with open(path, 'rb') as file:
+        raw = file.read(SAMPLE_READ_BYTES)
+    return raw, raw.decode('utf-8', errors='ignore')
+
+
+def _json_string_bytes(text):
+    return len(json.dumps(text, ensure_ascii=False).encode('utf-8'))
+
+
+def measure_text(path):
+    raw, text = _read_text(path)
+    return len(raw), _json_string_bytes(text)
+
+
+def measure_markdown(path):
+    raw, text = _read_text(path)
+    try:
+        import markdown2
+        text = markdown2.markdown(text)
+    except ImportError:
+        return None
+    return len(raw), _json_string_bytes(text)
+
+
+def measure_html(path):
+    raw, text = _read_text(path)
+    return len(raw), _json_string_bytes(html_text.html_to_text(text))
+
+
+def measure_json(path):
+    with open(path, 'rb') as file:
+        raw = file.read()
+    value = json.loads(raw)
+    return len(raw), len(json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+
+def measure_yaml(path):
+    try:
+        import yaml
+    except ImportError:
+        return None
+    with open(path, 'rb') as file:
+        raw = file.read()
+    return len(raw), len(json.dumps(yaml.safe_load(raw), ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8'))
+
+
+def measure_csv(path):
+    raw, text = _read_text(path)
+    # Drop the last, possibly cut, line of the sample
+    if len(raw) == SAMPLE_READ_BYTES:
+        text = text[:text.rfind('\n') + 1]
+    rows = list(csv.reader(io.StringIO(text)))
+    return len(text.encode('utf-8')), len(json.dumps(rows, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+
+def measure_xml(path):
+    output = sum(_json_string_bytes(text) for _, text in xml_stream.iter_records(path))
+    return os.path.getsize(path), output
+
+
+def measure_docx(path):
+    return os.path.getsize(path), _json_string_bytes(docx_stream.extract_text(path))
+
+
+def measure_image(path):
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    buffer = io.BytesIO()
+    with Image.open(path) as image:
+        image.save(buffer, format='PNG')
+    image_bytes = (buffer.tell() + 2) // 3 * 4
+    output = image_bytes + IMAGE_TEXT_BYTES
+    return os.path.getsize(path), output, image_bytes / BASE64_BYTES_PER_TOKEN + IMAGE_TEXT_BYTES / TEXT_BYTES_PER_TOKEN
+
+
+def measure_pdf(path):
+    with open(path, 'rb') as file:
+        raw = file.read()
+    pages = max(1, len(PDF_PAGE.findall(raw)))
+    image_bytes = PDF_PAGE_IMAGE_BYTES * 4 // 3
+    output = pages * (image_bytes + PDF_PAGE_TEXT_BYTES)
+    return len(raw), output, pages * (image_bytes / BASE64_BYTES_PER_TOKEN + PDF_PAGE_TEXT_BYTES / TEXT_BYTES_PER_TOKEN)
+
+
+MEASURES = {
+    'text': measure_text, 'markdown': measure_markdown, 'html': measure_html, 'json': measure_json,
+    'yaml': measure_yaml, 'csv': measure_csv, 'xml': measure_xml, 'docx': measure_docx,
+    'image': measure_image, 'pdf': measure_pdf,
+}
+
+
+class OutputEstimator:
+    """
+    Predicts compiled output bytes and tokens of a selection without compiling it.
+
+    Files are grouped by how parse_file treats their extension. A few files
+    of each group (up to samples_per_type, small ones only) are run through
+    the same conversion the compiler uses, or a cheap model of it for PDFs
+    and images, to get output bytes and tokens per input byte; the rest are
+    scaled by that ratio. Measured files are kept in CACHE_FILE by path and
+    size and reused exactly, and count as samples next time. Sampling stops
+    when time_budget runs out; groups without samples use DEFAULT_RATIOS.
+    """
+
+    def __init__(self, cache_file=CACHE_FILE, samples_per_type=8, time_budget=0.5, html_to_text=True, seed=0):
+        self.cache_file = cache_file
+        self.samples_per_type = samples_per_type
+        self.time_budget = time_budget
+        self.html_to_text = html_to_text
+        self.random = random.Random(seed)
+        self.cache = self._load_cache()
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+            if data.get('version') == CACHE_VERSION:
+                return data['files']
+        except (OSError, ValueError, AttributeError, KeyError):
+            pass
+        return {}
+
+    def save(self):
+        temp_path = self.cache_file + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump({'version': CACHE_VERSION, 'files': self.cache}, file)
+        os.replace(temp_path, self.cache_file)
+
+    def _category(self, path):
+        kind = category(path)
+        return 'text' if kind == 'html' and not self.html_to_text else kind
+
+    def _measure(self, kind, path, size):
+        """Measure one file, caching its extrapolated output; None if it cannot be measured here."""
+        try:
+            result = MEASURES[kind](path)
+        except Exception:
+            return None
+        if result is None or not result[0]:
+            return None
+        consumed, output = result[0], result[1]
+        tokens = result[2] if len(result) > 2 else output / BYTES_PER_TOKEN[kind]
+        scale = size / consumed
+        entry = self.cache[path] = [size, round(output * scale), round(tokens * scale)]
+        return entry
+
+    def estimate(self, files):
+        """
+        files: (path, size) pairs. Returns {'bytes', 'tokens', 'raw_bytes', 'files', 'by_type', 'elapsed'},
+        by_type holding the same totals per group plus how many files were measured or cached.
+        """
+        start = time.perf_counter()
+        deadline = start + self.time_budget
+        groups = {}
+        for path, size in files:
+            groups.setdefault(self._category(path), []).append((path, size))
+
+        by_type = {}
+        for kind, members in groups.items():
+            exact_bytes = exact_tokens = exact_raw = 0
+            sample_raw = sample_bytes = sample_tokens = 0
+            cached = 0
+            estimated = []
+            for path, size in members:
+                entry = self.cache.get(path)
+                if entry and entry[0] == size:
+                    exact_raw += size
+                    exact_bytes += entry[1]
+                    exact_tokens += entry[2]
+                    cached += 1
+                else:
+                    estimated.append((path, size))
+
+            # Cached files calibrate the rest; top up with fresh samples while there is time
+            sample_raw, sample_bytes, sample_tokens = exact_raw, exact_bytes, exact_tokens
+            measured = 0
+            if kind in MEASURES and cached < self.samples_per_type:
+                candidates = [item for item in estimated if 0 < item[1] <= SAMPLE_MAX_BYTES]
+                picks = self.random.sample(candidates, min(len(candidates), self.samples_per_type - cached))
+                picked = set()
+                for path, size in picks:
+                    if time.perf_counter() > deadline:
+                        break
+                    entry = self._measure(kind, path, size)
+                    if entry is None:
+                        continue
+                    picked.add(path)
+                    measured += 1
+                    exact_raw += size
+                    exact_bytes += entry[1]
+                    exact_tokens += entry[2]
+                    sample_raw += size
+                    sample_bytes += entry[1]
+                    sample_tokens += entry[2]
+                if picked:
+                    estimated = [item for item in estimated if item[0] not in picked]
+
+            if sample_raw:
+                ratio, token_ratio = sample_bytes / sample_raw, sample_tokens / sample_raw
+            else:
+                ratio = DEFAULT_RATIOS[kind]
+                token_ratio = ratio / BYTES_PER_TOKEN[kind]
+            rest_raw = sum(size for _, size in estimated)
+            by_type[kind] = {
+                'files': len(members),
+                'raw_bytes': exact_raw + rest_raw,
+                'bytes': round(exact_bytes + rest_raw * ratio),
+                'tokens': round(exact_tokens + rest_raw * token_ratio),
+                'cached': cached,
+                'measured': measured,
+            }
+
+        if any(entry['measured'] for entry in by_type.values()):
+            try:
+                self.save()
+            except OSError:
+                pass
+        return {
+            'files': sum(entry['files'] for entry in by_type.values()),
+            'raw_bytes': sum(entry['raw_bytes'] for entry in by_type.values()),
+            'bytes': sum(entry['bytes'] for entry in by_type.values()),
+            'tokens': sum(entry['tokens'] for entry in by_type.values()),
+            'by_type': by_type,
+            'elapsed': time.perf_counter() - start,
+        }
+
+
+def estimate_selection(files, **options):
+    return OutputEstimator(**options).estimate(files)
+
+
+# Sized (path, size) pairs for every file under `root`
+def list_files(root):
+    files = []
+    for folder, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(folder, name)
+            files.append((path, os.path.getsize(path)))
+    return files
+
+
+# `count` small files of mixed types, for the benchmark
+def make_fixture(root, count):
+    templates = {
+        '.txt': 'Plain text line with some words.\n' * 20,
+        '.md': '# Title\n\nSome *markdown* text.\n' * 20,
+        '.html': '<html><body><nav>menu</nav><h1>T</h1><p>Paragraph text here.</p></body></html>' * 10,
+        '.json': json.dumps({'items': [{'id': i, 'name': f"item {i}"} for i in range(20)]}, indent=4),
+        '.csv': 'id,name,value\n' + ''.join(f"{i},name {i},{i * 1.5}\n" for i in range(50)),
+        '.xml': '<?xml version="1.0"?><urlset>' + ''.join(f"<url><loc>https://x/{i}</loc></url>" for i in range(20)) + '</urlset>',
+        '.bin': 'x' * 100,
+    }
+    extensions = list(templates)
+    for idx in range(count):
+        folder = os.path.join(root, f"d{idx // 1000}")
+        os.makedirs(folder, exist_ok=True)
+        extension = extensions[idx % len(extensions)]
+        with open(os.path.join(folder, f"f{idx}{extension}"), 'w', encoding='utf-8') as file:
+            file.write(templates[extension])
+
+
+def print_estimate(result):
+    for kind, entry in sorted(result['by_type'].items(), key=lambda item: -item[1]['bytes']):
+        print(f"  {kind:<8} {entry['files']:>7} files  {entry['raw_bytes'] / 1024 ** 2:>9.2f} MB in  {entry['bytes'] / 1024 ** 2:>9.2f} MB out  ~{entry['tokens']:>12,} tokens  ({entry['measured']} measured, {entry['cached']} cached)")
+    print(f"Total: {result['files']} files, {result['raw_bytes'] / 1024 ** 2:.2f} MB in, ~{result['bytes'] / 1024 ** 2:.2f} MB out, ~{result['tokens']:,} tokens ({result['elapsed'] * 1000:.0f} ms)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Estimate compiled output size and tokens for files or folders')
+    parser.add_argument('paths', nargs='*', help='Files or folders to estimate')
+    parser.add_argument('--benchmark', type=int, metavar='FILES', help='Estimate a generated tree of this many files, cold and then cached')
+    args = parser.parse_args()
+
+    if args.benchmark:
+        root = tempfile.mkdtemp()
+        try:
+            make_fixture(root, args.benchmark)
+            files = list_files(root)
+            cache_file = os.path.join(root, CACHE_FILE)
+            for run in ['cold', 'cached']:
+                print(f"{run}:")
+                print_estimate(estimate_selection(files, cache_file=cache_file))
+        finally:
+            shutil.rmtree(root)
+    else:
+        files = []
+        for path in args.paths:
+            files.extend(list_files(path) if os.path.isdir(path) else [(path, os.path.getsize(path))])
+        print_estimate(estimate_selection(files))
@@ -1,14 +1,27 @@
 import os
+import sys
+import gzip
 import json
+import queue
+import threading
 import keyboard
 import subprocess
 
+import output_estimate
+
 CACHE_FILE = '.file_selection_cache'
 LIBRARY_PATH = './source'
 
+# Warn once the selection is larger than this
+SIZE_WARNING_BYTES = 40 * 1024 * 1024
+
+# Redraw this often while sizes are still loading, in seconds
+REFRESH_SECONDS = 0.25
+
 def get_terminal_size():
     try:
-        rows, columns = os.get_terminal_size(0)
+        size = os.get_terminal_size()
+        rows, columns = size.lines, size.columns
     except OSError:
         try:
             rows, columns = subprocess.check_output(['stty', 'size']).split()
@@ -27,66 +40,183 @@ def format_size(size_bytes):
         size_bytes /= 1024
     return f"{size_bytes:.2f}GB"
 
+# The selection cache is the sorted relative paths, one per line, gzipped; older caches were a JSON list
 def load_cache():
     try:
-        with open(CACHE_FILE, 'r') as file:
-            return json.load(file)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return []
+        with open(CACHE_FILE, 'rb') as file:
+            data = file.read()
+    except FileNotFoundError:
+        return set()
+    try:
+        if data[:2] == b'\x1f\x8b':
+            return set(filter(None, gzip.decompress(data).decode('utf-8').split('\n')))
+        return set(json.loads(data.decode('utf-8')))
+    except (OSError, ValueError):
+        return set()
 
 def save_cache(selected_files):
-    with open(CACHE_FILE, 'w') as file:
-        json.dump(selected_files, file)
-
-def print_files(files, selected_files, index, total_size):
-    _, columns = get_terminal_size()
-    os.system('cls' if os.name == 'nt' else 'clear')
-    for i, (file, size) in enumerate(files):
-        prefix = '[X]' if file in selected_files else '[ ]'
+    with open(CACHE_FILE, 'wb') as file:
+        file.write(gzip.compress('\n'.join(sorted(selected_files)).encode('utf-8')))
+
+class FileList:
+    """
+    The library's files with sizes loaded in a background thread, and the selection.
+
+    Paths are listed without stat calls so the picker opens at once; a loader
+    thread fills in sizes while the user navigates. The selection is a set and
+    its total size is kept up to date on every toggle, and as sizes of
+    already selected files arrive.
+    """
+
+    def __init__(self, files, selected_files=()):
+        self.files = files
+        self.sizes = [None] * len(files)
+        self.positions = {file: i for i, file in enumerate(files)}
+        self.lock = threading.Lock()
+        self.loaded = 0
+        self.estimate = None
+        self.select_all(selected_files)
+        self.loader = threading.Thread(target=self._load_sizes, daemon=True)
+
+    def start(self):
+        self.loader.start()
+        return self
+
+    def _load_sizes(self):
+        for i, file in enumerate(self.files):
+            try:
+                size = get_file_size(os.path.join(LIBRARY_PATH, file))
+            except OSError:
+                size = 0
+            with self.lock:
+                self.sizes[i] = size
+                self.loaded += 1
+                if file in self.selected:
+                    self.total_size += size
+                    self.pending -= 1
+
+    @property
+    def loading(self):
+        return self.loaded < len(self.files)
+
+    def select_all(self, selected_files):
+        """Replace the selection, ignoring files no longer in the library."""
+        with self.lock:
+            self.selected = {file for file in selected_files if file in self.positions}
+            known = [self.sizes[self.positions[file]] for file in self.selected]
+            self.total_size = sum(size for size in known if size is not None)
+            self.pending = sum(size is None for size in known)
+
+    def toggle(self, index):
+        file = self.files[index]
+        with self.lock:
+            size = self.sizes[index]
+            sign = -1 if file in self.selected else 1
+            if sign > 0:
+                self.selected.add(file)
+            else:
+                self.selected.remove(file)
+            if size is None:
+                self.pending += sign
+            else:
+                self.total_size += sign * size
+
+    def estimate_output(self):
+        """Estimate compiled output of the selection's files whose sizes are known."""
+        with self.lock:
+            files = [(os.path.join(LIBRARY_PATH, file), self.sizes[self.positions[file]]) for file in self.selected]
+        self.estimate = output_estimate.estimate_selection([(path, size) for path, size in files if size is not None])
+        return self.estimate
+
+# Scroll offset that keeps `index` inside a window of `height` rows
+def window_top(top, index, height):
+    if index < top:
+        return index
+    if index >= top + height:
+        return index - height + 1
+    return top
+
+def fit(text, width):
+    return text.ljust(width) if len(text) <= width else '...' + text[-(width - 3):]
+
+def print_files(file_list, index, top, height, columns):
+    lines = []
+    for i in range(top, min(top + height, len(file_list.files))):
+        file = file_list.files[i]
+        size = file_list.sizes[i]
+        selected = file in file_list.selected
+        prefix = '[X]' if selected else '[ ]'
         selection_marker = '\033[93m>\033[0m' if i == index else ' '
-        selected_color = '\033[92m' if file in selected_files else ''
-        size_formatted = format_size(size)
-        print(f"{selection_marker} {prefix} {selected_color}{file.ljust(columns - len(size_formatted) - 6)}{size_formatted}\033[0m")
-    warning = '\033[93mWarning: Total selected size exceeds 40MB\033[0m' if total_size > 40 * 1024 * 1024 else ''
-    print(f"\nTotal selected size: {format_size(total_size)} {warning}")
+        selected_color = '\033[92m' if selected else ''
+        size_formatted = format_size(size) if size is not None else '...'
+        lines.append(f"{selection_marker} {prefix} {selected_color}{fit(file, max(10, columns - len(size_formatted) - 7))}{size_formatted}\033[0m")
+
+    total_size = file_list.total_size
+    warning = '\033[93mWarning: Total selected size exceeds 40MB\033[0m' if total_size > SIZE_WARNING_BYTES else ''
+    pending = f" (+{file_list.pending} files still sizing)" if file_list.pending else ''
+    loading = f" | sizes {file_list.loaded}/{len(file_list.files)}" if file_list.loading else ''
+    lines.append(f"\n{len(file_list.selected)} of {len(file_list.files)} selected{loading}")
+    lines.append(f"Total selected size: {format_size(total_size)}{pending} {warning}")
+    estimate = file_list.estimate
+    if estimate:
+        lines.append(f"Estimated output: ~{format_size(estimate['bytes'])}, ~{estimate['tokens']:,} tokens for {estimate['files']} files (e to update)")
+    # Home the cursor and clear below it instead of spawning cls/clear for every frame
+    sys.stdout.write('\033[H\033[J' + '\n'.join(lines) + '\n')
+    sys.stdout.flush()
 
-def navigate_files(files, selected_files):
+def navigate_files(file_list):
     index = 0
-    total_size = sum(size for file, size in files if file in selected_files)
-    print_files(files, selected_files, index, total_size)
+    top = 0
+    events = queue.Queue()
+    keyboard.hook(events.put)
+
+    try:
+        while True:
+            rows, columns = get_terminal_size()
+            height = max(1, rows - 5)
+            top = window_top(top, index, height)
+            print_files(file_list, index, top, height, columns)
 
-    while True:
-        event = keyboard.read_event()
-        if event.event_type == keyboard.KEY_DOWN:
+            try:
+                event = events.get(timeout=REFRESH_SECONDS if file_list.loading else None)
+            except queue.Empty:
+                # Nothing pressed: redraw so sizes and the total fill in as they load
+                continue
+            if event.event_type != keyboard.KEY_DOWN or not file_list.files:
+                continue
             if event.name == 'down':
-                index = min(index + 1, len(files) - 1)
+                index = min(index + 1, len(file_list.files) - 1)
             elif event.name == 'up':
                 index = max(index - 1, 0)
+            elif event.name == 'page down':
+                index = min(index + height, len(file_list.files) - 1)
+            elif event.name == 'page up':
+                index = max(index - height, 0)
+            elif event.name == 'home':
+                index = 0
+            elif event.name == 'end':
+                index = len(file_list.files) - 1
             elif event.name == 'space' or event.name == 'enter':
-                file, size = files[index]
-                if file in selected_files:
-                    selected_files.remove(file)
-                    total_size -= size
-                else:
-                    selected_files.append(file)
-                    total_size += size
+                file_list.toggle(index)
             elif event.name == 'c':
                 break
+            elif event.name == 'e':
+                file_list.estimate_output()
             elif event.name == 'r':
-                selected_files = load_cache()
-                total_size = sum(size for file, size in files if file in selected_files)
-            print_files(files, selected_files, index, total_size)
+                file_list.select_all(load_cache())
+    finally:
+        keyboard.unhook_all()
 
-    save_cache(selected_files)
-    return selected_files
+    save_cache(file_list.selected)
+    return file_list.selected
 
+# Relative paths under LIBRARY_PATH, listed without stat calls
 def get_files():
     all_files = []
     for root, dirs, files in os.walk(LIBRARY_PATH):
-        for name in files:
-            file_path = os.path.join(root, name)
-            relative_path = os.path.relpath(file_path, LIBRARY_PATH)
-            all_files.append((relative_path, get_file_size(file_path)))
+        dirs.sort()
+        for name in sorted(files):
+            all_files.append(os.path.relpath(os.path.join(root, name), LIBRARY_PATH))
     return all_files
 
 def save_selection(selected_files):
@@ -94,9 +224,11 @@ def save_selection(selected_files):
     pass
 
 def main():
-    files = get_files()
-    selected_files = load_cache()
-    selected_files = navigate_files(files, selected_files)
+    if os.name == 'nt':
+        # Enables ANSI escape handling in the Windows console
+        os.system('')
+    file_list = FileList(get_files(), load_cache()).start()
+    selected_files = navigate_files(file_list)
     # Remaining main function logic unchanged
 
 if __name__ == "__main__":
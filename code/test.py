@@ -1,5 +1,8 @@
 import os
 import platform
+import time
+
+from dir_index import DirectorySizeIndex
 
 # Define the path to the library folder
 library_path = 'source'
@@ -7,25 +10,27 @@ cache_file_path = '.file_selection_cache'
 
 # Cross-platform getch implementation
 class _Getch:
-    """Gets a single character from standard input. Does not echo to the screen."""
+    """Gets a single character from standard input. Does not echo to the screen. Returns None after `timeout` seconds without a key."""
     def __init__(self):
         try:
             self.impl = _GetchWindows()
         except ImportError:
             self.impl = _GetchUnix()
 
-    def __call__(self): return self.impl()
+    def __call__(self, timeout=None): return self.impl(timeout)
 
 class _GetchUnix:
     def __init__(self):
         import tty, sys, termios
 
-    def __call__(self):
-        import sys, tty, termios
+    def __call__(self, timeout=None):
+        import sys, tty, termios, select
         fd = sys.stdin.fileno()
         old_settings = termios.tcgetattr(fd)
         try:
             tty.setraw(sys.stdin.fileno())
+            if timeout is not None and not select.select([sys.stdin], [], [], timeout)[0]:
+                return None
             ch = sys.stdin.read(1)
         finally:
             termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
@@ -35,8 +40,13 @@ class _GetchWindows:
     def __init__(self):
         import msvcrt
 
-    def __call__(self):
+    def __call__(self, timeout=None):
         import msvcrt
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while deadline is not None and not msvcrt.kbhit():
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(0.02)
         return msvcrt.getch()
 
 
@@ -56,47 +66,71 @@ def load_selection_cache():
     """Load the selected files from the cache file."""
     selected_files = set()
     if os.path.exists(cache_file_path):
-        with open(cache_file_path, 'r') as cache_file:
-            for line in cache_file:
-                selected_files.add(int(line.strip()))
+        try:
+            with open(cache_file_path, 'r') as cache_file:
+                for line in cache_file:
+                    selected_files.add(int(line.strip()))
+        except (UnicodeDecodeError, ValueError):
+            # select_files.py keeps its own selection in the same file
+            return set()
     return selected_files
 
-def draw_menu(directory, selected_row_idx, selected_files):
+# Draw from the size index only; rows whose size is still being computed show '...'
+def draw_menu(index, directory, selected_row_idx, selected_files):
     os.system('cls' if os.name == 'nt' else 'clear')  # Clear the console window
     print(f"Current directory: {directory}\n")
-    files = os.listdir(directory)
+    files = index.listing(directory)
     total_size = 0
+    pending = 0
 
+    if files is None:
+        print("Reading directory...")
+        files = []
     print("{:<50} {:>10}".format("File", "Size"))
-    for idx, file in enumerate(files):
-        size = get_file_size(os.path.join(directory, file))
+    for idx, (file, path, is_dir) in enumerate(files):
+        size = index.size(path)
         is_selected = idx in selected_files
         is_current = idx == selected_row_idx
         color_start = "\033[42m\033[30m" if is_selected else "\033[47m\033[30m" if is_current else ""
         color_end = "\033[0m"
-        print(f"{color_start}{'X' if is_selected else ' '} {file:<48} {size:>10} bytes{color_end}")
+        name = file + '/' if is_dir else file
+        size_text = f"{size:>10} bytes" if size is not None else f"{'...':>10}      "
+        print(f"{color_start}{'X' if is_selected else ' '} {name:<48} {size_text}{color_end}")
         if is_selected:
-            total_size += size
+            if size is None:
+                pending += 1
+            else:
+                total_size += size
 
-    print(f"\nTotal selected size: {total_size} bytes")
-    print("\nUse W and S to move, Space to select, Enter to confirm, Q to quit.")
+    still_sizing = f" (+{pending} still sizing)" if pending else ''
+    print(f"\nTotal selected size: {total_size} bytes{still_sizing}")
+    print("\nUse W and S to move, Space to select, R to rescan, Enter to confirm, Q to quit.")
 
 def main():
     current_row = 0
     selected_files = load_selection_cache()
     current_directory = library_path
+    index = DirectorySizeIndex()
 
     try:
-        draw_menu(current_directory, current_row, selected_files)
+        draw_menu(index, current_directory, current_row, selected_files)
+        drawn_version = index.version
 
         while True:
-            key = getch()
+            # Poll while sizes are still arriving so the menu fills in without a keypress
+            key = getch(0.2 if index.busy or drawn_version != index.version else None)
+            if key is None:
+                if drawn_version != index.version:
+                    drawn_version = index.version
+                    draw_menu(index, current_directory, current_row, selected_files)
+                continue
+            row_count = len(index.listing(current_directory) or [])
 
             if platform.system() == 'Windows':
                 if key == b'H':  # Arrow up
                     current_row = max(current_row - 1, 0)
                 elif key == b'P':  # Arrow down
-                    current_row = min(current_row + 1, len(os.listdir(current_directory)) - 1)
+                    current_row = max(0, min(current_row + 1, row_count - 1))
             else:
                 if key == '\x1b':  # Escape sequence for arrow keys
                     getch()  # Skip the '[' character
@@ -104,7 +138,7 @@ def main():
                     if arrow == 'A':  # Arrow up
                         current_row = max(current_row - 1, 0)
                     elif arrow == 'B':  # Arrow down
-                        current_row = min(current_row + 1, len(os.listdir(current_directory)) - 1)
+                        current_row = max(0, min(current_row + 1, row_count - 1))
 
             if key in [' ', b' ']:  # Space key for selection
                 if current_row in selected_files:
@@ -116,11 +150,19 @@ def main():
                 break
             elif key in ['q', 'Q', b'q', b'Q']:  # Quit
                 break
+            elif key in ['r', 'R', b'r', b'R']:  # Rescan, dropping cached sizes
+                index.refresh(current_directory)
 
-            draw_menu(current_directory, current_row, selected_files)
+            drawn_version = index.version
+            draw_menu(index, current_directory, current_row, selected_files)
     except KeyboardInterrupt:
         print("\nExiting...")  # Optional: print a message indicating exit
         pass  # Perform any cleanup here if necessary
+    finally:
+        try:
+            index.save()
+        except OSError:
+            pass
 
 if __name__ == "__main__":
     main()
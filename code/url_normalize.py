@@ -0,0 +1,65 @@
+import re
+from urllib.parse import urldefrag, urlsplit, urlunsplit
+
+# Ports left out of normalized URLs
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+# Query parameters that only track where a visitor came from
+TRACKING_PARAMS = re.compile(r'^(?:utm_\w+|fbclid|gclid|msclkid|mc_cid|mc_eid)$', re.IGNORECASE)
+
+UNRESERVED = set('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~')
+
+PERCENT_ESCAPE = re.compile(r'%([0-9a-fA-F]{2})')
+
+
+def _normalize_escape(match):
+    char = chr(int(match.group(1), 16))
+    return char if char in UNRESERVED else '%' + match.group(1).upper()
+
+
+def remove_dot_segments(path):
+    """Resolve '.' and '..' path segments as RFC 3986 does, keeping a trailing slash."""
+    segments = path.split('/')
+    output = []
+    for segment in segments:
+        if segment == '.':
+            continue
+        if segment == '..':
+            if len(output) > 1:
+                output.pop()
+            continue
+        output.append(segment)
+    if segments[-1] in ('.', '..'):
+        output.append('')
+    return '/'.join(output)
+
+
+# Shared by the crawler and crawl_merge in src/ and by crawl_records, so a page has the same key in all three
+def normalize_url(url):
+    """
+    One spelling per page: no fragment, lower-case scheme and host without a
+    default port, dot segments resolved, unreserved characters unescaped,
+    tracking parameters dropped and the query sorted.
+    """
+    url, _ = urldefrag(url.strip())
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+    try:
+        host = (parts.hostname or '').rstrip('.')
+        if ':' in host:
+            host = f"[{host}]"
+        port = parts.port
+    except ValueError:
+        # A malformed port: keep the authority as written
+        pass
+    else:
+        netloc = host if port in (None, DEFAULT_PORTS.get(scheme)) else f"{host}:{port}"
+        if parts.username is not None:
+            netloc = parts.netloc.rsplit('@', 1)[0] + '@' + netloc
+    path = remove_dot_segments(PERCENT_ESCAPE.sub(_normalize_escape, parts.path)) or '/'
+    query = '&'.join(sorted(
+        PERCENT_ESCAPE.sub(_normalize_escape, pair) for pair in parts.query.split('&')
+        if pair and not TRACKING_PARAMS.match(pair.split('=', 1)[0])
+    ))
+    return urlunsplit((scheme, netloc, path, query, ''))
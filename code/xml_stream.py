@@ -0,0 +1,218 @@
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+from xml.etree import ElementTree as ET
+
+import json_stream
+
+
+# Without a repeating level, finished elements are flushed as records once this many (or this much text) are held
+FLUSH_ELEMENTS = 10000
+FLUSH_BYTES = 4 * 1024 * 1024
+
+
+class XMLRecords(dict):
+    """An XML document read record by record into text chunks."""
+
+
+def local_name(tag):
+    """Tag or attribute name without its '{namespace}' prefix."""
+    return tag.rsplit('}', 1)[-1] if isinstance(tag, str) else ''
+
+
+def record_text(elem, path=None):
+    """
+    Render one record as 'path: value' lines, paths relative to the record.
+
+    A record with nothing but text comes out as a single 'tag: text' line.
+    Attributes are written as '@name'. With `path`, lines are prefixed with it
+    instead, for an element rendered apart from the ancestors it sits in.
+    """
+    lines = []
+
+    def walk(node, path):
+        for name, value in node.attrib.items():
+            lines.append(f"{path}@{local_name(name)}: {value}")
+        text = (node.text or '').strip()
+        if text:
+            lines.append(f"{path}: {text}" if path else text)
+        for child in node:
+            name = local_name(child.tag)
+            walk(child, f"{path}.{name}" if path else name)
+            tail = (child.tail or '').strip()
+            if tail:
+                lines.append(f"{path}: {tail}" if path else tail)
+
+    if path is None and len(elem) == 0 and not elem.attrib:
+        text = (elem.text or '').strip()
+        return f"{local_name(elem.tag)}: {text}" if text else ''
+    walk(elem, path or '')
+    return '\n'.join(lines)
+
+
+def _emit(elements):
+    for element, path in elements:
+        text = record_text(element, path)
+        if text:
+            yield local_name(element.tag), text
+
+
+def _element_path(parents, elem):
+    """Dotted path of elem below the root, as record_text writes it for the whole document."""
+    return '.'.join([local_name(parent.tag) for parent in parents[1:]] + [local_name(elem.tag)])
+
+
+def _take_finished(parents, last, records=False):
+    """
+    Detach the finished children of every open element, in document order, up to and including `last`.
+
+    Returns (element, path) pairs; with `records`, the children of last's
+    parent are records and rendered on their own, without a path.
+    """
+    finished = []
+    for idx, parent in enumerate(parents):
+        children = list(parent)
+        # iterparse reads ahead, so later siblings may already be attached; stop at the open child or at `last`
+        stop = children.index(parents[idx + 1]) if idx + 1 < len(parents) else children.index(last) + 1
+        is_record_parent = records and idx == len(parents) - 1
+        finished.extend((child, None if is_record_parent else _element_path(parents[:idx + 1], child)) for child in children[:stop])
+        del parent[:stop]
+    return finished
+
+
+def iter_records(source, flush_elements=FLUSH_ELEMENTS, flush_bytes=FLUSH_BYTES):
+    """
+    Yield (tag, text) for each record-like element of an XML file or binary stream.
+
+    Records are the children of the first parent seen with two consecutive
+    children of the same tag (<url> in a sitemap, <item> in a feed, <row> in
+    an export); from then on every element at that depth is a record. Each
+    record is cleared and detached as soon as it has been rendered, so memory
+    stays at one record whatever the file size. Elements finished before the
+    repeating level is found, and elements above it (a <meta> beside the
+    record container, the container's own attributes), become records of
+    their own. Until a repeating level turns up, finished elements are
+    flushed as records once flush_elements or flush_bytes of them are held;
+    a small document without repeated elements is yielded whole as one record.
+    """
+    parents = []
+    last_tag = []
+    record_depth = None
+    root = None
+    held_elements = 0
+    held_bytes = 0
+
+    for event, elem in ET.iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = elem
+            parents.append(elem)
+            last_tag.append(None)
+            continue
+
+        parents.pop()
+        last_tag.pop()
+        depth = len(parents)
+        if depth == 0:
+            break
+        parent = parents[-1]
+
+        # Repeated leaves below the top level are fields of a record (<tag>a</tag><tag>b</tag>), not records
+        if record_depth is None and elem.tag == last_tag[-1] and (len(elem) or depth == 1):
+            # Found the repeating level: siblings read so far are records, anything finished further up comes first
+            record_depth = depth
+            yield from _emit(_take_finished(parents, elem, records=True))
+            continue
+        last_tag[-1] = elem.tag
+
+        if record_depth is None:
+            held_elements += 1
+            held_bytes += len(elem.text or '') + len(elem.tail or '') + sum(len(value) for value in elem.attrib.values())
+            if held_elements >= flush_elements or held_bytes >= flush_bytes:
+                # Still no repeating level: hand over what is finished instead of building the whole tree
+                yield from _emit(_take_finished(parents, elem))
+                held_elements = held_bytes = 0
+        elif depth <= record_depth:
+            # A record, or an element above the records whose own records are gone: render what is left of it
+            yield from _emit([(elem, None if depth == record_depth else _element_path(parents, elem))])
+            elem.clear()
+            del parent[:]
+
+    # What remains of the root: the whole document when it was small and had no repeating level, else its attributes
+    if root is not None:
+        yield from _emit([(root, None)])
+
+
+def chunk_records(records, max_chunk_bytes, spill_dir=None):
+    """Pack rendered records into text chunks of at most max_chunk_bytes, separated by blank lines."""
+    chunks = json_stream.ListSpiller(spill_dir, 'xml')
+    chunk = []
+    chunk_bytes = 0
+    record_count = 0
+    record_tags = {}
+
+    for tag, text in records:
+        size = len(text.encode('utf-8')) + 2
+        if chunk and chunk_bytes + size > max_chunk_bytes:
+            chunks.append('\n\n'.join(chunk))
+            chunk, chunk_bytes = [], 0
+        chunk.append(text)
+        chunk_bytes += size
+        record_count += 1
+        record_tags[tag] = record_tags.get(tag, 0) + 1
+    if chunk:
+        chunks.append('\n\n'.join(chunk))
+
+    return XMLRecords({
+        'record_count': record_count,
+        'record_tags': record_tags,
+        'chunk_count': chunks.item_count,
+        'chunks': chunks.close(),
+    })
+
+
+def load(source, max_chunk_bytes, spill_dir=None):
+    """Read an XML file or binary stream record by record into an XMLRecords of text chunks."""
+    return chunk_records(iter_records(source), max_chunk_bytes, spill_dir)
+
+
+# Write a sitemap with `urls` entries, for the benchmark
+def make_fixture(file_path, urls):
+    with open(file_path, 'w', encoding='utf-8') as file:
+        file.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        file.write('<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+        for idx in range(urls):
+            file.write(f'  <url><loc>https://example.com/page/{idx}</loc><lastmod>2024-01-01</lastmod><priority>0.5</priority></url>\n')
+        file.write('</urlset>\n')
+
+
+def benchmark(sizes, chunk_bytes, work_dir):
+    for urls in sizes:
+        file_path = os.path.join(work_dir, f"sitemap_{urls}.xml")
+        make_fixture(file_path, urls)
+        file_size = os.path.getsize(file_path)
+
+        spill_dir = tempfile.mkdtemp(dir=work_dir)
+        tracemalloc.start()
+        start_time = time.time()
+        result = load(file_path, chunk_bytes, spill_dir)
+        elapsed = time.time() - start_time
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        shutil.rmtree(spill_dir)
+
+        print(f"{urls} urls ({file_size / 1024 / 1024:.1f} MB): {result['chunk_count']} chunks in {elapsed:.2f}s, peak {peak / 1024 / 1024:.1f} MB")
+        os.remove(file_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Measure streaming XML extraction on growing sitemaps')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000], help='Number of <url> entries per fixture')
+    parser.add_argument('--chunk-bytes', type=int, default=1024 * 1024, help='Chunk size')
+    parser.add_argument('--work-dir', default='.', help='Where to write the fixtures')
+    args = parser.parse_args()
+
+    benchmark(args.sizes, args.chunk_bytes, args.work_dir)
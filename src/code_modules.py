@@ -0,0 +1,19 @@
+import importlib
+import os
+import sys
+
+# Modules shared with the code/ compiler live only in code/; `from code_modules import ocr_batch`
+# puts code/ on the path and imports the one copy, so both trees run the same implementation
+CODE_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'code')
+
+SHARED_MODULES = {'html_text', 'ignore_rules', 'json_incremental', 'json_stream', 'ocr_batch', 'url_normalize'}
+
+if CODE_DIRECTORY not in sys.path:
+    # Right after src/ so a same-named package in site-packages cannot shadow them
+    sys.path.insert(1, CODE_DIRECTORY)
+
+
+def __getattr__(name):
+    if name not in SHARED_MODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return importlib.import_module(name)
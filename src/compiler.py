@@ -2,7 +2,7 @@ import os
 import logger
 
 from config import CONFIG
-from parser import start_parsing
+from parser import start_parsing, start_parsing_projects
 
 import startup
 
@@ -42,6 +42,12 @@ def main():
         else:
             logger.debug(f"{key}: {value}")
 
+    # Every enabled project in one process, sharing the worker pool and extraction cache
+    if args.all_projects:
+        results = start_parsing_projects(CONFIG, resume=args.resume)
+        console.print(f"Total files processed: {sum(len(files) for files in results.values())} in {len(results)} projects")
+        return
+
     # logger.info("The compiler is running...")
     # logger.debug("Building file list...")
 
@@ -50,7 +56,7 @@ def main():
     logger.debug(f"Processing in directory: {directory}")
 
     # Start the file processing
-    files_processed = start_parsing(CONFIG,directory)
+    files_processed = start_parsing(CONFIG, directory, resume=args.resume)
     console.print(f"Total files processed: {len(files_processed)}")
     pass
 
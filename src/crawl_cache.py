@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import time
+
+CACHE_VERSION = 1
+
+
+def content_hash(body):
+    return hashlib.sha256(body).hexdigest()
+
+
+class CrawlCache:
+    """
+    Per-URL validators and extracted text from earlier crawls, kept in .gpt_crawler_cache.json.
+
+    Each entry holds the ETag, Last-Modified, a hash of the body and the page's
+    title, text and links. Recrawls send them back as If-None-Match /
+    If-Modified-Since; a 304, or a 200 whose body hashes the same, reuses the
+    stored text and links instead of parsing the page again. `stats` counts
+    what was reused and the bandwidth and time that saved, the time summed
+    over requests (concurrent requests overlap, so it exceeds wall time).
+    """
+
+    def __init__(self, file_path, entries=None):
+        self.file_path = file_path
+        self.entries = entries if entries is not None else {}
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.stats = {'not_modified': 0, 'unchanged': 0, 'changed': 0, 'new': 0, 'bytes_saved': 0, 'request_seconds_saved': 0.0}
+
+    @classmethod
+    def load(cls, file_path):
+        entries = {}
+        if os.path.exists(file_path):
+            try:
+                with open(file_path, 'r', encoding='utf-8') as file:
+                    data = json.load(file)
+                if isinstance(data, dict) and data.get('version') == CACHE_VERSION:
+                    entries = data.get('pages', {})
+            except (OSError, ValueError):
+                entries = {}
+        return cls(file_path, entries)
+
+    def save(self):
+        # Write next to the real file and swap it in so an interrupted crawl never leaves half a cache
+        temp_path = self.file_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump({'version': CACHE_VERSION, 'pages': self.entries}, file, ensure_ascii=False)
+        os.replace(temp_path, self.file_path)
+
+    def get(self, url):
+        return self.entries.get(url)
+
+    def conditional_headers(self, url):
+        entry = self.entries.get(url)
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def not_modified(self, url, request_seconds):
+        """Record a 304 for `url`, returning its cached entry."""
+        entry = self.entries[url]
+        self.stats['not_modified'] += 1
+        self.stats['bytes_saved'] += entry.get('bytes', 0)
+        self.stats['request_seconds_saved'] += max(0.0, entry.get('fetch_seconds', 0.0) + entry.get('parse_seconds', 0.0) - request_seconds)
+        entry['checked_at'] = time.time()
+        return entry
+
+    def unchanged(self, url, response):
+        """The cached entry if a 200 body hashes the same as last time, else None."""
+        entry = self.entries.get(url)
+        if entry is None or entry.get('content_hash') != content_hash(response.body):
+            return None
+        self.stats['unchanged'] += 1
+        self.stats['request_seconds_saved'] += entry.get('parse_seconds', 0.0)
+        # Servers may hand out new validators for the same content
+        entry['etag'] = response.headers.get('etag')
+        entry['last_modified'] = response.headers.get('last-modified')
+        entry['checked_at'] = time.time()
+        return entry
+
+    def store(self, url, response, record, links, fetch_seconds, parse_seconds):
+        self.stats['changed' if url in self.entries else 'new'] += 1
+        self.entries[url] = {
+            'url': record['url'],
+            'etag': response.headers.get('etag'),
+            'last_modified': response.headers.get('last-modified'),
+            'content_hash': content_hash(response.body),
+            'bytes': len(response.body),
+            'title': record['title'],
+            'text': record['html'],
+            'links': links,
+            'fetch_seconds': fetch_seconds,
+            'parse_seconds': parse_seconds,
+            'checked_at': time.time(),
+        }
@@ -0,0 +1,136 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+
+from code_modules import json_incremental, url_normalize
+from crawler import RecordWriter
+
+# '<base>-1.json', '<base>.-1-1.json' ...: the run suffixes both naming schemes added
+RUN_NAME = re.compile(r'^(?P<base>.*?)\.?(?:-\d+)*\.json$')
+
+
+def run_group_name(file_name):
+    """Site/project part of a crawl output name, the same for every run of one crawl."""
+    match = RUN_NAME.match(os.path.basename(file_name))
+    return match.group('base') if match else os.path.splitext(os.path.basename(file_name))[0]
+
+
+def group_runs(paths):
+    """Group crawl output files by run_group_name, each group ordered oldest first."""
+    groups = {}
+    for path in paths:
+        groups.setdefault(run_group_name(path), []).append(path)
+    for base_name in groups:
+        groups[base_name].sort(key=lambda path: (os.path.getmtime(path), path))
+    return groups
+
+
+def record_hash(record):
+    text = f"{record.get('title', '')}\n{record.get('html', '')}"
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def iter_records(file_path):
+    """Stream the {title, url, html} records of one crawl output file, one record in memory at a time."""
+    with open(file_path, 'r', encoding='utf-8') as file:
+        root_type, elements = json_incremental.open_elements(file)
+        if root_type != 'array':
+            return
+        for _, idx, record, _ in elements:
+            if isinstance(record, dict) and record.get('url'):
+                yield idx, record
+
+
+class CrawlMerger:
+    """
+    Unions crawl runs into one record per normalized URL, keeping the newest record.
+
+    Runs are given oldest first; a later run, or a later record in the same
+    run, replaces an earlier one. The first pass only keeps (run, position,
+    hash) per URL, the second streams the winning records out, so memory
+    grows with the number of URLs, not with the page content.
+    """
+
+    def __init__(self, paths):
+        self.paths = list(paths)
+        self.winners = {}
+        self.stats = {'runs': len(self.paths), 'records': 0, 'urls': 0, 'duplicates': 0}
+
+    def scan(self):
+        for run_idx, path in enumerate(self.paths):
+            for idx, record in iter_records(path):
+                url = url_normalize.normalize_url(record['url'])
+                if url in self.winners:
+                    self.stats['duplicates'] += 1
+                self.winners[url] = (run_idx, idx, record_hash(record))
+                self.stats['records'] += 1
+        self.stats['urls'] = len(self.winners)
+
+    def write(self, output_path, index_path=None):
+        """After scan(), write the merged records to output_path and the URL index to index_path, returning the stats."""
+        keep = {}
+        for url, (run_idx, idx, _) in self.winners.items():
+            keep.setdefault(run_idx, {})[idx] = url
+
+        writer = RecordWriter(output_path)
+        try:
+            for run_idx, path in enumerate(self.paths):
+                wanted = keep.get(run_idx)
+                if not wanted:
+                    continue
+                for idx, record in iter_records(path):
+                    url = wanted.get(idx)
+                    if url is not None:
+                        writer.write({'title': record.get('title', ''), 'url': url, 'html': record.get('html', '')})
+        finally:
+            writer.close()
+
+        if index_path:
+            index = {
+                url: {'run': os.path.basename(self.paths[run_idx]), 'content_hash': digest}
+                for url, (run_idx, _, digest) in sorted(self.winners.items())
+            }
+            with open(index_path, 'w', encoding='utf-8') as file:
+                json.dump({'runs': [os.path.basename(path) for path in self.paths], 'pages': index}, file, ensure_ascii=False, indent=2)
+        return self.stats
+
+
+def merge_runs(paths, output_path, index_path=None):
+    merger = CrawlMerger(paths)
+    merger.scan()
+    return merger.write(output_path, index_path)
+
+
+def merge_output_dir(output_dir, merged_dir=None):
+    """Merge every group of runs in output_dir into merged_dir/<base>.json plus <base>.index.json."""
+    merged_dir = merged_dir or os.path.join(output_dir, 'merged')
+    os.makedirs(merged_dir, exist_ok=True)
+    paths = [os.path.join(output_dir, name) for name in os.listdir(output_dir) if name.endswith('.json') and os.path.isfile(os.path.join(output_dir, name))]
+    results = {}
+    for base_name, group in sorted(group_runs(paths).items()):
+        merger = CrawlMerger(group)
+        merger.scan()
+        # Other JSON in the output directory (compiled knowledge etc.) has no records
+        if merger.stats['urls']:
+            output_path = os.path.join(merged_dir, f"{base_name}.json")
+            results[base_name] = merger.write(output_path, os.path.join(merged_dir, f"{base_name}.index.json"))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Merge crawl runs into one deduplicated record file per site')
+    parser.add_argument('paths', nargs='*', help='Crawl output files to merge, oldest first (default: every run in the output directory, grouped by site)')
+    parser.add_argument('-o', '--output', help='Merged output file when paths are given')
+    parser.add_argument('--output-dir', default='output', help='Directory of crawl runs to merge when no paths are given')
+    args = parser.parse_args()
+
+    if args.paths:
+        output_path = args.output or os.path.join(os.path.dirname(args.paths[0]), 'merged', f"{run_group_name(args.paths[0])}.json")
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        stats = merge_runs(args.paths, output_path, os.path.splitext(output_path)[0] + '.index.json')
+        print(f"{output_path}: {stats['urls']} pages from {stats['records']} records in {stats['runs']} runs ({stats['duplicates']} duplicates dropped)")
+    else:
+        for base_name, stats in merge_output_dir(args.output_dir).items():
+            print(f"{base_name}: {stats['urls']} pages from {stats['records']} records in {stats['runs']} runs ({stats['duplicates']} duplicates dropped)")
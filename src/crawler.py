@@ -0,0 +1,344 @@
+import asyncio
+import json
+import logging
+import re
+import time
+from urllib.parse import urljoin, urlsplit
+from xml.etree import ElementTree as ET
+
+from code_modules import html_text, url_normalize
+from host_throttle import THROTTLE_STATUSES, HostThrottle
+from http_client import DEFAULT_USER_AGENT, HTTPClient, HTTPError
+from url_frontier import URLFrontier, parse_robots, parse_sitemap, url_priority
+
+HTML_CONTENT_TYPES = {'text/html', 'application/xhtml+xml'}
+
+# Sitemaps read per crawl, index files included
+MAX_SITEMAPS = 50
+
+# Times a page answered with 429/503 is requested again, after the host's Retry-After
+MAX_THROTTLE_RETRIES = 3
+
+
+def glob_to_regex(pattern):
+    """gpt-crawler style URL glob: '**' matches anything, '*' anything but '/', '?' one character."""
+    parts = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith('**', i):
+            parts.append('.*')
+            i += 2
+        elif pattern[i] == '*':
+            parts.append('[^/]*')
+            i += 1
+        elif pattern[i] == '?':
+            parts.append('.')
+            i += 1
+        else:
+            parts.append(re.escape(pattern[i]))
+            i += 1
+    return re.compile('^' + ''.join(parts) + '$')
+
+
+class URLMatcher:
+    """The `match` setting: one glob or a list of globs, any of which admits a URL."""
+
+    def __init__(self, match):
+        patterns = [match] if isinstance(match, str) else list(match or [])
+        self.regexes = [glob_to_regex(pattern) for pattern in patterns]
+        # Literal characters per glob: a longer literal part is a more specific pattern
+        self.literal_lengths = [len(re.sub(r'[*?]', '', pattern)) for pattern in patterns]
+
+    def matches(self, url):
+        return any(regex.match(url) for regex in self.regexes)
+
+    def specificity(self, url):
+        """0-1: how specific the most specific glob admitting url is, relative to the most specific glob."""
+        longest = max(self.literal_lengths, default=0)
+        lengths = [length for regex, length in zip(self.regexes, self.literal_lengths) if regex.match(url)]
+        return max(lengths) / longest if lengths and longest else 0.0
+
+
+class PageParser(html_text.HTMLTextExtractor):
+    """HTML-to-text extraction that also collects the page's links in the same pass."""
+
+    def __init__(self, base_url):
+        super().__init__()
+        self.base_url = base_url
+        self.links = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'a':
+            href = dict(attrs).get('href')
+            if href:
+                self.links.append(href)
+        elif tag == 'base':
+            href = dict(attrs).get('href')
+            if href:
+                self.base_url = urljoin(self.base_url, href)
+        super().handle_starttag(tag, attrs)
+
+
+def parse_page(html, url):
+    """Return (title, text, absolute http(s) links) for one page."""
+    parser = PageParser(url)
+    parser.feed(html)
+    parser.close()
+    links = []
+    for href in parser.links:
+        link = urljoin(parser.base_url, href.strip())
+        if link.startswith(('http://', 'https://')):
+            links.append(url_normalize.normalize_url(link))
+    return parser.title, parser.text(), links
+
+
+class RecordWriter:
+    """Writes {title, url, html} records as a JSON array, one record at a time, formatted like gpt-crawler output."""
+
+    def __init__(self, file_path):
+        self.file = open(file_path, 'w', encoding='utf-8')
+        self.count = 0
+        self.file.write('[')
+
+    def write(self, record):
+        text = json.dumps(record, ensure_ascii=False, indent=2)
+        self.file.write((',\n' if self.count else '\n') + '\n'.join('  ' + line for line in text.split('\n')))
+        self.count += 1
+
+    def close(self):
+        self.file.write('\n]' if self.count else ']')
+        self.file.close()
+
+
+class Crawler:
+    """
+    Crawls a site with asyncio, starting at `url` and following links that match `match`.
+
+    A fixed number of worker tasks share one pooled HTTP client, so at most
+    `concurrency` pages are in flight at once, and at most max_pages are
+    requested. URLs wait in a URLFrontier that hands out the most promising
+    first: seeded from the sitemaps robots.txt lists (or /sitemap.xml), ranked
+    by sitemap priority, match specificity and link depth, with pagination and
+    tag listings last. robots.txt Disallow rules of the start host are obeyed.
+    With `adaptive`, requests to each host go through a HostLimiter that
+    grows the host's concurrency while it answers quickly and cuts it on
+    429/503, errors or rising latency, honouring Retry-After;
+    max_requests_per_second caps each host's request rate.
+    Page text is extracted off the event loop and written as {title, url, html}
+    records, `html` holding the page text as gpt-crawler's records did. With a
+    CrawlCache, pages are requested conditionally and unchanged pages reuse
+    the stored text and links.
+    """
+
+    def __init__(self, url, match, max_pages=5000, concurrency=8, timeout=30, user_agent=None, logger=None, cache=None,
+                 sitemaps=True, respect_robots=True, prioritize=True, visited_capacity=1000000,
+                 adaptive=True, initial_concurrency=4, max_requests_per_second=0):
+        self.start_url = url_normalize.normalize_url(url)
+        self.matcher = URLMatcher(match)
+        self.max_pages = max_pages
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.user_agent = user_agent
+        self.logger = logger or logging.getLogger(__name__)
+        self.cache = cache
+        self.sitemaps = sitemaps
+        self.respect_robots = respect_robots
+        self.prioritize = prioritize
+        self.visited_capacity = max(visited_capacity, max_pages)
+        self.throttle_options = {
+            'initial': initial_concurrency, 'maximum': self.concurrency, 'adaptive': adaptive, 'rate': max_requests_per_second,
+        }
+        self.throttle = None
+        self.frontier = None
+        self.robots = None
+        self.ready = None
+        self.in_flight = 0
+        self.dispatched = 0
+        self.writer = None
+        self.stats = {'pages': 0, 'failed': 0, 'skipped': 0, 'bytes': 0, 'elapsed': 0.0, 'sitemap_urls': 0, 'disallowed': 0}
+
+    def enqueue(self, url, depth, sitemap_priority=None):
+        if self.robots is not None and not self.robots.can_fetch(self.user_agent or DEFAULT_USER_AGENT, url):
+            self.stats['disallowed'] += 1
+            return False
+        priority = url_priority(url, depth, self.matcher.specificity(url), sitemap_priority) if self.prioritize else 0.0
+        return self.frontier.push(url, depth, priority)
+
+    async def crawl(self, output_path):
+        """Crawl into output_path, returning the stats."""
+        start_time = time.time()
+        self.frontier = URLFrontier(self.visited_capacity, max_pending=max(10000, 4 * self.max_pages))
+        self.ready = asyncio.Condition()
+        self.throttle = HostThrottle(**self.throttle_options)
+        self.in_flight = 0
+        self.dispatched = 0
+        self.writer = RecordWriter(output_path)
+        if self.cache is not None:
+            self.cache.reset_stats()
+        client_options = {'max_connections_per_host': self.concurrency, 'timeout': self.timeout}
+        if self.user_agent:
+            client_options['user_agent'] = self.user_agent
+
+        try:
+            async with HTTPClient(**client_options) as client:
+                await self._seed(client)
+                await asyncio.gather(*[self._worker(client) for _ in range(self.concurrency)])
+                self.stats['connections'] = client.connections_opened
+                self.stats['requests'] = client.requests_sent
+        finally:
+            self.writer.close()
+            if self.cache is not None:
+                self.cache.save()
+
+        self.stats['elapsed'] = time.time() - start_time
+        self.stats['frontier_dropped'] = self.frontier.dropped
+        self.stats['visited_filter_bytes'] = self.frontier.visited.size_bytes
+        self.stats['hosts'] = self.throttle.summary()
+        if self.cache is not None:
+            self.stats.update(self.cache.stats)
+        return self.stats
+
+    async def _seed(self, client):
+        """Queue the start URL, then every matching URL from the start host's sitemaps."""
+        parts = urlsplit(self.start_url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        sitemap_urls = []
+        if self.sitemaps or self.respect_robots:
+            body = await self._fetch_optional(client, origin + '/robots.txt')
+            if body is not None:
+                robots, sitemap_urls = parse_robots(body.decode('utf-8', errors='replace'))
+                sitemap_urls = [urljoin(origin + '/', url) for url in sitemap_urls]
+                if self.respect_robots:
+                    self.robots = robots
+
+        # The start URL goes first whatever robots.txt says about it, as it was asked for
+        self.frontier.push(self.start_url, 0, float('inf'))
+        if not self.sitemaps:
+            return
+
+        pending = sitemap_urls or [origin + '/sitemap.xml']
+        fetched = 0
+        while pending and fetched < MAX_SITEMAPS:
+            sitemap_url = pending.pop(0)
+            body = await self._fetch_optional(client, sitemap_url)
+            fetched += 1
+            if body is None:
+                continue
+            try:
+                urls, nested = parse_sitemap(body)
+            except (ET.ParseError, OSError, EOFError) as e:
+                self.logger.warning(f"Skipped unreadable sitemap: {e}")
+                continue
+            # Relative locations are outside the protocol but resolve unambiguously
+            pending.extend(urljoin(sitemap_url, url) for url in nested)
+            for url, priority in urls:
+                url = url_normalize.normalize_url(urljoin(sitemap_url, url))
+                if self.matcher.matches(url) and self.enqueue(url, 1, priority):
+                    self.stats['sitemap_urls'] += 1
+        self.logger.info(f"Seeded {self.stats['sitemap_urls']} URLs from {fetched} sitemaps")
+
+    async def _fetch_optional(self, client, url):
+        """Body of a 200 response to url, or None if it is missing or unreachable."""
+        try:
+            response = await self._fetch(client, url)
+        except (HTTPError, OSError, asyncio.TimeoutError, ValueError):
+            return None
+        return response.body if response.status == 200 else None
+
+    async def _fetch(self, client, url, headers=None):
+        """GET url through its host's limiter, retrying 429/503 responses once the host's Retry-After has passed."""
+        limiter = self.throttle.limiter(url)
+        for attempt in range(MAX_THROTTLE_RETRIES + 1):
+            await limiter.acquire()
+            request_start = time.monotonic()
+            try:
+                response = await client.get(url, headers)
+            except Exception:
+                limiter.release(time.monotonic() - request_start, error=True)
+                raise
+            except BaseException:
+                limiter.release(time.monotonic() - request_start)
+                raise
+            limiter.release(time.monotonic() - request_start, response.status, response.headers.get('retry-after'), len(response.body))
+            if response.status not in THROTTLE_STATUSES or attempt == MAX_THROTTLE_RETRIES:
+                return response
+            self.logger.info(f"{url} returned {response.status}, retrying (concurrency for {limiter.host} now {int(limiter.limit)})")
+        return response
+
+    async def _worker(self, client):
+        while True:
+            async with self.ready:
+                # An empty frontier is only final once no page in flight can add links to it
+                while not self.frontier and self.in_flight and self.dispatched < self.max_pages:
+                    await self.ready.wait()
+                if not self.frontier or self.dispatched >= self.max_pages:
+                    self.ready.notify_all()
+                    return
+                url, depth = self.frontier.pop()
+                self.in_flight += 1
+                self.dispatched += 1
+            try:
+                await self._crawl_page(client, url, depth)
+            except (HTTPError, OSError, asyncio.TimeoutError, UnicodeError, ValueError) as e:
+                self.stats['failed'] += 1
+                self.logger.warning(f"Failed to crawl {url}: {e}")
+            finally:
+                async with self.ready:
+                    self.in_flight -= 1
+                    self.ready.notify_all()
+
+    async def _crawl_page(self, client, url, depth):
+        cache = self.cache
+        headers = cache.conditional_headers(url) if cache is not None else None
+        request_start = time.time()
+        response = await self._fetch(client, url, headers)
+        fetch_seconds = time.time() - request_start
+
+        if response.status == 304 and cache is not None and cache.get(url):
+            entry = cache.not_modified(url, fetch_seconds)
+            self._write_page({'title': entry['title'], 'url': entry['url'], 'html': entry['text']}, entry['links'], depth, 'not modified')
+            return
+        if response.status != 200:
+            self.stats['failed'] += 1
+            self.logger.warning(f"{url} returned {response.status}")
+            return
+        final_url = url_normalize.normalize_url(response.url)
+        if response.content_type not in HTML_CONTENT_TYPES or (final_url != self.start_url and not self.matcher.matches(final_url)):
+            self.stats['skipped'] += 1
+            return
+        self.stats['bytes'] += len(response.body)
+
+        entry = cache.unchanged(url, response) if cache is not None else None
+        if entry is not None:
+            self._write_page({'title': entry['title'], 'url': final_url, 'html': entry['text']}, entry['links'], depth, 'unchanged')
+            return
+
+        parse_start = time.time()
+        title, text, links = await asyncio.to_thread(parse_page, response.text(), final_url)
+        record = {'title': title, 'url': final_url, 'html': text}
+        if cache is not None:
+            cache.store(url, response, record, links, fetch_seconds, time.time() - parse_start)
+        self._write_page(record, links, depth, 'crawled')
+
+    def _write_page(self, record, links, depth, state):
+        self.writer.write(record)
+        self.stats['pages'] += 1
+        self.logger.info(f"{state.capitalize()}: {record['url']} ({self.stats['pages']}/{self.max_pages})")
+
+        for link in links:
+            if self.matcher.matches(link):
+                self.enqueue(link, depth + 1)
+
+
+def format_host_stats(host, stats):
+    return (
+        f"{host}: {stats['requests']} requests, {stats['requests_per_second']:.1f}/s, "
+        f"latency avg {stats['latency_avg'] * 1000:.0f} ms max {stats['latency_max'] * 1000:.0f} ms, "
+        f"{stats['throttled']} throttled, {stats['errors']} errors, waited {stats['retry_after_seconds']:.0f}s for Retry-After, "
+        f"concurrency {stats['concurrency']} ({stats['concurrency_min']}-{stats['concurrency_max']})"
+    )
+
+
+def crawl(url, match, output_path, **options):
+    crawler = Crawler(url, match, **options)
+    return asyncio.run(crawler.crawl(output_path))
@@ -1,11 +1,11 @@
-import argparse
+import asyncio
 import logging
-import git  # GitPython
-from invoke import Context  # Import Context
-import json
 import os
 
 import parse_arguments
+from config import CONFIG, OUTPUT_DIRECTORY
+from crawl_cache import CrawlCache
+from crawler import Crawler, format_host_stats
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -13,82 +13,19 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 # Configuration cache file path
 cache_file_path = '.gpt_crawler_cache.json'
 
-# Directory for gpt-crawler
-gpt_crawler_dir = '.cache/gpt-crawler'
-get_output_dir = '../../output/'
-
-# Check if cache file exists
-if os.path.exists(cache_file_path):
-    with open(cache_file_path, 'r') as file:
-        cache_data = json.load(file)
-else:
-    cache_data = {}
-
-# Get list of files in output directoryq
-current_output_files = os.listdir(get_output_dir)
-
-
-
-# Run command
-def run_command(command, cwd=None):
-    context = Context()  # Create a Context instance
-    if cwd:
-        with context.cd(cwd):  # Use context.cd to change directory if cwd is specified
-            result = context.run(command, hide=False, warn=True)  # Use context.run to execute the command
-    else:
-        result = context.run(command, hide=False, warn=True)
-    if result.ok:
-        logging.info("Command executed successfully.")
-    else:
-        logging.error(f"Command execution failed: {result.stderr}")
-
-# Clone gpt-crawler
-def clone_gpt_crawler():
-    logging.info("Checking if gpt-crawler is already cloned...")
-    if os.path.exists(os.path.join(gpt_crawler_dir, '.git')):
-        logging.info("gpt-crawler is already cloned.")
-        return
-    else:
-        logging.info("Cloning gpt-crawler...")
-        try:
-            git.Repo.clone_from('https://github.com/BuilderIO/gpt-crawler', gpt_crawler_dir)
-            logging.info("gpt-crawler cloned successfully.")
-        except Exception as e:
-            logging.error(f"Failed to clone gpt-crawler: {e}")
-            exit(1)
-
-# Install gpt-crawler dependencies with
-def install_gpt_crawler_dependencies():
-    if os.path.exists(os.path.join(gpt_crawler_dir, 'node_modules')):
-        logging.info("Dependencies are already installed.")
-        return
-    else:
-        logging.info("Installing gpt-crawler dependencies...")
-        run_command('pnpm install', cwd=gpt_crawler_dir)  # Corrected to properly handle command result
-
-def generate_unique_filename(base_dir, base_name, extension):
-    count = 0
-    if base_name.endswith('.'):
-        base_name = base_name[:-1]
-
-    while True:
-        unique_name = f"{base_name}{'-' + str(count) if count > 0 else ''}.{extension}"
-        full_path = os.path.join(base_dir, unique_name)
-
-        if not os.path.exists(full_path):
-            return full_path
-
-        count += 1
+get_output_dir = OUTPUT_DIRECTORY
 
+# Validators and extracted text per URL, reused by conditional recrawls
+cache_data = CrawlCache.load(cache_file_path) if CONFIG.get('crawler', {}).get('cache', True) else None
 
+# Output path for a new run: <base_name>-1.json, -2, ... with any trailing '.' dropped from base_name
 def get_unique_file_name(base_path, base_name, extension):
     """
     Generates a unique file name by appending a number before the extension.
     Returns the unique file path as a string without creating the file.
     """
-    directory = os.path.dirname(base_path)
-    if not os.path.exists(directory):
-        os.makedirs(directory)
+    os.makedirs(base_path, exist_ok=True)
+    base_name = base_name.rstrip('.')
 
     count = 1  # Start with 1
     while True:
@@ -102,43 +39,54 @@ def get_unique_file_name(base_path, base_name, extension):
             return file_path
 
         count += 1  # Increment the count and try again
-def create_update_config_js(url, match, project='', maxPagesToCrawl=5000):
-    base_name = f"{project + '-' if project else ''}{url.replace('https://', '').replace('/', '.')}"
-    outputFileName = generate_unique_filename(get_output_dir, base_name, 'json')
-    config_js_content = f"""
-import {{ Config }} from "./src/config";
-
-let url = '{url}';
-let match = '{match}';
-let maxPagesToCrawl = {maxPagesToCrawl};
 
-export const defaultConfig: Config = {{
-  url,
-  match,
-  maxPagesToCrawl,
-  outputFileName: '{get_unique_file_name(get_output_dir, base_name, 'json')}'
-}};
-"""
-    config_file_path = os.path.join(gpt_crawler_dir, 'config.ts')
-    with open(config_file_path, 'w') as config_file:
-        config_file.write(config_js_content)
-    logging.info(f"config.js has been updated. Output file: {outputFileName}")
+# Name shared by every run of one crawl, e.g. 'ScriptGPT-scriptgpt.wiki'
+def run_base_name(url, project=''):
+    site = url.split('://', 1)[-1].replace('/', '.').rstrip('.')
+    return f"{project + '-' if project else ''}{site}"
+
+# Crawl a site into a new {title, url, html} record file in the output directory
+def run_crawl(url, match, project='', maxPagesToCrawl=5000):
+    crawler_config = CONFIG.get('crawler', {})
+    outputFileName = get_unique_file_name(get_output_dir, run_base_name(url, project), 'json')
+
+    crawler = Crawler(
+        url,
+        match,
+        max_pages=maxPagesToCrawl,
+        concurrency=crawler_config.get('concurrency', 8),
+        timeout=crawler_config.get('timeout', 30),
+        user_agent=crawler_config.get('user_agent'),
+        cache=cache_data,
+        sitemaps=crawler_config.get('sitemaps', True),
+        respect_robots=crawler_config.get('respect_robots', True),
+        prioritize=crawler_config.get('prioritize', True),
+        visited_capacity=crawler_config.get('visited_capacity', 1000000),
+        adaptive=crawler_config.get('adaptive', True),
+        initial_concurrency=crawler_config.get('initial_concurrency', 4),
+        max_requests_per_second=crawler_config.get('max_requests_per_second', 0),
+    )
+    stats = asyncio.run(crawler.crawl(outputFileName))
+    logging.info(f"Crawled {stats['pages']} pages in {stats['elapsed']:.1f}s ({stats['failed']} failed). Output file: {outputFileName}")
+    for host, host_stats in stats['hosts'].items():
+        logging.info(format_host_stats(host, host_stats))
+    logging.info(f"Frontier: {stats['sitemap_urls']} URLs seeded from sitemaps, {stats['disallowed']} links disallowed by robots.txt, {stats['frontier_dropped']} low-priority URLs dropped.")
+    if cache_data is not None:
+        logging.info(
+            f"Cache: {stats['not_modified']} not modified, {stats['unchanged']} unchanged, {stats['changed']} changed, {stats['new']} new. "
+            f"Saved {stats['bytes_saved'] / 1024:.0f} KB and {stats['request_seconds_saved']:.1f} request-seconds."
+        )
+    return outputFileName
 
 def main():
-    args = parse_arguments.parse_arguments()
-
-    if not args.skip_install:
-        clone_gpt_crawler()
-        install_gpt_crawler_dependencies()
+    args = parse_arguments.parse_arguments(CONFIG)
 
     if args.url and args.match:
-        create_update_config_js(args.url, args.match, args.project)
+        logging.info("Running crawler...")
+        run_crawl(args.url, args.match, args.project, args.max_pages)
     else:
         logging.error("URL and match pattern are required.")
         exit(1)
 
-    logging.info("Running gpt-crawler...")
-    run_command('npm run start', cwd=gpt_crawler_dir)
-
 if __name__ == '__main__':
     main()
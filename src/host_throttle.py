@@ -0,0 +1,179 @@
+import asyncio
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+# Responses that mean the host wants us to slow down
+THROTTLE_STATUSES = {429, 503}
+
+# Longest Retry-After honoured; a host asking for more is retried after this long
+MAX_RETRY_AFTER = 120.0
+
+# Pause after a throttle response without a usable Retry-After
+DEFAULT_RETRY_AFTER = 1.0
+
+
+def parse_retry_after(value, now=None):
+    """Seconds to wait from a Retry-After header (delay-seconds or an HTTP date), or None."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if moment is None:
+        return None
+    return max(0.0, moment.timestamp() - (now if now is not None else time.time()))
+
+
+class TokenBucket:
+    """At most `rate` acquisitions per second on average, with bursts of up to `burst`."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class HostLimiter:
+    """
+    Concurrency limit for one host, adjusted by additive increase / multiplicative decrease.
+
+    Every healthy response raises the limit by increase/limit, about +increase
+    per round of requests. A 429 or 503, a failed request, or a smoothed
+    latency above latency_tolerance times the best seen so far multiplies it by
+    decrease, at most once per smoothed round trip so one burst of errors
+    counts once. A Retry-After pauses every request to the host until it
+    passes, and an optional TokenBucket caps the request rate.
+    """
+
+    def __init__(self, host, initial=4, minimum=1, maximum=32, adaptive=True, rate=0, increase=1.0, decrease=0.5, latency_tolerance=2.0):
+        self.host = host
+        self.adaptive = adaptive
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(self.maximum, max(self.minimum, initial if adaptive else maximum)))
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.bucket = TokenBucket(rate) if rate else None
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.latency = None
+        self.best_latency = None
+        self.last_decrease = 0.0
+        self.wake = asyncio.Event()
+        self.stats = {
+            'requests': 0, 'errors': 0, 'throttled': 0, 'bytes': 0, 'latency_total': 0.0, 'latency_max': 0.0,
+            'limit_min': self.limit, 'limit_max': self.limit, 'retry_after_seconds': 0.0, 'started': None, 'finished': None,
+        }
+
+    def _notify(self):
+        # Wake every waiter; each re-checks the limit and the pause
+        self.wake.set()
+        self.wake = asyncio.Event()
+
+    async def acquire(self):
+        while True:
+            pause = self.blocked_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+                continue
+            if self.in_flight < int(self.limit):
+                break
+            await self.wake.wait()
+        self.in_flight += 1
+        if self.stats['started'] is None:
+            self.stats['started'] = time.monotonic()
+        if self.bucket:
+            await self.bucket.acquire()
+
+    def release(self, latency, status=None, retry_after=None, body_bytes=0, error=False):
+        now = time.monotonic()
+        self.in_flight -= 1
+        stats = self.stats
+        stats['requests'] += 1
+        stats['bytes'] += body_bytes
+        stats['latency_total'] += latency
+        stats['latency_max'] = max(stats['latency_max'], latency)
+        stats['finished'] = now
+
+        throttled = status in THROTTLE_STATUSES
+        if throttled:
+            stats['throttled'] += 1
+            pause = parse_retry_after(retry_after)
+            pause = min(MAX_RETRY_AFTER, DEFAULT_RETRY_AFTER if pause is None else pause)
+            if now + pause > self.blocked_until:
+                # Overlapping pauses from concurrent 429s count once
+                stats['retry_after_seconds'] += now + pause - max(now, self.blocked_until)
+                self.blocked_until = now + pause
+        elif error:
+            stats['errors'] += 1
+        else:
+            self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+            self.best_latency = self.latency if self.best_latency is None else min(self.best_latency, self.latency)
+
+        if self.adaptive:
+            slow = (
+                self.latency is not None and self.latency > self.latency_tolerance * self.best_latency
+                # Millisecond jitter on a fast host is not congestion
+                and self.latency - self.best_latency > 0.05
+            )
+            if throttled or error or slow:
+                if now - self.last_decrease >= (self.latency or 0.0):
+                    self.limit = max(self.minimum, self.limit * self.decrease)
+                    self.last_decrease = now
+            else:
+                self.limit = min(self.maximum, self.limit + self.increase / self.limit)
+            stats['limit_min'] = min(stats['limit_min'], self.limit)
+            stats['limit_max'] = max(stats['limit_max'], self.limit)
+        self._notify()
+
+    def summary(self):
+        stats = self.stats
+        elapsed = (stats['finished'] - stats['started']) if stats['started'] is not None and stats['finished'] is not None else 0.0
+        return {
+            'requests': stats['requests'],
+            'errors': stats['errors'],
+            'throttled': stats['throttled'],
+            'bytes': stats['bytes'],
+            'requests_per_second': stats['requests'] / elapsed if elapsed else 0.0,
+            'latency_avg': stats['latency_total'] / stats['requests'] if stats['requests'] else 0.0,
+            'latency_max': stats['latency_max'],
+            'concurrency': int(self.limit),
+            'concurrency_min': int(stats['limit_min']),
+            'concurrency_max': int(stats['limit_max']),
+            'retry_after_seconds': stats['retry_after_seconds'],
+        }
+
+
+class HostThrottle:
+    """One HostLimiter per host (scheme://netloc), all created with the same settings."""
+
+    def __init__(self, **limiter_options):
+        self.limiter_options = limiter_options
+        self.hosts = {}
+
+    def limiter(self, url):
+        parts = urlsplit(url)
+        host = f"{parts.scheme}://{parts.netloc}"
+        if host not in self.hosts:
+            self.hosts[host] = HostLimiter(host, **self.limiter_options)
+        return self.hosts[host]
+
+    def summary(self):
+        return {host: limiter.summary() for host, limiter in self.hosts.items()}
@@ -0,0 +1,247 @@
+import asyncio
+import re
+import ssl
+import zlib
+from urllib.parse import urljoin, urlsplit
+
+DEFAULT_USER_AGENT = 'gpt-knowledge-compiler'
+
+# Statuses that never carry a body
+NO_BODY_STATUSES = {204, 304}
+
+REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+
+CHARSET = re.compile(r'charset=["\']?([\w.:-]+)', re.IGNORECASE)
+
+
+class HTTPError(Exception):
+    pass
+
+
+class ConnectionDropped(HTTPError):
+    pass
+
+
+class Response:
+    """Status, lower-cased headers and decoded body of one HTTP response."""
+
+    def __init__(self, url, status, reason, headers, body, keep_alive=False):
+        self.url = url
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+        self.keep_alive = keep_alive
+
+    @property
+    def content_type(self):
+        return self.headers.get('content-type', '').split(';', 1)[0].strip().lower()
+
+    def text(self):
+        match = CHARSET.search(self.headers.get('content-type', ''))
+        encoding = match.group(1) if match else 'utf-8'
+        try:
+            return self.body.decode(encoding, errors='replace')
+        except LookupError:
+            return self.body.decode('utf-8', errors='replace')
+
+
+class _Connection:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    def usable(self):
+        return not self.writer.is_closing() and not self.reader.at_eof()
+
+    def close(self):
+        self.writer.close()
+
+
+class HTTPClient:
+    """
+    Minimal asyncio HTTP/1.1 client that keeps connections alive and pools them per host.
+
+    At most max_connections_per_host requests to one host are in flight at a
+    time; finished connections go back to the host's idle list and are reused
+    by the next request. gzip and deflate bodies are decoded and redirects are
+    followed up to max_redirects.
+    """
+
+    def __init__(self, max_connections_per_host=8, timeout=30, user_agent=DEFAULT_USER_AGENT, max_redirects=5, max_body_bytes=20 * 1024 * 1024):
+        self.max_connections_per_host = max_connections_per_host
+        self.timeout = timeout
+        self.user_agent = user_agent
+        self.max_redirects = max_redirects
+        self.max_body_bytes = max_body_bytes
+        self.idle = {}
+        self.slots = {}
+        self.ssl_context = ssl.create_default_context()
+        self.connections_opened = 0
+        self.requests_sent = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        for connections in self.idle.values():
+            for connection in connections:
+                connection.close()
+        self.idle = {}
+
+    async def get(self, url, headers=None):
+        """GET `url`, following redirects; the returned Response.url is the final URL."""
+        for _ in range(self.max_redirects + 1):
+            response = await self.request('GET', url, headers)
+            location = response.headers.get('location')
+            if response.status not in REDIRECT_STATUSES or not location:
+                return response
+            url = urljoin(url, location)
+        raise HTTPError(f"Too many redirects: {url}")
+
+    async def request(self, method, url, headers=None):
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https'):
+            raise HTTPError(f"Unsupported URL scheme: {url}")
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        key = (parts.scheme, parts.hostname, port)
+        target = parts.path or '/'
+        if parts.query:
+            target += '?' + parts.query
+
+        request_headers = {
+            'Host': parts.netloc,
+            'User-Agent': self.user_agent,
+            'Accept-Encoding': 'gzip, deflate',
+            'Connection': 'keep-alive',
+        }
+        request_headers.update(headers or {})
+        head = f"{method} {target} HTTP/1.1\r\n" + ''.join(f"{name}: {value}\r\n" for name, value in request_headers.items()) + '\r\n'
+
+        slot = self.slots.setdefault(key, asyncio.Semaphore(self.max_connections_per_host))
+        async with slot:
+            connection, reused = await self._acquire(key)
+            try:
+                response = await asyncio.wait_for(self._exchange(connection, head, method, url), self.timeout)
+            except (ConnectionError, ConnectionDropped):
+                connection.close()
+                if not reused:
+                    raise
+                # The server dropped an idle keep-alive connection, retry once on a fresh one
+                connection, _ = await self._acquire(key, fresh=True)
+                try:
+                    response = await asyncio.wait_for(self._exchange(connection, head, method, url), self.timeout)
+                except BaseException:
+                    connection.close()
+                    raise
+            except BaseException:
+                connection.close()
+                raise
+            self._release(key, connection, response)
+        return response
+
+    async def _acquire(self, key, fresh=False):
+        idle = self.idle.get(key, [])
+        while idle and not fresh:
+            connection = idle.pop()
+            if connection.usable():
+                return connection, True
+            connection.close()
+        scheme, host, port = key
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port, ssl=self.ssl_context if scheme == 'https' else None),
+            self.timeout,
+        )
+        self.connections_opened += 1
+        return _Connection(reader, writer), False
+
+    def _release(self, key, connection, response):
+        if response.keep_alive and connection.usable():
+            self.idle.setdefault(key, []).append(connection)
+        else:
+            connection.close()
+
+    async def _exchange(self, connection, head, method, url):
+        connection.writer.write(head.encode('latin-1'))
+        await connection.writer.drain()
+        self.requests_sent += 1
+
+        reader = connection.reader
+        status_line = (await reader.readline()).decode('latin-1').strip()
+        if not status_line:
+            raise ConnectionDropped(f"Connection closed before a response from {url}")
+        version, _, rest = status_line.partition(' ')
+        status_text, _, reason = rest.partition(' ')
+        try:
+            status = int(status_text)
+        except ValueError:
+            raise HTTPError(f"Malformed status line from {url}: {status_line!r}")
+
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode('latin-1')
+            if line in ('\r\n', '\n', ''):
+                break
+            name, _, value = line.partition(':')
+            name = name.strip().lower()
+            value = value.strip()
+            headers[name] = f"{headers[name]}, {value}" if name in headers else value
+
+        keep_alive = version == 'HTTP/1.1' and 'close' not in headers.get('connection', '').lower()
+        if method == 'HEAD' or status in NO_BODY_STATUSES or 100 <= status < 200:
+            body = b''
+        elif 'chunked' in headers.get('transfer-encoding', '').lower():
+            body = await self._read_chunked(reader, url)
+        elif 'content-length' in headers:
+            length = int(headers['content-length'])
+            if length > self.max_body_bytes:
+                raise HTTPError(f"Response from {url} is larger than {self.max_body_bytes} bytes")
+            body = await reader.readexactly(length)
+        else:
+            # No framing: the body runs until the server closes the connection
+            body = await self._read_to_close(reader, url)
+            keep_alive = False
+
+        encoding = headers.get('content-encoding', '').lower()
+        if encoding in ('gzip', 'x-gzip'):
+            body = zlib.decompress(body, 16 + zlib.MAX_WBITS)
+        elif encoding == 'deflate':
+            try:
+                body = zlib.decompress(body)
+            except zlib.error:
+                body = zlib.decompress(body, -zlib.MAX_WBITS)
+
+        return Response(url, status, reason, headers, body, keep_alive)
+
+    async def _read_to_close(self, reader, url):
+        chunks = []
+        size = 0
+        while True:
+            # read() returns whatever has arrived, so keep going until EOF
+            chunk = await reader.read(self.max_body_bytes + 1 - size)
+            if not chunk:
+                return b''.join(chunks)
+            size += len(chunk)
+            if size > self.max_body_bytes:
+                raise HTTPError(f"Response from {url} is larger than {self.max_body_bytes} bytes")
+            chunks.append(chunk)
+
+    async def _read_chunked(self, reader, url):
+        chunks = []
+        size = 0
+        while True:
+            line = await reader.readline()
+            chunk_size = int(line.split(b';', 1)[0].strip() or b'0', 16)
+            if chunk_size == 0:
+                # Skip trailers up to the blank line
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                return b''.join(chunks)
+            size += chunk_size
+            if size > self.max_body_bytes:
+                raise HTTPError(f"Response from {url} is larger than {self.max_body_bytes} bytes")
+            chunks.append(await reader.readexactly(chunk_size))
+            await reader.readexactly(2)
@@ -0,0 +1,171 @@
+import importlib
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+
+import psutil
+
+QUARANTINE_FILE = 'quarantine.json'
+
+# How often a running task's clock and memory are checked, in seconds
+POLL_SECONDS = 0.25
+
+# Limits for file types without their own entry in the config's isolation.limits
+DEFAULT_LIMITS = {'timeout': 600, 'memory_mb': 2048}
+
+
+def _run_child(connection, module, function, args):
+    # A session of its own, so pdftoppm and tesseract started by the task go down with it
+    if hasattr(os, 'setsid'):
+        os.setsid()
+    try:
+        result = getattr(importlib.import_module(module), function)(*args)
+        connection.send(('ok', result))
+    except BaseException as e:
+        connection.send(('error', f"{type(e).__name__}: {e}"))
+    finally:
+        connection.close()
+
+
+def _tree_rss(process):
+    """Resident memory of a process and everything it started, in bytes."""
+    total = 0
+    try:
+        for member in [process] + process.children(recursive=True):
+            try:
+                total += member.memory_info().rss
+            except psutil.Error:
+                continue
+    except psutil.Error:
+        pass
+    return total
+
+
+def _kill_tree(process):
+    try:
+        members = psutil.Process(process.pid).children(recursive=True)
+    except psutil.Error:
+        members = []
+    for member in members:
+        try:
+            member.kill()
+        except psutil.Error:
+            pass
+    process.kill()
+    process.join(5)
+
+
+def run_isolated(function, args, timeout=None, memory_bytes=None):
+    """
+    Call function(*args) in a spawned subprocess, returning (status, value, seconds).
+
+    status is 'ok' with the function's return value, 'error' with the
+    exception it raised, or 'timeout', 'memory' or 'crashed' with a reason
+    when the subprocess, and whatever it started, had to be killed or died.
+    The function must be importable by module and name.
+    """
+    context = multiprocessing.get_context('spawn')
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_run_child, args=(sender, function.__module__, function.__name__, args), daemon=True)
+    started = time.monotonic()
+    status, value = 'crashed', 'interrupted'
+    process.start()
+    sender.close()
+    try:
+        handle = psutil.Process(process.pid)
+        while True:
+            if receiver.poll(POLL_SECONDS):
+                try:
+                    status, value = receiver.recv()
+                except EOFError:
+                    process.join(1)
+                    status, value = 'crashed', f"exited with code {process.exitcode}"
+                break
+            elapsed = time.monotonic() - started
+            if timeout and elapsed > timeout:
+                status, value = 'timeout', f"no result after {timeout}s"
+                break
+            if memory_bytes and _tree_rss(handle) > memory_bytes:
+                status, value = 'memory', f"used more than {memory_bytes // (1024 * 1024)} MB"
+                break
+    finally:
+        # A task that answered is given a moment to exit on its own; one that overran is killed at once
+        if status in ('ok', 'error', 'crashed'):
+            process.join(1)
+        if process.is_alive():
+            _kill_tree(process)
+        receiver.close()
+    return status, value, time.monotonic() - started
+
+
+class IsolationPolicy:
+    """
+    Runs extraction tasks under per-file-type limits, retries failures and quarantines files that keep failing.
+
+    Each attempt runs in a subprocess that is killed when it exceeds its
+    file type's wall-clock timeout or memory limit, so a pathological file
+    costs a worker at most (retries + 1) timeouts plus the backoff between
+    attempts. Settings come from the config's 'isolation' section; limits are
+    keyed by extension ('.pdf') with 'default' for the rest. Disabled, tasks
+    run in the worker thread as before but are still retried.
+    """
+
+    def __init__(self, settings=None):
+        settings = settings or {}
+        self.enabled = settings.get('enabled', True)
+        self.limits = settings.get('limits', {})
+        self.retries = settings.get('retries', 2)
+        self.backoff_seconds = settings.get('backoff_seconds', 2.0)
+        self.backoff_factor = settings.get('backoff_factor', 2.0)
+        self.quarantined = []
+        self.lock = threading.Lock()
+
+    def limits_for(self, path):
+        extension = os.path.splitext(path)[1].lower()
+        return {**DEFAULT_LIMITS, **self.limits.get('default', {}), **self.limits.get(extension, {})}
+
+    def _attempt(self, function, args, limits):
+        if not self.enabled:
+            started = time.monotonic()
+            try:
+                return 'ok', function(*args), time.monotonic() - started
+            except Exception as e:
+                return 'error', f"{type(e).__name__}: {e}", time.monotonic() - started
+        memory_mb = limits.get('memory_mb')
+        return run_isolated(function, args, limits.get('timeout'), memory_mb * 1024 * 1024 if memory_mb else None)
+
+    def run(self, function, path, *args):
+        """function(path, *args)'s result dict, or a Failed result marked quarantined once every attempt has failed."""
+        limits = self.limits_for(path)
+        attempts = []
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(self.backoff_seconds * self.backoff_factor ** (attempt - 1))
+            status, value, seconds = self._attempt(function, (path,) + args, limits)
+            if status == 'ok' and value and value.get('status') == 'Success':
+                return value
+            reason = (value or {}).get('error', 'extraction failed') if status == 'ok' else f"{status}: {value}"
+            attempts.append({'reason': reason, 'seconds': round(seconds, 2)})
+            logging.warning(f"Attempt {attempt + 1} of {self.retries + 1} failed for {path}: {reason}")
+
+        entry = {'path': path, 'limits': limits, 'attempts': attempts, 'quarantined_at': time.time()}
+        with self.lock:
+            self.quarantined.append(entry)
+        logging.error(f"Quarantined {path} after {len(attempts)} attempts")
+        return {'path': path, 'status': 'Failed', 'data': None, 'time_taken': 0, 'error': attempts[-1]['reason'], 'quarantined': True}
+
+    def write_report(self, file_path):
+        """Write the quarantined files to file_path, if there are any; returns how many."""
+        with self.lock:
+            entries = list(self.quarantined)
+        if entries:
+            directory = os.path.dirname(file_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(file_path, 'w', encoding='utf-8') as file:
+                json.dump({'quarantined': entries}, file, indent=4)
+            logging.warning(f"{len(entries)} files quarantined, see {file_path}")
+        return len(entries)
@@ -3,7 +3,7 @@ import json
 from rich.console import Console
 from rich.table import Table
 
-def parse_arguments(CONFIG):
+def parse_arguments(CONFIG=None):
     # Initialize Rich console
     console = Console()
 
@@ -18,11 +18,11 @@ def parse_arguments(CONFIG):
         console.print("[bold red]Error:[/] Invalid JSON format in gpt.knowledge.compiler.json.", style="bold red")
         exit(1)
 
-    parser = argparse.ArgumentParser(description="Run gpt-crawler with optional configuration via command line or interactive prompt.")
+    parser = argparse.ArgumentParser(description="Run the crawler with optional configuration via command line or interactive prompt.")
     parser.add_argument("--project", help="The Project Name", type=str, default=config_data.get("project"))
     parser.add_argument("--url", help="The URL to crawl", type=str, default=config_data.get("url"))
     parser.add_argument("--match", help="The match pattern for URLs to crawl", type=str, default=config_data.get("match"))
-    parser.add_argument("--skip-install", help="Skip checking and installing gpt-crawler", action="store_true", default=config_data.get("skipInstall", False))
+    parser.add_argument("--max-pages", help="The maximum number of pages to crawl", type=int, default=config_data.get("maxPagesToCrawl", 5000))
     args = parser.parse_args()
 
     # dump args with rich but not table
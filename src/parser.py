@@ -1,7 +1,6 @@
 import sys
 import os
 import threading
-import queue
 import time
 import zipfile
 import tarfile
@@ -13,8 +12,16 @@ import shutil
 from pdf2image import convert_from_path
 import pytesseract
 import json
+import hashlib
+from collections import deque
 from concurrent.futures import ThreadPoolExecutor
 
+from code_modules import ocr_batch
+from config import CONFIG, OUTPUT_DIRECTORY
+from isolation import QUARANTINE_FILE, IsolationPolicy
+from run_journal import JOURNAL_FILE, RunJournal
+from process_directory import IGNORE_MATCHER
+
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -27,75 +34,214 @@ ARCHIVE_EXTENSIONS = {
     '.7z': py7zr.SevenZipFile
 }
 
+# Batched OCR backend (None keeps the per-page pytesseract calls)
+OCR_BACKEND = ocr_batch.create_backend(CONFIG)
+
 def process_directory(directory, file_queue):
-    """Recursively process directories to queue files and directories."""
-    for root, _, files in os.walk(directory):
-        for name in files:
-            file_path = os.path.join(root, name)
-            file_queue.put(file_path)
-            logging.info(f"Queued {file_path}")
-
-def extract_archive(path, ext, temp_dir, file_queue):
-    """Extract archives and queue the contents."""
+    """Recursively process directories to queue files, skipping ignored names and subtrees."""
+    for entry in IGNORE_MATCHER.walk(directory):
+        file_queue.put(entry.path)
+        logging.info(f"Queued {entry.path}")
+
+def unpack_archive(path, ext, extraction_path):
+    """Unpack an archive into extraction_path, starting from an empty folder so a retry never sees a killed attempt's files."""
     try:
+        shutil.rmtree(extraction_path, ignore_errors=True)
         with ARCHIVE_EXTENSIONS[ext](path) as archive:
-            extraction_path = os.path.join(temp_dir, os.path.basename(path))
             archive.extractall(extraction_path)
-            logging.info(f"Extracted {path} to {extraction_path}")
-            process_directory(extraction_path, file_queue)
+        logging.info(f"Extracted {path} to {extraction_path}")
+        return {'path': path, 'status': 'Success', 'data': None, 'time_taken': 0}
     except Exception as e:
         logging.error(f"Error processing archive {path}: {str(e)}")
-        return {'path': path, 'status': 'Failed', 'data': None, 'time_taken': 0}
+        return {'path': path, 'status': 'Failed', 'data': None, 'time_taken': 0, 'error': str(e)}
+
+def extract_archive(path, ext, temp_dir, file_queue, isolation=None):
+    """Extract archives and queue the contents; with `isolation`, unpacking runs in a killable subprocess."""
+    extraction_path = os.path.join(temp_dir, os.path.basename(path))
+    result = isolation.run(unpack_archive, path, ext, extraction_path) if isolation else unpack_archive(path, ext, extraction_path)
+    if result['status'] != 'Success':
+        return result
+    process_directory(extraction_path, file_queue)
 
 def process_pdf(path):
     """Process PDFs and extract text using OCR."""
     try:
         logging.info(f"Processing PDF: {path}")
         images = convert_from_path(path)
-        pdf_data = {'text': [pytesseract.image_to_string(image) for image in images]}
+        if OCR_BACKEND:
+            pdf_data = {'text': OCR_BACKEND.image_to_string_many(images)}
+        else:
+            pdf_data = {'text': [pytesseract.image_to_string(image) for image in images]}
         logging.info(f"Finished processing PDF: {path}")
         return {'path': path, 'status': 'Success', 'data': pdf_data, 'time_taken': 0}
     except Exception as e:
         logging.error(f"Error processing PDF file {path}: {e}")
-        return {'path': path, 'status': 'Failed', 'data': None, 'time_taken': 0}
+        return {'path': path, 'status': 'Failed', 'data': None, 'time_taken': 0, 'error': str(e)}
+
+def file_digest(path):
+    """sha256 of a file's content, read in 1 MB blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class ExtractionCache:
+    """
+    Extraction results (the OCR'd text of PDFs) by file content, shared by every project in a run.
+
+    The same document in several projects, or twice in one, is extracted
+    once; a thread asking for content another thread is extracting waits for
+    that result. Failed extractions are not kept: threads already waiting
+    get a failed result naming the path that failed, later requests extract again.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_extract(self, path, extract):
+        key = file_digest(path)
+        with self.lock:
+            entry = self.entries.get(key)
+            owner = entry is None
+            if owner:
+                entry = self.entries[key] = {'done': threading.Event(), 'result': None}
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        if owner:
+            try:
+                entry['result'] = extract(path)
+            finally:
+                if not entry['result'] or entry['result']['status'] != 'Success':
+                    with self.lock:
+                        self.entries.pop(key, None)
+                entry['done'].set()
+            return entry['result']
+
+        entry['done'].wait()
+        result = entry['result']
+        if result is None:
+            return extract(path)
+        if result['status'] != 'Success':
+            # The same content just failed for another path: report that here instead of passing it off as a cache hit
+            error = result.get('error', 'extraction failed')
+            return {'path': path, 'status': 'Failed', 'data': None, 'time_taken': 0, 'error': f"same content as {result['path']}, which failed: {error}"}
+        return dict(result, path=path, cached=True)
+
+class FairQueue:
+    """
+    Files waiting to be processed, one queue per project, handed out round-robin.
+
+    A large project cannot starve a small one: each get() takes the next file
+    of the next project that has one. get() returns None once every queue is
+    empty and no file is still being processed (an archive may add more).
+    """
+
+    def __init__(self):
+        self.queues = {}
+        self.order = deque()
+        self.unfinished = 0
+        self.condition = threading.Condition()
+
+    def put(self, project, path):
+        with self.condition:
+            if project not in self.queues:
+                self.queues[project] = deque()
+                self.order.append(project)
+            self.queues[project].append(path)
+            self.unfinished += 1
+            self.condition.notify()
 
-def process_file(path, temp_dir, file_queue):
-    """Process individual files and handle archives and PDFs."""
+    def get(self):
+        with self.condition:
+            while True:
+                for _ in range(len(self.order)):
+                    project = self.order[0]
+                    self.order.rotate(-1)
+                    if self.queues[project]:
+                        return project, self.queues[project].popleft()
+                if not self.unfinished:
+                    return None
+                self.condition.wait()
+
+    def task_done(self):
+        with self.condition:
+            self.unfinished -= 1
+            if not self.unfinished:
+                self.condition.notify_all()
+
+class ProjectQueue:
+    """One project's view of a FairQueue, with the put() process_directory and extract_archive expect."""
+
+    def __init__(self, fair_queue, project):
+        self.fair_queue = fair_queue
+        self.project = project
+
+    def put(self, path):
+        self.fair_queue.put(self.project, path)
+
+def process_file(path, temp_dir, file_queue, cache=None, isolation=None):
+    """Process individual files and handle archives and PDFs; with `isolation`, extraction runs in a killable subprocess."""
     start_time = time.time()
     _, ext = os.path.splitext(path)
     file_data = {'path': path, 'status': 'Success', 'data': None}
 
     if ext in ARCHIVE_EXTENSIONS:
-        file_data = extract_archive(path, ext, temp_dir, file_queue) or file_data
+        file_data = extract_archive(path, ext, temp_dir, file_queue, isolation) or file_data
     elif ext.lower() == '.pdf':
-        file_data = process_pdf(path) or file_data
+        extract = (lambda pdf_path: isolation.run(process_pdf, pdf_path)) if isolation else process_pdf
+        file_data = (cache.get_or_extract(path, extract) if cache else extract(path)) or file_data
 
     file_data['time_taken'] = time.time() - start_time
     logging.info(f"Finished processing {path} in {file_data['time_taken']} seconds")
     return file_data
 
-def worker(file_queue, result, temp_dir):
+def worker(file_queue, results, timings, temp_dir, cache, journal=None, isolation=None):
     while True:
-        path = file_queue.get()
-        if path is None:
+        item = file_queue.get()
+        if item is None:
             break
-        result.append(process_file(path, temp_dir, file_queue))
-        file_queue.task_done()
+        project, path = item
+        try:
+            started = time.time()
+            # Archives are always extracted again so their unfinished members get queued
+            is_archive = os.path.splitext(path)[1] in ARCHIVE_EXTENSIONS
+            file_data = journal.completed(project, path, temp_dir) if journal and not is_archive else None
+            if file_data is None:
+                file_data = process_file(path, temp_dir, ProjectQueue(file_queue, project), cache, isolation)
+                if journal and not is_archive:
+                    journal.record(project, path, temp_dir, file_data)
+            results[project].append(file_data)
+            timing = timings[project]
+            timing['busy_seconds'] += time.time() - started
+            timing['first_started'] = min(timing['first_started'] or started, started)
+            timing['last_finished'] = max(timing['last_finished'] or 0, time.time())
+        finally:
+            file_queue.task_done()
 
-#
-def start_parsing(CONFIG, directory):
-    file_queue = queue.Queue()
-    result = []
+# Process the source folders of several projects ({name: directory}) in one shared worker pool
+def parse_projects(directories, num_workers=None, journal=None, isolation=None):
+    """Returns ({name: [file results]}, {name: timing report}, extraction cache); finished files go to `journal`, extraction runs under `isolation`."""
+    file_queue = FairQueue()
+    cache = ExtractionCache()
+    results = {name: [] for name in directories}
+    timings = {name: {'discovery_seconds': 0.0, 'busy_seconds': 0.0, 'first_started': None, 'last_finished': None} for name in directories}
     temp_dir = tempfile.mkdtemp()
+    num_workers = num_workers or min(4, os.cpu_count() or 1)
 
     try:
-        process_directory(directory, file_queue)
-        num_workers = min(4, os.cpu_count() or 1)
+        for name, directory in directories.items():
+            started = time.time()
+            process_directory(directory, ProjectQueue(file_queue, name))
+            timings[name]['discovery_seconds'] = time.time() - started
 
         with ThreadPoolExecutor(max_workers=num_workers) as executor:
-            futures = [executor.submit(worker, file_queue, result, temp_dir) for _ in range(num_workers)]
-            for _ in range(num_workers):
-                file_queue.put(None)
+            futures = [executor.submit(worker, file_queue, results, timings, temp_dir, cache, journal, isolation) for _ in range(num_workers)]
             for future in futures:
                 future.result()
 
@@ -104,6 +250,56 @@ def start_parsing(CONFIG, directory):
     finally:
         shutil.rmtree(temp_dir)
 
+    for name, timing in timings.items():
+        project_results = results[name]
+        first_started, last_finished = timing.pop('first_started'), timing.pop('last_finished')
+        timing.update({
+            'files': len(project_results),
+            'failed': sum(entry['status'] != 'Success' for entry in project_results),
+            'cached': sum(bool(entry.get('cached')) for entry in project_results),
+            'resumed': sum(bool(entry.get('resumed')) for entry in project_results),
+            'quarantined': sum(bool(entry.get('quarantined')) for entry in project_results),
+            'wall_seconds': (last_finished - first_started) if first_started else 0.0,
+        })
+    return results, timings, cache
+
+# Enabled entries of CONFIG['projects'], each merged over the top-level settings
+def enabled_projects(CONFIG):
+    projects = {}
+    for name, settings in CONFIG.get('projects', {}).items():
+        if settings.get('enabled', True):
+            projects[name] = {**CONFIG, 'project': name, 'project_name': settings.get('project_name', name), **settings}
+    return projects
+
+# Journal of finished files, continued from the last run when resuming
+def open_journal(CONFIG, resume=False):
+    settings = CONFIG.get('journal', {})
+    if not settings.get('enabled', True):
+        return None
+    path = settings.get('path') or os.path.join(CONFIG.get('output_folder', OUTPUT_DIRECTORY), JOURNAL_FILE)
+    journal = RunJournal.open(path, resume, settings.get('fsync_every', 100), settings.get('fsync_seconds', 5.0))
+    if resume:
+        logging.info(f"Resuming from {path}: {len(journal.entries)} files already done")
+    return journal
+
+# Limits, retries and quarantine for extraction; the report goes next to the journal
+def open_isolation(CONFIG):
+    settings = CONFIG.get('isolation', {})
+    report = settings.get('report') or os.path.join(CONFIG.get('output_folder', OUTPUT_DIRECTORY), QUARANTINE_FILE)
+    return IsolationPolicy(settings), report
+
+#
+def start_parsing(CONFIG, directory, resume=False):
+    journal = open_journal(CONFIG, resume)
+    isolation, report = open_isolation(CONFIG)
+    try:
+        results, _, _ = parse_projects({CONFIG.get('project', 'default'): directory}, journal=journal, isolation=isolation)
+    finally:
+        if journal:
+            journal.close()
+        isolation.write_report(report)
+    result = next(iter(results.values()))
+
     # Create the Markdown output instead of JSON
     output_md = compile_markdown(result, CONFIG)
 
@@ -118,6 +314,34 @@ def start_parsing(CONFIG, directory):
     return result
 
 
+# Compile every enabled project in one process: shared pool and extraction cache, output and timing report per project
+def start_parsing_projects(CONFIG, resume=False):
+    projects = enabled_projects(CONFIG)
+    started = time.time()
+    journal = open_journal(CONFIG, resume)
+    isolation, report = open_isolation(CONFIG)
+    try:
+        results, timings, cache = parse_projects({name: project['src_folder'] for name, project in projects.items()}, journal=journal, isolation=isolation)
+    finally:
+        if journal:
+            journal.close()
+        isolation.write_report(report)
+
+    for name, project in projects.items():
+        os.makedirs(project['output_folder'], exist_ok=True)
+        with open(os.path.join(project['output_folder'], 'sgpt-output.md'), 'w') as f:
+            f.write(compile_markdown(results[name], project))
+        with open(os.path.join(project['output_folder'], 'timing.json'), 'w') as f:
+            json.dump(timings[name], f, indent=4)
+        timing = timings[name]
+        logging.info(
+            f"Project {name}: {timing['files']} files ({timing['failed']} failed, {timing['quarantined']} quarantined, {timing['cached']} from cache, {timing['resumed']} resumed), "
+            f"discovery {timing['discovery_seconds']:.2f}s, busy {timing['busy_seconds']:.2f}s, wall {timing['wall_seconds']:.2f}s"
+        )
+
+    logging.info(f"Compiled {len(projects)} projects in {time.time() - started:.2f}s, extraction cache {cache.hits} hits / {cache.misses} misses")
+    return results
+
 def compile_markdown(data, config):
     """
     Generate markdown output from the parsed data and configuration.
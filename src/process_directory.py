@@ -1,9 +1,8 @@
-import os
-import fnmatch
 from rich.progress import Progress
 
 # Assuming the config module and IGNORE_NAMES are defined elsewhere
 from config import IGNORE_NAMES
+from code_modules import ignore_rules
 
 # Assuming logger setup and process_entry function are defined elsewhere
 
@@ -11,29 +10,31 @@ from config import IGNORE_NAMES
 class FileProcessingError(Exception):
     pass
 
+# IGNORE_NAMES compiled once, plus .gitignore / .ignore files found in the tree
+IGNORE_MATCHER = ignore_rules.IgnoreMatcher(IGNORE_NAMES)
+
 # Function to check if a file or folder should be ignored
 def matches_ignore_patterns(entry):
-    for pattern in IGNORE_NAMES:
-        if fnmatch.fnmatch(entry, pattern):
-            return True
-    return False
+    return IGNORE_MATCHER.matches(entry)
 
-def process_directory(directory, logger, all_data):
+def process_directory(directory, logger, all_data, ignore_context=None):
     try:
         file_list = []
+        # Ignored entries are dropped from the listing, so ignored subtrees are never opened
+        entries, ignore_context = IGNORE_MATCHER.scan(directory, ignore_context)
+
         # Initialize Progress object
         with Progress() as progress:
-            task = progress.add_task("[cyan]Scanning directory...", total=len(os.listdir(directory)))
+            task = progress.add_task("[cyan]Scanning directory...", total=len(entries))
 
-            for entry in os.scandir(directory):
+            for entry in entries:
                 # Update progress bar
                 progress.update(task, advance=1)
-                if not matches_ignore_patterns(entry.name):
-                    if entry.is_file():
-                        file_list.append(entry.path)
-                    elif entry.is_dir():
-                        # Recursively process directories
-                        file_list.extend(process_directory(entry.path, logger, all_data))
+                if entry.is_file():
+                    file_list.append(entry.path)
+                elif entry.is_dir():
+                    # Recursively process directories
+                    file_list.extend(process_directory(entry.path, logger, all_data, ignore_context))
         return file_list
     except FileNotFoundError as e:
         logger.error(f"Directory not found: {directory}. Error: {e}")
@@ -0,0 +1,126 @@
+import json
+import os
+import threading
+import time
+
+JOURNAL_VERSION = 1
+JOURNAL_FILE = '.sgpt-journal.jsonl'
+
+
+def file_key(path, temp_dir):
+    """Files extracted from archives are keyed by their path under the run's temp dir, which changes every run."""
+    relative = os.path.relpath(path, temp_dir)
+    if not relative.startswith(os.pardir):
+        return 'archive:' + relative.replace(os.sep, '/'), True
+    return os.path.abspath(path), False
+
+
+def file_signature(path, member):
+    """(size, mtime) of a file; archive members get a fresh mtime on every extraction, so only their size counts."""
+    stat = os.stat(path)
+    return stat.st_size, None if member else stat.st_mtime_ns
+
+
+class RunJournal:
+    """
+    Results of the files a compile has finished, appended to a JSON-lines file as each one completes.
+
+    Every record is flushed to the OS as it is written, so a crash or Ctrl-C
+    loses nothing; fsync, which also survives a power loss but costs a disk
+    round trip, runs after every `fsync_every` records or `fsync_seconds`,
+    whichever comes first (0 turns either trigger off; both off syncs only on
+    close). Opened with resume, the records already in the file are kept and
+    completed() returns them for files whose size and mtime have not changed.
+    Only successful results are recorded, so failed files are tried again.
+    """
+
+    def __init__(self, file_path, fsync_every=100, fsync_seconds=5.0, entries=None):
+        self.file_path = file_path
+        self.fsync_every = fsync_every
+        self.fsync_seconds = fsync_seconds
+        self.entries = entries if entries is not None else {}
+        self.lock = threading.Lock()
+        self.unsynced = 0
+        self.synced_at = time.monotonic()
+        self.recorded = 0
+        self.resumed = 0
+
+        directory = os.path.dirname(file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(file_path, 'a' if entries else 'w', encoding='utf-8')
+        if not entries:
+            self._write({'version': JOURNAL_VERSION, 'started': time.time()})
+
+    @classmethod
+    def open(cls, file_path, resume=False, fsync_every=100, fsync_seconds=5.0):
+        """A journal at file_path, continuing the one there when resuming, otherwise starting over."""
+        return cls(file_path, fsync_every, fsync_seconds, cls.load(file_path) if resume else None)
+
+    @staticmethod
+    def load(file_path):
+        """{(project, key): record} from an existing journal; a line cut short by a crash is skipped."""
+        entries = {}
+        try:
+            with open(file_path, 'r', encoding='utf-8') as file:
+                header = json.loads(file.readline() or 'null')
+                if not isinstance(header, dict) or header.get('version') != JOURNAL_VERSION:
+                    return entries
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    entries[(record['project'], record['key'])] = record
+        except (OSError, ValueError):
+            pass
+        return entries
+
+    def _write(self, record):
+        self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.file.flush()
+
+    def _sync(self):
+        os.fsync(self.file.fileno())
+        self.unsynced = 0
+        self.synced_at = time.monotonic()
+
+    def completed(self, project, path, temp_dir):
+        """The recorded result of path if it finished in an earlier run and is unchanged since, else None."""
+        key, member = file_key(path, temp_dir)
+        record = self.entries.get((project, key))
+        if record is None:
+            return None
+        try:
+            if list(file_signature(path, member)) != record['signature']:
+                return None
+        except OSError:
+            return None
+        with self.lock:
+            self.resumed += 1
+        return dict(record['result'], path=path, resumed=True)
+
+    def record(self, project, path, temp_dir, result):
+        if result.get('status') != 'Success':
+            return
+        key, member = file_key(path, temp_dir)
+        try:
+            signature = list(file_signature(path, member))
+        except OSError:
+            return
+        record = {'project': project, 'key': key, 'signature': signature, 'result': result}
+        with self.lock:
+            if self.file.closed:
+                return
+            self._write(record)
+            self.entries[(project, key)] = record
+            self.recorded += 1
+            self.unsynced += 1
+            if (self.fsync_every and self.unsynced >= self.fsync_every) or (self.fsync_seconds and time.monotonic() - self.synced_at >= self.fsync_seconds):
+                self._sync()
+
+    def close(self):
+        with self.lock:
+            if not self.file.closed:
+                self._sync()
+                self.file.close()
@@ -89,6 +89,8 @@ def parse_args():
     parser.add_argument('--url', type=str, required=True, help='The URL to process')
     parser.add_argument('--match', type=str, required=True, help='The match pattern for URLs')
     parser.add_argument('--project', type=str, required=True, help='The project name')
+    parser.add_argument('--all-projects', action='store_true', help="Compile every enabled project in CONFIG['projects'] in one run")
+    parser.add_argument('--resume', action='store_true', help='Continue the last compile, reusing the files its journal records as done')
     # parser.add_argument('-h', '--help', action='help', help='Show this help message and exit')
 
     return parser.parse_args()
@@ -0,0 +1,132 @@
+import argparse
+import json
+import logging
+import os
+import shutil
+import tempfile
+import tracemalloc
+
+# conftest puts code/ and src/ on the path, so it comes before the crawler modules
+from conftest import make_fixture_site, serve_directory
+from crawl_cache import CrawlCache
+from crawler import crawl, format_host_stats
+from url_frontier import BloomFilter
+
+
+def benchmark(pages, concurrency_levels, delay):
+    root = tempfile.mkdtemp()
+    try:
+        make_fixture_site(root, pages)
+        server, base_url = serve_directory(root, delay)
+        try:
+            for concurrency in concurrency_levels:
+                output_path = os.path.join(root, f"crawl_{concurrency}.json")
+                stats = crawl(base_url, base_url + '**', output_path, max_pages=pages + 1, concurrency=concurrency, logger=logging.getLogger('benchmark'))
+                rate = stats['pages'] / stats['elapsed'] if stats['elapsed'] else 0
+                print(f"concurrency {concurrency}: {stats['pages']} pages in {stats['elapsed']:.2f}s ({rate:.0f} pages/s), {stats['connections']} connections for {stats['requests']} requests")
+        finally:
+            server.shutdown()
+    finally:
+        shutil.rmtree(root)
+
+
+# Spend a budget smaller than the site on a fixture full of tag listings, in link order and by priority,
+# then compare the visited-set memory of a set and a BloomFilter
+def benchmark_frontier(pages, budget, concurrency, delay, listing_pages=500, url_count=1000000):
+    root = tempfile.mkdtemp()
+    try:
+        make_fixture_site(root, pages, listing_pages=listing_pages, sitemap=True)
+        server, base_url = serve_directory(root, delay)
+        try:
+            for label, options in [('link order', {'sitemaps': False, 'prioritize': False}), ('sitemap + priority', {})]:
+                output_path = os.path.join(root, 'crawl.json')
+                stats = crawl(base_url, base_url + '**', output_path, max_pages=budget, concurrency=concurrency, logger=logging.getLogger('benchmark'), **options)
+                with open(output_path, 'r', encoding='utf-8') as file:
+                    docs = sum('/docs/' in record['url'] for record in json.load(file))
+                print(f"{label}: {stats['pages']} pages in {stats['elapsed']:.2f}s, {docs} of them docs ({docs / max(1, stats['pages']):.0%}), {stats['sitemap_urls']} seeded from the sitemap")
+        finally:
+            server.shutdown()
+    finally:
+        shutil.rmtree(root)
+
+    tracemalloc.start()
+    visited = {f"https://docs.example.com/section_{idx % 100}/page_{idx}.html" for idx in range(url_count)}
+    set_bytes = tracemalloc.get_traced_memory()[0]
+    del visited
+    tracemalloc.stop()
+    bloom = BloomFilter(url_count)
+    for idx in range(url_count):
+        bloom.add(f"https://docs.example.com/section_{idx % 100}/page_{idx}.html")
+    false_positives = sum(f"https://docs.example.com/other/page_{idx}.html" in bloom for idx in range(100000))
+    print(f"{url_count} visited URLs: set {set_bytes / 1024 ** 2:.1f} MB, BloomFilter {bloom.size_bytes / 1024 ** 2:.1f} MB ({false_positives / 100000:.4%} false positives)")
+
+
+# Crawl a fragile fixture host with fixed and with adaptive concurrency
+def benchmark_adaptive(pages, concurrency, delay, capacity=4):
+    root = tempfile.mkdtemp()
+    try:
+        make_fixture_site(root, pages)
+        for label, adaptive in [('fixed', False), ('adaptive', True)]:
+            server, base_url = serve_directory(root, delay, capacity)
+            try:
+                output_path = os.path.join(root, 'crawl.json')
+                stats = crawl(base_url, base_url + '**', output_path, max_pages=pages + 1, concurrency=concurrency, adaptive=adaptive, logger=logging.getLogger('benchmark'))
+                print(f"{label} (up to {concurrency}): {stats['pages']} pages in {stats['elapsed']:.2f}s, {stats['failed']} failed, server sent {server.load['throttled']} 429s")
+                for host, host_stats in stats['hosts'].items():
+                    print(f"  {format_host_stats(host, host_stats)}")
+            finally:
+                server.shutdown()
+    finally:
+        shutil.rmtree(root)
+
+
+# Crawl the fixture three times with a cache: cold, unchanged, and after editing some pages and touching others
+def benchmark_recrawl(pages, concurrency, delay, changed_pages=10):
+    root = tempfile.mkdtemp()
+    try:
+        make_fixture_site(root, pages)
+        server, base_url = serve_directory(root, delay)
+        cache_path = os.path.join(root, '.gpt_crawler_cache.json')
+        try:
+            for run in ['cold', 'recrawl', f"{changed_pages} edited, {changed_pages} touched"]:
+                if run.endswith('touched'):
+                    for idx in range(changed_pages):
+                        with open(os.path.join(root, 'docs', f"page_{idx}.html"), 'a', encoding='utf-8') as file:
+                            file.write('<p>Edited.</p>')
+                        # New validators but the same bytes: only the content hash can tell
+                        os.utime(os.path.join(root, 'docs', f"page_{idx + changed_pages}.html"), (1, 1))
+                cache = CrawlCache.load(cache_path)
+                output_path = os.path.join(root, 'crawl.json')
+                stats = crawl(base_url, base_url + '**', output_path, max_pages=pages + 1, concurrency=concurrency, logger=logging.getLogger('benchmark'), cache=cache)
+                print(
+                    f"{run}: {stats['pages']} pages in {stats['elapsed']:.2f}s, {stats['bytes'] / 1024:.0f} KB downloaded; "
+                    f"{stats['not_modified']} not modified, {stats['unchanged']} unchanged, {stats['changed']} changed, {stats['new']} new; "
+                    f"saved {stats['bytes_saved'] / 1024:.0f} KB and {stats['request_seconds_saved']:.2f} request-seconds"
+                )
+        finally:
+            server.shutdown()
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Crawl a generated site served by http.server at several concurrency levels')
+    parser.add_argument('--pages', type=int, default=200, help='Pages in the fixture site')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32], help='Concurrency levels to compare')
+    parser.add_argument('--delay', type=float, default=0.02, help='Simulated server latency per request in seconds')
+    parser.add_argument('--recrawl', action='store_true', help='Measure cached recrawls instead of concurrency levels')
+    parser.add_argument('--frontier', action='store_true', help='Compare link-order and prioritized crawls on a budget, and visited-set memory')
+    parser.add_argument('--budget', type=int, default=100, help='Page budget for --frontier')
+    parser.add_argument('--adaptive', action='store_true', help='Compare fixed and adaptive concurrency against a host that answers 429 under load')
+    parser.add_argument('--capacity', type=int, default=4, help='Requests the --adaptive fixture host handles at full speed')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    if args.adaptive:
+        benchmark_adaptive(args.pages, args.concurrency[-1], args.delay, args.capacity)
+    elif args.frontier:
+        benchmark_frontier(args.pages, args.budget, args.concurrency[-1], args.delay)
+    elif args.recrawl:
+        benchmark_recrawl(args.pages, args.concurrency[-1], args.delay)
+    else:
+        benchmark(args.pages, args.concurrency, args.delay)
@@ -0,0 +1,183 @@
+import os
+import sys
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# The modules under test are flat scripts in code/ and src/, imported the way the compiler and crawler import them
+ROOT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CODE_DIRECTORY = os.path.join(ROOT_DIRECTORY, 'code')
+SRC_DIRECTORY = os.path.join(ROOT_DIRECTORY, 'src')
+
+# code/ first: src/utils is a package that would shadow code/utils.py
+for position, directory in enumerate([CODE_DIRECTORY, SRC_DIRECTORY]):
+    if directory not in sys.path:
+        sys.path.insert(position, directory)
+
+
+# A static site of `pages` pages, each linking to the next few and back to the index.
+# listing_pages adds paginated tag listings linked ahead of the docs, and sitemap a robots.txt and sitemap.xml
+def make_fixture_site(root, pages=200, links_per_page=5, filler_paragraphs=20, listing_pages=0, sitemap=False):
+    os.makedirs(os.path.join(root, 'docs'), exist_ok=True)
+    links = ''.join(f'<li><a href="/tags/page/{idx}.html">Tag page {idx}</a></li>' for idx in range(min(listing_pages, 20)))
+    links += ''.join(f'<li><a href="/docs/page_{idx}.html">Page {idx}</a></li>' for idx in range(min(pages, 20)))
+    with open(os.path.join(root, 'index.html'), 'w', encoding='utf-8') as file:
+        file.write(f'<html><head><title>Fixture index</title></head><body><h1>Index</h1><ul>{links}</ul></body></html>')
+    filler = f'<p>{"Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 8}</p>' * filler_paragraphs
+    for idx in range(pages):
+        next_links = ''.join(f'<a href="page_{(idx + step) % pages}.html#top">next {step}</a> ' for step in range(1, links_per_page + 1))
+        with open(os.path.join(root, 'docs', f"page_{idx}.html"), 'w', encoding='utf-8') as file:
+            file.write(
+                f'<html><head><title>Page {idx}</title><script>var x = {idx};</script></head><body>'
+                f'<nav><a href="/">Home</a></nav><h1>Page {idx}</h1><p>Content of page {idx}.</p>{filler}'
+                f'<p>{next_links}<a href="https://elsewhere.example/">external</a></p></body></html>'
+            )
+
+    if listing_pages:
+        os.makedirs(os.path.join(root, 'tags', 'page'), exist_ok=True)
+        for idx in range(listing_pages):
+            # Each listing links to the next listings (with tracking parameters) and to one doc page
+            listing_links = ''.join(f'<a href="/tags/page/{(idx + step) % listing_pages}.html?utm_source=tags">more</a> ' for step in range(1, links_per_page + 1))
+            with open(os.path.join(root, 'tags', 'page', f"{idx}.html"), 'w', encoding='utf-8') as file:
+                file.write(f'<html><head><title>Tag page {idx}</title></head><body><p>{listing_links}<a href="/docs/page_{idx % pages}.html">doc</a></p></body></html>')
+
+    if sitemap:
+        entries = ''.join(f'<url><loc>/docs/page_{idx}.html</loc><priority>0.8</priority></url>' for idx in range(pages))
+        with open(os.path.join(root, 'sitemap.xml'), 'w', encoding='utf-8') as file:
+            file.write(f'<?xml version="1.0" encoding="UTF-8"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</urlset>')
+        with open(os.path.join(root, 'robots.txt'), 'w', encoding='utf-8') as file:
+            file.write('User-agent: *\nDisallow: /private/\nSitemap: /sitemap.xml\n')
+
+
+class FixtureHandler(SimpleHTTPRequestHandler):
+    """
+    Static file handler with keep-alive, ETags, optional latency and no request logging.
+
+    With a capacity, it behaves like a fragile host: latency grows with the
+    requests in flight beyond capacity, and past twice the capacity requests
+    get a 429 with Retry-After. `load` counts them across handler instances.
+    `scripted` lists (status, headers) answers given to the first requests
+    instead of the file, and `unframed` sends bodies without Content-Length,
+    in small writes, ending them by closing the connection.
+    """
+
+    protocol_version = 'HTTP/1.1'
+    delay = 0.0
+    capacity = 0
+    load = None
+    etag = None
+    scripted = None
+    unframed = False
+
+    def do_GET(self):
+        with self.load['lock']:
+            self.load['requests'].append(time.monotonic())
+            answer = self.scripted.pop(0) if self.scripted else None
+        if answer:
+            status, headers = answer
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if self.capacity:
+            with self.load['lock']:
+                self.load['active'] += 1
+                active = self.load['active']
+            try:
+                if active > 2 * self.capacity:
+                    with self.load['lock']:
+                        self.load['throttled'] += 1
+                    self.etag = None
+                    self.send_response(429)
+                    self.send_header('Retry-After', '1')
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                time.sleep(self.delay * max(1.0, active / self.capacity))
+                super().do_GET()
+            finally:
+                with self.load['lock']:
+                    self.load['active'] -= 1
+            return
+        if self.delay:
+            time.sleep(self.delay)
+        if self.unframed:
+            self.send_unframed()
+        else:
+            super().do_GET()
+
+    def send_unframed(self):
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            path = os.path.join(path, 'index.html')
+        if not os.path.isfile(path):
+            self.send_error(404)
+            return
+        with open(path, 'rb') as file:
+            body = file.read()
+        self.send_response(200)
+        self.send_header('Content-Type', self.guess_type(path))
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        for start in range(0, len(body), 4096):
+            self.wfile.write(body[start:start + 4096])
+            time.sleep(0.001)
+
+    def send_head(self):
+        # http.server already answers If-Modified-Since; add ETag / If-None-Match on top
+        path = self.translate_path(self.path)
+        self.etag = None
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            self.etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+            if self.headers.get('If-None-Match') == self.etag:
+                self.send_response(304)
+                self.end_headers()
+                return None
+        return super().send_head()
+
+    def end_headers(self):
+        if self.etag:
+            self.send_header('ETag', self.etag)
+        super().end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_directory(root, delay=0.0, capacity=0, scripted=None, unframed=False):
+    """
+    Serve `root` on a free localhost port in a background thread, returning (server, base URL).
+
+    server.load counts the 429s sent under load and holds the arrival time of every request.
+    """
+    load = {'lock': threading.Lock(), 'active': 0, 'throttled': 0, 'requests': []}
+    attributes = {'delay': delay, 'capacity': capacity, 'load': load, 'scripted': list(scripted or []), 'unframed': unframed}
+    handler = partial(type('Handler', (FixtureHandler,), attributes), directory=root)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    server.load = load
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+@pytest.fixture
+def fixture_server():
+    """serve_directory for the test, shutting every server it started down afterwards."""
+    servers = []
+
+    def serve(root, **options):
+        server, base_url = serve_directory(root, **options)
+        servers.append(server)
+        return server, base_url
+
+    yield serve
+    for server in servers:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,52 @@
+import random
+
+import pytest
+
+import chunk_clusters
+
+pytestmark = pytest.mark.skipif(not chunk_clusters.available(), reason='NumPy is not installed')
+
+
+def words(seed, chars):
+    rng = random.Random(seed)
+    vocabulary = [''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(3, 9))) for _ in range(400)]
+    return ' '.join(rng.choices(vocabulary, k=chars // 5))[:chars]
+
+
+def organized(contents):
+    return {
+        'metadata': {key: {'file_name': f"{key}.txt", 'file_size': len(text)} for key, text in contents.items()},
+        'data': {'text': {key: {'content': text} for key, text in contents.items()}},
+    }
+
+
+def test_items_differing_only_in_the_middle_are_kept():
+    head, tail = words(1, 10000), words(2, 10000)
+    data = organized({
+        'a': head + words(3, 12500) + tail,
+        'b': head + words(4, 12500) + tail,
+    })
+
+    stats = chunk_clusters.arrange(data)
+
+    assert stats['duplicates'] == 0
+    assert set(data['data']['text']) == {'a', 'b'}
+
+
+def test_identical_items_are_dropped():
+    text = words(5, 30000)
+    data = organized({'a': text, 'b': text, 'c': words(6, 30000)})
+
+    stats = chunk_clusters.arrange(data)
+
+    assert stats['duplicates'] == 1
+    assert set(data['data']['text']) == {'a', 'c'}
+    assert data['metadata']['a']['duplicates'] == ['b.txt']
+    assert 'b' not in data['metadata']
+
+
+def test_full_text_vector_of_a_short_item_matches_its_sample_vector():
+    item = {'content': words(7, 3000), 'title': 'short'}
+    sample = chunk_clusters.hashed_vectors([chunk_clusters.sample_text(item)])[0]
+
+    assert float(chunk_clusters.full_text_vector(item) @ sample) == pytest.approx(1.0, abs=1e-5)
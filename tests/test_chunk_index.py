@@ -0,0 +1,44 @@
+import os
+
+import chunk_index
+import knowledge_file
+
+
+def knowledge(tmp_path):
+    organized = {'metadata': {}, 'data': {'text': {}}}
+    texts = {
+        'alpha': 'Notes on harbour cranes and container logistics.',
+        'beta': 'The zebrafish regrows its fins. Zebrafish larvae are transparent, so zebrafish suit imaging.',
+        'gamma': 'A survey of model organisms: mice, flies, worms and one zebrafish line.',
+    }
+    for name, text in texts.items():
+        key = f"{name}_txt"
+        organized['metadata'][key] = {'type': 'text', 'file_name': f"{name}.txt", 'source': f"docs/{name}"}
+        organized['data']['text'][key] = {'content': text}
+    path = str(tmp_path / ('kb' + knowledge_file.EXTENSION))
+    knowledge_file.write(organized, path, project='test')
+    return path
+
+
+def test_query_ranks_the_matching_chunk_first(tmp_path):
+    path = knowledge(tmp_path)
+
+    results = chunk_index.query(path, 'zebrafish')
+
+    assert os.path.exists(chunk_index.index_path(path))
+    assert [result['source'] for result in results] == ['docs/beta', 'docs/gamma']
+    assert results[0]['score'] > results[1]['score']
+    assert 'zebrafish' in results[0]['snippet'].lower()
+
+
+def test_index_counts_chunks_and_terms(tmp_path):
+    path = knowledge(tmp_path)
+
+    index_file, stats = chunk_index.build(path)
+
+    with chunk_index.ChunkIndex(index_file) as index:
+        assert index.chunk_count == stats['chunks'] == 3
+        assert len(index.postings('zebrafish')[0]) == 2
+        assert len(index.postings('cranes')[0]) == 1
+        assert not index.postings('absent')[0]
+    assert chunk_index.query(path, 'absent') == []
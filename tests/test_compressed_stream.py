@@ -0,0 +1,45 @@
+import gzip
+import io
+
+import pytest
+
+import compressed_stream
+import json_stream
+
+
+def test_text_chunks_are_line_aligned_and_spilled(tmp_path):
+    text = ''.join(f"line {idx} {'x' * (idx % 50)}\n" for idx in range(2000))
+    chunks = compressed_stream.read_text_chunks(io.StringIO(text), 1000, str(tmp_path / 'spill'))
+
+    assert isinstance(chunks['chunks'], json_stream.SpilledList)
+    items = list(chunks['chunks'])
+    assert len(items) == chunks['chunk_count'] > 50
+    assert ''.join(items) == text
+    assert all(item.endswith('\n') and len(item) <= 2000 for item in items)
+
+
+def test_short_text_is_one_chunk(tmp_path):
+    chunks = compressed_stream.read_text_chunks(io.StringIO('hello\nworld'), 1000, str(tmp_path / 'spill'))
+    assert chunks == {'chunks': ['hello\nworld'], 'chunk_count': 1}
+
+
+def test_lines_longer_than_a_block_are_cut():
+    chunks = compressed_stream.read_text_chunks(io.StringIO('x' * 2500), 1000)
+    assert [len(item) for item in chunks['chunks']] == [1000, 1000, 500]
+
+
+def test_payload_is_closed_when_sniffing_fails(tmp_path, monkeypatch):
+    file_path = str(tmp_path / 'broken.log.gz')
+    with open(file_path, 'wb') as file:
+        file.write(gzip.compress(b'some text\n' * 100)[:-20] + b'\x00' * 20)
+    opened = []
+    open_compressed = compressed_stream.open_compressed
+
+    def tracking_open(path):
+        opened.append(open_compressed(path))
+        return opened[-1]
+
+    monkeypatch.setattr(compressed_stream, 'open_compressed', tracking_open)
+    with pytest.raises(OSError):
+        compressed_stream.open_payload(file_path)
+    assert opened and opened[0].closed
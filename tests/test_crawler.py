@@ -0,0 +1,78 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from conftest import make_fixture_site
+from crawler import crawl, glob_to_regex
+from http_client import HTTPClient, HTTPError
+
+
+def crawl_records(base_url, match, output_path, **options):
+    options.setdefault('sitemaps', False)
+    stats = crawl(base_url, match, output_path, **options)
+    with open(output_path, 'r', encoding='utf-8') as file:
+        return stats, json.load(file)
+
+
+def test_glob_matching():
+    regex = glob_to_regex('https://example.com/docs/*.html')
+    assert regex.match('https://example.com/docs/page.html')
+    assert not regex.match('https://example.com/docs/deeper/page.html')
+    assert glob_to_regex('https://example.com/**').match('https://example.com/docs/deeper/page.html')
+    assert glob_to_regex('https://example.com/page_?.html').match('https://example.com/page_1.html')
+    assert not glob_to_regex('https://example.com/page_?.html').match('https://example.com/page_10.html')
+
+
+def test_match_limits_the_crawl(tmp_path, fixture_server):
+    root = str(tmp_path / 'site')
+    make_fixture_site(root, pages=30, filler_paragraphs=1)
+    _, base_url = fixture_server(root)
+
+    _, records = crawl_records(base_url, base_url + 'docs/page_1?.html', str(tmp_path / 'crawl.json'))
+
+    # The start URL is always crawled; from it only the pages the glob admits
+    assert {record['url'] for record in records} == {base_url} | {f"{base_url}docs/page_{idx}.html" for idx in range(10, 20)}
+
+
+def test_max_pages(tmp_path, fixture_server):
+    root = str(tmp_path / 'site')
+    make_fixture_site(root, pages=30, filler_paragraphs=1)
+    server, base_url = fixture_server(root)
+
+    stats, records = crawl_records(base_url, base_url + '**', str(tmp_path / 'crawl.json'), max_pages=5, respect_robots=False)
+
+    assert stats['pages'] == len(records) == 5
+    assert len(server.load['requests']) == 5
+
+
+def test_records_hold_the_whole_page(tmp_path, fixture_server):
+    root = str(tmp_path / 'site')
+    # Pages of about 200 KB, sent without Content-Length in small writes
+    make_fixture_site(root, pages=3, filler_paragraphs=400)
+    assert os.path.getsize(os.path.join(root, 'docs', 'page_1.html')) > 150000
+    _, base_url = fixture_server(root, unframed=True)
+
+    stats, records = crawl_records(base_url, base_url + '**', str(tmp_path / 'crawl.json'))
+
+    assert stats['failed'] == 0
+    assert [sorted(record) for record in records] == [['html', 'title', 'url']] * 4
+    page = next(record for record in records if record['url'] == base_url + 'docs/page_1.html')
+    assert page['title'] == 'Page 1'
+    assert 'Content of page 1.' in page['html']
+    # The links come after the filler, so they are only there if the body was read to the end
+    assert 'next 1' in page['html'] and 'external' in page['html']
+
+
+def test_unframed_body_over_the_limit(tmp_path, fixture_server):
+    root = str(tmp_path / 'site')
+    make_fixture_site(root, pages=2, filler_paragraphs=100)
+    _, base_url = fixture_server(root, unframed=True)
+
+    async def fetch():
+        async with HTTPClient(max_body_bytes=10000) as client:
+            return await client.get(base_url + 'docs/page_1.html')
+
+    with pytest.raises(HTTPError):
+        asyncio.run(fetch())
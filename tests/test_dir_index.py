@@ -0,0 +1,56 @@
+import os
+import time
+
+from dir_index import DirectorySizeIndex
+
+
+def write(path, size):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as file:
+        file.write(b'x' * size)
+
+
+def sizes(root, cache_file):
+    index = DirectorySizeIndex(cache_file)
+    index.listing(root)
+    deadline = time.time() + 10
+    while (index.busy or index.listing(root) is None) and time.time() < deadline:
+        time.sleep(0.01)
+    return {name: index.size(path) for name, path, _ in index.listing(root)}
+
+
+def test_recursive_size(tmp_path):
+    root = str(tmp_path / 'root')
+    write(os.path.join(root, 'a', 'one.bin'), 10)
+    write(os.path.join(root, 'a', 'b', 'c', 'two.bin'), 20)
+    write(os.path.join(root, 'top.bin'), 5)
+
+    assert sizes(root, str(tmp_path / 'cache.json')) == {'a': 30, 'top.bin': 5}
+
+
+def test_change_deep_down_updates_cached_parent(tmp_path):
+    root = str(tmp_path / 'root')
+    cache_file = str(tmp_path / 'cache.json')
+    write(os.path.join(root, 'a', 'b', 'c', 'two.bin'), 20)
+    assert sizes(root, cache_file) == {'a': 20}
+    a_mtime = os.stat(os.path.join(root, 'a')).st_mtime_ns
+
+    # A new file three levels down leaves the mtime of 'a' untouched
+    write(os.path.join(root, 'a', 'b', 'c', 'three.bin'), 7)
+    assert os.stat(os.path.join(root, 'a')).st_mtime_ns == a_mtime
+
+    assert sizes(root, cache_file) == {'a': 27}
+
+
+def test_tree_deeper_than_the_recursion_limit(tmp_path):
+    root = str(tmp_path / 'root')
+    # One mkdir per level, since os.makedirs recurses too; 'd/' per level keeps the path inside PATH_MAX
+    path = root
+    os.mkdir(path)
+    for _ in range(1200):
+        path = os.path.join(path, 'd')
+        os.mkdir(path)
+    write(os.path.join(path, 'leaf.bin'), 11)
+    write(os.path.join(root, 'top.bin'), 5)
+
+    assert sizes(root, str(tmp_path / 'cache.json')) == {'d': 11, 'top.bin': 5}
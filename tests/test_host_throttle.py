@@ -0,0 +1,107 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+
+from conftest import make_fixture_site
+from crawler import crawl
+from host_throttle import HostLimiter, TokenBucket, parse_retry_after
+
+
+def crawl_fixture(tmp_path, fixture_server, pages=20, scripted=None, **options):
+    root = str(tmp_path / 'site')
+    make_fixture_site(root, pages=pages, filler_paragraphs=1)
+    server, base_url = fixture_server(root, scripted=scripted)
+    stats = crawl(base_url, base_url + '**', str(tmp_path / 'crawl.json'), max_pages=pages + 1, sitemaps=False, respect_robots=False, **options)
+    return server, next(iter(stats['hosts'].values()))
+
+
+def http_date(seconds):
+    return format_datetime(datetime.now(timezone.utc) + timedelta(seconds=seconds), usegmt=True)
+
+
+def test_parse_retry_after():
+    now = time.time()
+    assert parse_retry_after('3') == 3.0
+    assert abs(parse_retry_after(format_datetime(datetime.fromtimestamp(now + 30, timezone.utc), usegmt=True), now) - 30) < 1
+    assert parse_retry_after(format_datetime(datetime.fromtimestamp(now - 30, timezone.utc), usegmt=True), now) == 0.0
+    assert parse_retry_after('soon') is None
+    assert parse_retry_after(None) is None
+
+
+def test_retry_after_seconds(tmp_path, fixture_server):
+    server, host = crawl_fixture(tmp_path, fixture_server, pages=3, scripted=[(429, {'Retry-After': '1'})])
+
+    first, second = server.load['requests'][:2]
+    assert second - first >= 0.9
+    assert host['throttled'] == 1
+    assert host['retry_after_seconds'] >= 0.9
+
+
+def test_retry_after_http_date(tmp_path, fixture_server):
+    server, host = crawl_fixture(tmp_path, fixture_server, pages=3, scripted=[(503, {'Retry-After': http_date(2)})])
+
+    # The date has whole seconds, so the pause is between one and two
+    first, second = server.load['requests'][:2]
+    assert second - first >= 0.9
+    assert host['throttled'] == 1
+
+
+def test_throttle_responses_halve_the_limit():
+    limiter = HostLimiter('http://example.com', initial=8, maximum=16)
+    limiter.release(0.01, 429, '0')
+    assert limiter.limit == 4
+    limiter.release(0.01, 503, '0')
+    assert limiter.limit == 2
+    limiter.release(0.01, 429, '0')
+    limiter.release(0.01, 429, '0')
+    assert limiter.limit == limiter.minimum == 1
+
+
+def test_throttle_response_from_the_fixture_server(tmp_path, fixture_server):
+    _, host = crawl_fixture(tmp_path, fixture_server, scripted=[(503, {'Retry-After': '0'})], initial_concurrency=4)
+
+    assert host['throttled'] == 1
+    assert host['concurrency_min'] == 2
+
+
+def test_healthy_responses_raise_the_limit():
+    limiter = HostLimiter('http://example.com', initial=2, maximum=4)
+    limiter.release(0.01, 200)
+    assert limiter.limit == 2.5
+    limiter.release(0.01, 200)
+    assert limiter.limit == pytest.approx(2.9)
+    for _ in range(20):
+        limiter.release(0.01, 200)
+    assert limiter.limit == 4
+
+
+def test_healthy_responses_from_the_fixture_server(tmp_path, fixture_server):
+    _, host = crawl_fixture(tmp_path, fixture_server, pages=30, initial_concurrency=2, concurrency=8)
+
+    assert host['concurrency_min'] == 2
+    assert host['concurrency_max'] > 2
+
+
+def test_token_bucket_caps_the_rate():
+    async def take(count):
+        bucket = TokenBucket(20, burst=1)
+        started = time.monotonic()
+        for _ in range(count):
+            await bucket.acquire()
+        return time.monotonic() - started
+
+    # One token up front, then 20 per second
+    assert asyncio.run(take(11)) >= 0.45
+
+
+def test_rate_cap_on_the_fixture_server(tmp_path, fixture_server):
+    server, host = crawl_fixture(tmp_path, fixture_server, max_requests_per_second=10)
+
+    # A burst of 10, then the other 11 requests at 10 per second
+    requests = server.load['requests']
+    assert len(requests) == 21
+    assert requests[-1] - requests[0] >= 0.9
+    assert host['requests'] == 21
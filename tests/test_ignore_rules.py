@@ -0,0 +1,55 @@
+import os
+
+import ignore_rules
+
+
+def write(path, content=''):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as file:
+        file.write(content)
+
+
+def make_source(root):
+    write(os.path.join(root, '.gitignore'), "ignored_dir/\n*.log\n")
+    write(os.path.join(root, 'keep.txt'))
+    write(os.path.join(root, 'top.log'))
+    write(os.path.join(root, 'ignored_dir', 'x.txt'))
+    write(os.path.join(root, 'docs', 'index.md'))
+    write(os.path.join(root, 'docs', 'debug.log'))
+    write(os.path.join(root, 'node_modules', 'pkg', 'index.js'))
+
+
+def test_root_scan_applies_root_ignore_file_and_names(tmp_path):
+    root = str(tmp_path)
+    make_source(root)
+    matcher = ignore_rules.IgnoreMatcher(['.gitignore', 'node_modules'])
+
+    entries, context = matcher.scan(root)
+
+    assert sorted(entry.name for entry in entries) == ['docs', 'keep.txt']
+    # The root context carries the root's rules into the top-level directories
+    docs, _ = matcher.scan(os.path.join(root, 'docs'), context)
+    assert [entry.name for entry in docs] == ['index.md']
+
+
+def test_walk_matches_fnmatch_walk(tmp_path):
+    root = str(tmp_path)
+    make_source(root)
+    patterns = ['.gitignore', 'node_modules']
+
+    walked = sorted(entry.path for entry in ignore_rules.IgnoreMatcher(patterns).walk(root))
+
+    assert walked == sorted(ignore_rules.fnmatch_walk(root, patterns))
+    assert walked == [os.path.join(root, 'docs', 'index.md'), os.path.join(root, 'keep.txt')]
+
+
+def test_negation_in_child_directory(tmp_path):
+    root = str(tmp_path)
+    write(os.path.join(root, '.gitignore'), "*.log\n")
+    write(os.path.join(root, 'logs', '.gitignore'), "!keep.log\n")
+    write(os.path.join(root, 'logs', 'keep.log'))
+    write(os.path.join(root, 'logs', 'drop.log'))
+
+    walked = [entry.name for entry in ignore_rules.IgnoreMatcher([]).walk(root)]
+
+    assert sorted(walked) == ['.gitignore', '.gitignore', 'keep.log']
@@ -0,0 +1,45 @@
+import json
+
+import pytest
+
+import json_stream
+
+
+def spill(tmp_path, items):
+    spiller = json_stream.ListSpiller(str(tmp_path / 'spill'), 'test')
+    for item in items:
+        spiller.append(item)
+    return spiller.close()
+
+
+def test_lazy_lists_must_give_items_and_a_count():
+    class NoItems(json_stream.LazyList):
+        def __len__(self):
+            return 0
+
+    with pytest.raises(TypeError):
+        json_stream.LazyList()
+    with pytest.raises(TypeError):
+        NoItems()
+
+
+def test_spilled_and_mapped_lists(tmp_path):
+    spilled = spill(tmp_path, [{'n': 1}, {'n': 2}, {'n': 3}])
+    assert isinstance(spilled, json_stream.SpilledList)
+    assert len(spilled) == 3 and spilled
+    assert list(spilled) == [{'n': 1}, {'n': 2}, {'n': 3}]
+
+    mapped = json_stream.MappedList(spilled, lambda item: item['n'] * 10)
+    assert len(mapped) == 3
+    assert list(mapped) == [10, 20, 30]
+    assert not json_stream.MappedList([], str)
+
+
+def test_writer_streams_lazy_lists(tmp_path):
+    spilled = spill(tmp_path, ['a', 'b'])
+    file_path = str(tmp_path / 'out.json')
+    with json_stream.JSONStreamWriter(file_path) as writer:
+        writer.dump({'items': json_stream.MappedList(spilled, str.upper), 'empty': json_stream.MappedList([], str)})
+
+    with open(file_path, 'r', encoding='utf-8') as file:
+        assert json.load(file) == {'items': ['A', 'B'], 'empty': []}
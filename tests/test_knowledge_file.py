@@ -0,0 +1,57 @@
+import json
+import os
+
+import json_stream
+import knowledge_file
+
+
+def organized_data(spill_dir):
+    spilled = json_stream.ListSpiller(spill_dir, 'rows')
+    for idx in range(5):
+        spilled.append({'id': idx, 'name': f"row {idx}", 'tags': ['a', 'ü']})
+    text_meta = {'type': 'text', 'file_name': 'notes.md', 'file_size': 42, 'source': 'docs'}
+    json_meta = {'type': 'json', 'file_name': 'data.json', 'file_size': 99, 'source': 'data'}
+    return {
+        'metadata': {'notes_md': text_meta, 'data_json': json_meta},
+        'data': {
+            'text': {
+                'notes_md': {
+                    'title': 'Notes',
+                    'content': {'type': 'text_chunk', 'chunks': ['first line\n', 'second — line\n']},
+                    'summary': 'short',
+                    'metadata': text_meta,
+                },
+            },
+            'json': {
+                'data_json': {'content': [{'k': 1}, {'k': [1, 2, None]}, 'plain', 3.5], 'metadata': json_meta},
+                'rows_json': {'content': spilled.close(), 'count': 5},
+            },
+            'csv': {},
+        },
+    }
+
+
+def test_json_round_trip(tmp_path):
+    organized = organized_data(str(tmp_path / 'spill'))
+    expected_file = str(tmp_path / 'expected.json')
+    json_stream.dump(organized, expected_file)
+
+    kf_path = str(tmp_path / ('out' + knowledge_file.EXTENSION))
+    stats = knowledge_file.write(organized, kf_path, project='test')
+    exported_file = str(tmp_path / 'exported.json')
+    knowledge_file.export_json(kf_path, exported_file)
+
+    assert stats['chunks'] > 0
+    with open(expected_file, encoding='utf-8') as expected, open(exported_file, encoding='utf-8') as exported:
+        assert json.load(exported) == json.load(expected)
+
+
+def test_chunks_are_readable_one_at_a_time(tmp_path):
+    kf_path = str(tmp_path / ('out' + knowledge_file.EXTENSION))
+    knowledge_file.write(organized_data(str(tmp_path / 'spill')), kf_path, project='test')
+
+    with knowledge_file.KnowledgeFile(kf_path) as knowledge:
+        texts = [knowledge.text(index) for index in range(len(knowledge)) if knowledge.encoding(index) == 'text']
+        assert texts == ['first line\nsecond — line\n', 'short']
+        assert knowledge.header['project'] == 'test'
+    assert os.path.getsize(kf_path) > 0
@@ -0,0 +1,116 @@
+import os
+import stat
+import sys
+
+import pytest
+
+pytest.importorskip('pytesseract')
+pytest.importorskip('PIL')
+
+import ocr_batch  # noqa: E402
+
+# Stands in for tesseract: "OCRs" each image in the list file to its file name, one page per image
+FAKE_TESSERACT = '''#!{python}
+import os
+import sys
+
+mode = {mode!r}
+list_file, output_base = sys.argv[1], sys.argv[2]
+if mode == 'fail':
+    sys.exit(1)
+with open(list_file, encoding='utf-8') as file:
+    paths = [line.strip() for line in file if line.strip()]
+pages = ['text of ' + os.path.basename(path) + '\\n' for path in paths]
+if mode == 'extra_page':
+    pages.append('second frame\\n')
+with open(output_base + '.txt', 'w', encoding='utf-8') as file:
+    file.write(''.join(page + '\\f' for page in pages))
+'''
+
+
+def fake_tesseract(tmp_path, mode='ok'):
+    command = str(tmp_path / f"tesseract_{mode}")
+    with open(command, 'w', encoding='utf-8') as file:
+        file.write(FAKE_TESSERACT.format(python=sys.executable, mode=mode))
+    os.chmod(command, os.stat(command).st_mode | stat.S_IXUSR)
+    return command
+
+
+def images(tmp_path, count):
+    paths = []
+    for idx in range(count):
+        path = tmp_path / f"image_{idx}.png"
+        path.write_bytes(b'')
+        paths.append(str(path))
+    return paths
+
+
+@pytest.fixture
+def single_calls(monkeypatch):
+    """Record the per-image fallback calls instead of running pytesseract."""
+    calls = []
+    monkeypatch.setattr(ocr_batch.Image, 'open', lambda path: path)
+
+    def image_to_string(image, lang=None, config=''):
+        calls.append(image)
+        return 'single ' + os.path.basename(image)
+
+    monkeypatch.setattr(ocr_batch.pytesseract, 'image_to_string', image_to_string)
+    return calls
+
+
+def test_output_is_split_per_image(tmp_path, single_calls):
+    backend = ocr_batch.BatchOCR(batch_size=2, max_concurrent_batches=2, tesseract_cmd=fake_tesseract(tmp_path))
+
+    texts = backend.image_to_string_many(images(tmp_path, 5))
+
+    assert [text.strip() for text in texts] == [f"text of image_{idx}.png" for idx in range(5)]
+    assert single_calls == []
+
+
+def test_pil_images_are_written_for_tesseract(tmp_path, single_calls):
+    from PIL import Image
+
+    backend = ocr_batch.BatchOCR(tesseract_cmd=fake_tesseract(tmp_path))
+
+    texts = backend.image_to_string_many([Image.new('RGBA', (4, 4)), str(tmp_path / 'scan.png')])
+
+    assert [text.strip() for text in texts] == ['text of image_0.bmp', 'text of scan.png']
+
+
+@pytest.mark.parametrize('mode', ['fail', 'extra_page'])
+def test_falls_back_to_per_image_calls(tmp_path, single_calls, mode):
+    backend = ocr_batch.BatchOCR(batch_size=3, tesseract_cmd=fake_tesseract(tmp_path, mode))
+    paths = images(tmp_path, 3)
+
+    texts = backend.image_to_string_many(paths)
+
+    assert texts == [f"single image_{idx}.png" for idx in range(3)]
+    assert single_calls == paths
+
+
+def test_queue_flush_fills_image_info(tmp_path, single_calls):
+    backend = ocr_batch.BatchOCR(batch_size=2, max_concurrent_batches=2, tesseract_cmd=fake_tesseract(tmp_path))
+    queue = ocr_batch.OCRQueue(backend)
+    paths = images(tmp_path, 5)
+    infos = [{'format': 'PNG'} for _ in paths]
+
+    for path, info in zip(paths[:3], infos):
+        queue.submit(path, info)
+    assert all('ocr_text' not in info for info in infos)
+
+    # The fourth image fills both concurrent batches, which flushes the queue
+    queue.submit(paths[3], infos[3])
+    assert [info['ocr_text'].strip() for info in infos[:4]] == [f"text of image_{idx}.png" for idx in range(4)]
+
+    queue.submit(paths[4], infos[4], key='text')
+    assert 'text' not in infos[4]
+    queue.flush()
+    assert infos[4]['text'].strip() == 'text of image_4.png'
+    assert queue.pending == []
+
+
+def test_create_backend_defaults_to_per_image_calls():
+    assert ocr_batch.create_backend({}) is None
+    assert ocr_batch.create_backend({'ocr': {'backend': 'pytesseract'}}) is None
+    assert isinstance(ocr_batch.create_backend({'ocr': {'backend': 'batch', 'batch_size': 8}}), ocr_batch.BatchOCR)
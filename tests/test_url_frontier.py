@@ -0,0 +1,113 @@
+import gzip
+import os
+
+from conftest import make_fixture_site
+from crawler import crawl
+from url_frontier import URLFrontier, parse_sitemap, url_priority
+from url_normalize import normalize_url
+
+SITEMAP = (
+    '<?xml version="1.0" encoding="UTF-8"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+    '<url><loc>https://example.com/a.html</loc><priority>0.9</priority></url>'
+    '<url><loc>https://example.com/b.html</loc></url>'
+    '<url><loc>https://example.com/c.html</loc><priority>7</priority></url>'
+    '</urlset>'
+)
+
+SITEMAP_INDEX = (
+    '<?xml version="1.0" encoding="UTF-8"?><sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+    '<sitemap><loc>https://example.com/one.xml.gz</loc></sitemap>'
+    '<sitemap><loc>https://example.com/two.xml</loc></sitemap>'
+    '</sitemapindex>'
+)
+
+
+def pop_all(frontier):
+    urls = []
+    while frontier:
+        urls.append(frontier.pop()[0])
+    return urls
+
+
+def test_pop_order():
+    frontier = URLFrontier()
+    entries = [
+        ('https://example.com/deep.html', 4, None),
+        ('https://example.com/tags/page/2.html', 1, None),
+        ('https://example.com/plain.html', 1, None),
+        ('https://example.com/listed.html', 1, 1.0),
+        ('https://example.com/unimportant.html', 1, 0.1),
+    ]
+    for url, depth, sitemap_priority in entries:
+        frontier.push(url, depth, url_priority(url, depth, sitemap_priority=sitemap_priority))
+
+    assert pop_all(frontier) == [
+        'https://example.com/listed.html',
+        'https://example.com/plain.html',
+        'https://example.com/deep.html',
+        'https://example.com/unimportant.html',
+        'https://example.com/tags/page/2.html',
+    ]
+
+
+def test_equal_priorities_pop_in_push_order():
+    frontier = URLFrontier()
+    for idx in range(5):
+        frontier.push(f"https://example.com/{idx}.html")
+    assert pop_all(frontier) == [f"https://example.com/{idx}.html" for idx in range(5)]
+
+
+def test_duplicates_are_rejected_after_normalizing():
+    frontier = URLFrontier()
+    assert frontier.push(normalize_url('https://example.com/docs/page.html?b=2&a=1'))
+    for spelling in [
+        'HTTPS://Example.com:443/docs/page.html?a=1&b=2',
+        'https://example.com/docs/./other/../page.html?a=1&b=2#section',
+        'https://example.com/%64ocs/page.html?a=1&utm_source=feed&b=2',
+    ]:
+        assert not frontier.push(normalize_url(spelling))
+    assert frontier.push(normalize_url('https://example.com/docs/page.html?a=1'))
+    assert len(frontier) == 2
+
+
+def test_parse_sitemap():
+    urls, nested = parse_sitemap(SITEMAP.encode('utf-8'))
+    assert urls == [('https://example.com/a.html', 0.9), ('https://example.com/b.html', None), ('https://example.com/c.html', 1.0)]
+    assert nested == []
+
+    assert parse_sitemap(gzip.compress(SITEMAP.encode('utf-8'))) == (urls, [])
+    assert parse_sitemap(SITEMAP_INDEX.encode('utf-8')) == ([], ['https://example.com/one.xml.gz', 'https://example.com/two.xml'])
+
+
+def test_max_pending_drops_the_lowest_priorities():
+    frontier = URLFrontier(max_pending=8)
+    for idx in range(9):
+        assert frontier.push(f"https://example.com/{idx}.html", 0, idx)
+
+    # Past max_pending the heap is cut to three quarters of it
+    assert len(frontier) == 6
+    assert frontier.dropped == 3
+    assert pop_all(frontier) == [f"https://example.com/{idx}.html" for idx in range(8, 2, -1)]
+    # Dropped URLs still count as admitted
+    assert not frontier.push('https://example.com/0.html')
+
+
+def test_crawl_seeds_from_a_gzipped_sitemap_index(tmp_path, fixture_server):
+    root = str(tmp_path / 'site')
+    make_fixture_site(root, pages=30, filler_paragraphs=1, sitemap=True)
+    # Replace the plain sitemap with an index pointing at a gzipped copy of it
+    with open(os.path.join(root, 'sitemap.xml'), 'rb') as file:
+        sitemap = file.read()
+    os.remove(os.path.join(root, 'sitemap.xml'))
+    with open(os.path.join(root, 'docs.xml.gz'), 'wb') as file:
+        file.write(gzip.compress(sitemap))
+    with open(os.path.join(root, 'sitemap_index.xml'), 'w', encoding='utf-8') as file:
+        file.write(SITEMAP_INDEX.replace('https://example.com/one.xml.gz', '/docs.xml.gz').replace('https://example.com/two.xml', '/missing.xml'))
+    with open(os.path.join(root, 'robots.txt'), 'w', encoding='utf-8') as file:
+        file.write('User-agent: *\nSitemap: /sitemap_index.xml\n')
+    _, base_url = fixture_server(root)
+
+    stats = crawl(base_url, base_url + '**', str(tmp_path / 'crawl.json'), max_pages=31)
+
+    assert stats['sitemap_urls'] == 30
+    assert stats['pages'] == 31
@@ -0,0 +1,24 @@
+from url_normalize import normalize_url, remove_dot_segments
+
+
+def test_default_ports_and_case():
+    assert normalize_url('HTTP://Example.COM:80/Docs') == 'http://example.com/Docs'
+    assert normalize_url('https://example.com:443') == 'https://example.com/'
+    assert normalize_url('https://example.com:8443/a') == 'https://example.com:8443/a'
+
+
+def test_dot_segments():
+    assert remove_dot_segments('/a/b/../c/./d') == '/a/c/d'
+    assert remove_dot_segments('/a/b/..') == '/a/'
+    assert remove_dot_segments('/../a') == '/a'
+    assert normalize_url('https://example.com/a/./b/../c.html#top') == 'https://example.com/a/c.html'
+
+
+def test_percent_escapes():
+    # Unreserved characters are unescaped, the rest keep an upper-case escape
+    assert normalize_url('https://example.com/%7euser/%61%2fb?q=%e2%82%ac') == 'https://example.com/~user/a%2Fb?q=%E2%82%AC'
+
+
+def test_query():
+    assert normalize_url('https://example.com/p?utm_source=x&b=2&fbclid=y&a=1&gclid=z') == 'https://example.com/p?a=1&b=2'
+    assert normalize_url('https://example.com/p?utm_medium=email') == 'https://example.com/p'
@@ -0,0 +1,44 @@
+import io
+
+import xml_stream
+
+
+def records(xml, **kwargs):
+    return list(xml_stream.iter_records(io.BytesIO(xml.encode('utf-8')), **kwargs))
+
+
+def test_siblings_of_the_record_container_are_kept():
+    result = records(
+        '<root><meta><title>T</title></meta>'
+        '<items><item><x>1</x></item><item><x>2</x></item><item><x>3</x></item></items>'
+        '<other>y</other></root>'
+    )
+
+    assert result == [
+        ('meta', 'meta.title: T'),
+        ('item', 'x: 1'),
+        ('item', 'x: 2'),
+        ('item', 'x: 3'),
+        ('other', 'other: y'),
+    ]
+
+
+def test_feed_header_fields_and_attributes_are_kept():
+    result = records('<rss version="2.0"><channel><title>F</title><item><t>a</t></item><item><t>b</t></item></channel></rss>')
+
+    assert ('title', 'title: F') in result
+    assert ('rss', '@version: 2.0') in result
+    assert [text for tag, text in result if tag == 'item'] == ['t: a', 't: b']
+
+
+def test_small_document_without_repeats_is_one_record():
+    assert records('<doc><a>1</a><b><c>2</c><d>3</d></b><e>4</e></doc>') == [('doc', 'a: 1\nb.c: 2\nb.d: 3\ne: 4')]
+
+
+def test_document_without_repeats_is_flushed_past_the_cap():
+    fields = ''.join(f'<f{idx}><v>{idx}</v></f{idx}>' for idx in range(50))
+    result = records(f'<doc>{fields}</doc>', flush_elements=10)
+
+    assert len(result) > 1
+    lines = [line for _, text in result for line in text.split('\n')]
+    assert lines == [f'f{idx}.v: {idx}' for idx in range(50)]